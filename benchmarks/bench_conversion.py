@@ -0,0 +1,69 @@
+"""
+Benchmarks the conversion of yfinance DataFrames into TransactionData records.
+
+Compares the previous row-by-row conversion (df.iterrows() with per-cell MultiIndex
+unwrapping) with the column-wise conversion in data_fetcher, on synthetic frames shaped
+like a single-ticker yf.download result.
+
+Usage:
+    python -m benchmarks.bench_conversion [--rows 10000 100000] [--repeat 1]
+"""
+import argparse
+import time
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from src.models.stock_data import TransactionData
+from src.services import data_fetcher
+
+def make_frame(rows: int, ticker: str = "2330.TW") -> pd.DataFrame:
+    """Builds a synthetic frame with a (Price, Ticker) MultiIndex, as returned by yf.download."""
+    rng = np.random.default_rng(0)
+    close = 500 + rng.standard_normal(rows).cumsum()
+    columns = pd.MultiIndex.from_product([['Open', 'High', 'Low', 'Close', 'Volume'], [ticker]], names=['Price', 'Ticker'])
+    values = np.column_stack([close - 1, close + 2, close - 2, close, rng.integers(1_000, 1_000_000, rows)])
+    return pd.DataFrame(values, index=pd.bdate_range("1990-01-01", periods=rows), columns=columns)
+
+def convert_iterrows(df: pd.DataFrame, stock_code: str, stock_name: str) -> List[TransactionData]:
+    """The row-by-row conversion that data_fetcher used before, kept here as the baseline."""
+    transactions = []
+    for index, row in df.iterrows():
+        transactions.append(TransactionData(
+            stock_code=stock_code,
+            stock_name=stock_name,
+            date=index.date(),
+            open_price=float(row['Open'].iloc[0] if hasattr(row['Open'], 'iloc') else row['Open']),
+            close_price=float(row['Close'].iloc[0] if hasattr(row['Close'], 'iloc') else row['Close']),
+            high_price=float(row['High'].iloc[0] if hasattr(row['High'], 'iloc') else row['High']),
+            low_price=float(row['Low'].iloc[0] if hasattr(row['Low'], 'iloc') else row['Low']),
+            volume=int(row['Volume'].iloc[0] if hasattr(row['Volume'], 'iloc') else row['Volume'])
+        ))
+    return transactions
+
+def best_time(func, repeat: int) -> float:
+    """Returns the best wall time of several runs, in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DataFrame-to-record conversion.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'iterrows':>10} {'records':>10} {'tuples':>10} {'speed-up':>9}")
+    for rows in args.rows:
+        df = make_frame(rows)
+        baseline = best_time(lambda: convert_iterrows(df, "2330", "TSMC"), args.repeat)
+        records = best_time(lambda: data_fetcher._convert_df_to_transaction_data(df, "2330", "TSMC"), args.repeat)
+        tuples = best_time(lambda: data_fetcher._convert_df_to_rows(df, "2330"), args.repeat)
+        print(f"{rows:>8} {baseline:>9.3f}s {records:>9.3f}s {tuples:>9.3f}s {baseline / records:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
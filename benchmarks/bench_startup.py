@@ -0,0 +1,76 @@
+"""
+Measures the wall time of short CLI invocations, including interpreter startup and imports.
+
+Two commands are timed against STARTUP_TARGETS: `--help`, and a date range query that is
+answered entirely from a database filled beforehand. Neither may load pandas or yfinance.
+The exit status is 1 if the median time of a command exceeds its target.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 10]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from src.models.stock_data import TransactionData
+from src.services import db_service
+
+# Median wall time in seconds that each command must stay under
+STARTUP_TARGETS = {
+    "help": 0.25,
+    "warm range query": 0.30,
+}
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+def fill_cache(path: str, stock_code: str, start_date: date, end_date: date):
+    """Writes a row for every weekday of the range, so the query needs no download."""
+    db_service.DB_PATH = path
+    db_service.initialize_db()
+    day, records = start_date, []
+    while day <= end_date:
+        if day.weekday() < 5:
+            records.append(TransactionData(stock_code, "TSMC", day, 900.0, 905.0, 910.0, 899.0, 10000))
+        day += timedelta(days=1)
+    db_service.save_transaction_data(records)
+    db_service.close_connection()
+
+def time_command(args: list, cwd: str, runs: int) -> float:
+    """Returns the median wall time of running the CLI with args, in seconds."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "src.cli.main", *args], cwd=cwd, env=env, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure CLI startup time against targets.")
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # The CLI uses stock_data.db in its working directory (2025-09-01 to 05 is Monday to Friday)
+        fill_cache(os.path.join(directory, "stock_data.db"), "2330", date(2025, 9, 1), date(2025, 9, 5))
+        results = {
+            "help": time_command(["--help"], directory, args.runs),
+            "warm range query": time_command(
+                ["--stocks", "2330", "--start-date", "2025-09-01", "--end-date", "2025-09-05"], directory, args.runs
+            ),
+        }
+
+    failed = False
+    print(f"{'command':<20} {'median':>8} {'target':>8}")
+    for name, seconds in results.items():
+        target = STARTUP_TARGETS[name]
+        failed |= seconds > target
+        print(f"{name:<20} {seconds:>7.3f}s {target:>7.3f}s {'ok' if seconds <= target else 'SLOW'}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
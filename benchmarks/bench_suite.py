@@ -0,0 +1,162 @@
+"""
+Offline benchmark suite for the fetch, cache and summary paths.
+
+Every benchmark runs against SyntheticSource (see benchmarks/synthetic.py) and a SQLite
+database generated in a temporary directory, so no network access is needed and results are
+reproducible. "cold" runs start from an empty database and go through the provider; "warm"
+runs repeat the same calls against the filled cache. All dates are fixed, relative to
+REFERENCE_DATE, so the work done does not depend on the day the suite runs.
+
+Results are written as JSON and can be compared with the results of another commit:
+
+Usage:
+    python -m benchmarks.bench_suite [--stocks 20] [--repeat 3] [--latency 0] [--output results.json]
+    python -m benchmarks.bench_suite --compare baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.synthetic import SyntheticSource
+from src.models.stock_data import TransactionData
+from src.services import data_fetcher, data_source, db_service, summary_service
+
+# Last day of every benchmarked range; a Tuesday, so the weekly summary covers two trading days
+REFERENCE_DATE = date(2025, 9, 30)
+RANGE_YEARS = [1, 5, 20]
+# Trading days per stock written by the bulk save benchmarks
+SAVE_DAYS = 250
+
+def stock_codes(count: int) -> List[str]:
+    """Returns count distinct four-digit stock codes."""
+    return [str(1101 + i) for i in range(count)]
+
+def reset_db(path: str):
+    """Replaces the benchmark database with an empty one."""
+    db_service.close_connection()
+    for name in (path, path + "-wal", path + "-shm"):
+        if os.path.exists(name):
+            os.remove(name)
+    db_service.DB_PATH = path
+    db_service.initialize_db()
+
+def measure(func: Callable[[], None], repeat: int, setup: Optional[Callable[[], None]] = None) -> float:
+    """Returns the best wall time of several runs, in seconds. setup runs before each run, untimed."""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def git_commit() -> Optional[str]:
+    """Returns the current commit hash, or None outside a git checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_suite(stocks: int, repeat: int, latency: float, db_path: str) -> List[Dict]:
+    """Runs every benchmark and returns one result dictionary per benchmark."""
+    results = []
+    codes = stock_codes(stocks)
+
+    def record(name: str, seconds: float, items: int, unit: str):
+        results.append({"name": name, "seconds": seconds, "items": items, "unit": unit, "per_second": items / seconds if seconds else None})
+        print(f"{name:<40} {seconds:>9.4f}s {items / seconds if seconds else 0:>12,.0f} {unit}/s")
+
+    fresh = lambda: reset_db(db_path)
+
+    # 1. Single-day lookups, cold (downloaded) and warm (cached)
+    fetch_day = lambda: [data_fetcher.fetch_stock_data(code, REFERENCE_DATE, silent=True) for code in codes]
+    record("fetch_stock_data/cold", measure(fetch_day, repeat, setup=fresh), len(codes), "calls")
+    record("fetch_stock_data/warm", measure(fetch_day, repeat), len(codes), "calls")
+
+    # 2. Date ranges of one stock over 1, 5 and 20 years
+    for years in RANGE_YEARS:
+        start_date = REFERENCE_DATE - timedelta(days=365 * years)
+        fetch_range = lambda: data_fetcher.fetch_stock_data_in_range(codes[0], start_date, REFERENCE_DATE, silent=True)
+        rows = len(fetch_range())
+        record(f"fetch_stock_data_in_range/{years}y/cold", measure(fetch_range, repeat, setup=fresh), rows, "rows")
+        record(f"fetch_stock_data_in_range/{years}y/warm", measure(fetch_range, repeat), rows, "rows")
+
+    # 3. Weekly and monthly summaries for every stock
+    weekly = lambda: [summary_service.generate_weekly_summary(code, REFERENCE_DATE) for code in codes]
+    monthly = lambda: [summary_service.generate_monthly_summary(code, REFERENCE_DATE) for code in codes]
+    record("weekly_summary/cold", measure(weekly, repeat, setup=fresh), len(codes), "stocks")
+    record("weekly_summary/warm", measure(weekly, repeat), len(codes), "stocks")
+    record("monthly_summary/cold", measure(monthly, repeat, setup=fresh), len(codes), "stocks")
+    record("monthly_summary/warm", measure(monthly, repeat), len(codes), "stocks")
+
+    # 4. Bulk writes of SAVE_DAYS trading days per stock
+    days = [REFERENCE_DATE - timedelta(days=i) for i in range(SAVE_DAYS * 7 // 5) if (REFERENCE_DATE - timedelta(days=i)).weekday() < 5][:SAVE_DAYS]
+    records = [TransactionData(code, f"Synthetic {code}", day, 100.0, 101.0, 102.0, 99.0, 1000) for code in codes for day in days]
+    record("save_transaction_data", measure(lambda: db_service.save_transaction_data(records), repeat, setup=fresh), len(records), "rows")
+    rows = [(d.stock_code, db_service.to_day_number(d.date), d.open_price, d.close_price, d.high_price, d.low_price, d.volume) for d in records]
+
+    def bulk_write():
+        with db_service.BulkWriter(relax_durability=True) as writer:
+            writer.add_rows(rows)
+
+    record("bulk_writer", measure(bulk_write, repeat, setup=fresh), len(rows), "rows")
+    return results
+
+def compare(current: List[Dict], baseline: List[Dict]):
+    """Prints the change in wall time of every benchmark present in both result sets."""
+    before = {result["name"]: result["seconds"] for result in baseline}
+    print(f"\n{'benchmark':<40} {'baseline':>10} {'current':>10} {'change':>8}")
+    for result in current:
+        if result["name"] in before:
+            change = (result["seconds"] / before[result["name"]] - 1) * 100
+            print(f"{result['name']:<40} {before[result['name']]:>9.4f}s {result['seconds']:>9.4f}s {change:>+7.1f}%")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline fetch, cache and summary benchmarks.")
+    parser.add_argument('--stocks', type=int, default=20, help='Number of stocks for the multi-stock benchmarks.')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per benchmark; the best time is reported.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds of simulated provider latency per request.')
+    parser.add_argument('--output', help='Write the results to this JSON file.')
+    parser.add_argument('--compare', metavar='BASELINE', help='Compare with the results in this JSON file.')
+    args = parser.parse_args()
+
+    # The synthetic provider has no rate limit, so requests are not spaced out
+    data_fetcher.REQUESTS_PER_SECOND = 0
+    data_fetcher._rate_limiters.clear()
+    source = SyntheticSource(latency=args.latency)
+    data_source.set_data_source(source)
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = run_suite(args.stocks, args.repeat, args.latency, os.path.join(directory, "bench.db"))
+        db_service.close_connection()
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "stocks": args.stocks,
+            "repeat": args.repeat,
+            "latency": args.latency,
+            "provider_requests": source.requests,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f)["results"])
+
+if __name__ == "__main__":
+    main()
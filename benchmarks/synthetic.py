@@ -0,0 +1,61 @@
+"""
+Deterministic, offline market data for the benchmarks.
+
+SyntheticSource implements the DataSource interface and generates daily bars for any ticker
+ending in one of the listed suffixes; other tickers behave like unknown ones. The same ticker
+always yields the same prices, so results are comparable between runs and commits.
+"""
+import time
+import zlib
+from datetime import date
+from typing import Any, Dict, List, Union
+
+import numpy as np
+import pandas as pd
+
+from src.services.data_source import DataSource
+
+class SyntheticSource(DataSource):
+    """Generates random-walk bars for business days, with an optional latency per request."""
+
+    def __init__(self, latency: float = 0.0, suffixes: tuple = (".TW",)):
+        self.latency = latency
+        self.suffixes = suffixes
+        self.requests = 0
+
+    def _bars(self, ticker: str, start_date: date, end_date: date) -> pd.DataFrame:
+        if not ticker.endswith(self.suffixes):
+            return pd.DataFrame()
+        # The walk always starts in 1990 with a per-ticker seed, so overlapping requests return the same bars
+        days = np.arange(np.datetime64("1990-01-01"), np.datetime64(end_date, 'D'), dtype='datetime64[D]')
+        index = pd.DatetimeIndex(days[np.is_busday(days)]) # pd.bdate_range builds each date in Python
+        rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+        close = 100 + np.abs(np.cumsum(rng.standard_normal(len(index))))
+        volume = rng.integers(1_000, 1_000_000, len(index))
+        keep = index >= pd.Timestamp(start_date)
+        return pd.DataFrame(
+            {'Open': close - 0.5, 'High': close + 1.0, 'Low': close - 1.0, 'Close': close, 'Volume': volume},
+            index=index
+        )[keep]
+
+    def download(self, tickers: Union[str, List[str]], start_date: date, end_date: date) -> pd.DataFrame:
+        self.requests += 1
+        time.sleep(self.latency)
+        if isinstance(tickers, str):
+            return self._bars(tickers, start_date, end_date)
+        frames = {ticker: self._bars(ticker, start_date, end_date) for ticker in tickers}
+        frames = {ticker: frame for ticker, frame in frames.items() if not frame.empty}
+        return pd.concat(frames, axis=1) if frames else pd.DataFrame()
+
+    def history(self, ticker: str, period: str = "1d") -> pd.DataFrame:
+        self.requests += 1
+        time.sleep(self.latency)
+        end = pd.Timestamp.today().normalize() + pd.Timedelta(days=1)
+        return self._bars(ticker, (end - pd.Timedelta(days=14)).date(), end.date()).tail(int(period.rstrip("d")))
+
+    def info(self, ticker: str) -> Dict[str, Any]:
+        self.requests += 1
+        time.sleep(self.latency)
+        if not ticker.endswith(self.suffixes):
+            return {}
+        return {"longName": f"Synthetic {ticker}", "marketCap": 1_000_000_000}
@@ -5,13 +5,18 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 import argparse
+import itertools
 import sys
 from datetime import date, datetime
-import pandas as pd
+from typing import TYPE_CHECKING, List
 
-from src.services import data_fetcher, summary_service
+from src.lib import concurrency, formatting, stats
+from src.services import data_fetcher, data_source, summary_service
 from src.services import db_service # Import db_service to initialize the DB
 
+if TYPE_CHECKING:
+    from src.services import server
+
 def _validate_and_parse_date(date_str: str) -> date:
     """Parses a date string and validates that it strictly matches the YYYY-MM-DD format."""
     dt_obj = datetime.strptime(date_str, "%Y-%m-%d")
@@ -19,11 +24,15 @@ def _validate_and_parse_date(date_str: str) -> date:
         raise ValueError("Date format is not strictly YYYY-MM-DD.")
     return dt_obj.date()
 
+def _positive_int(value: str) -> int:
+    """Parses a command-line value that must be a positive integer."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("must be a positive integer")
+    return number
+
 def main():
     """Main function to handle CLI arguments and orchestrate the data fetching and display."""
-    # Initialize the database at the start of the application
-    db_service.initialize_db()
-
     parser = argparse.ArgumentParser(description="Fetch Taiwan stock market data.")
     parser.add_argument(
         '--stocks',
@@ -40,6 +49,14 @@ def main():
         type=str,
         help='End date for query (YYYY-MM-DD).'
     )
+    parser.add_argument(
+        '--stream',
+        nargs='?',
+        const='table',
+        choices=formatting.STREAM_FORMATS,
+        help='With --start-date, write the rows of every stock to stdout as they are read, as a table (default), '
+             'csv or jsonl, without holding the range in memory.'
+    )
     parser.add_argument(
         '--weekly',
         action='store_true',
@@ -50,22 +67,268 @@ def main():
         action='store_true',
         help='Get a summary for the past month.'
     )
+    parser.add_argument(
+        '--weeks-back',
+        type=_positive_int,
+        metavar='N',
+        help='Get a summary per week for the current week and the N - 1 weeks before it.'
+    )
+    parser.add_argument(
+        '--months-back',
+        type=_positive_int,
+        metavar='N',
+        help='Get a summary per month for the N months before the current month.'
+    )
+    parser.add_argument(
+        '--interval',
+        choices=['week', 'month', 'quarter'],
+        help='Get a summary per week, month or quarter from --start-date to --end-date (or today).'
+    )
+    parser.add_argument(
+        '--snapshot',
+        nargs='?',
+        const='today',
+        metavar='DATE',
+        help='Get the data of every cached stock, or of --stocks, on DATE (YYYY-MM-DD, default: today). '
+             'Missing --stocks are downloaded together.'
+    )
     parser.add_argument(
         '--info',
         action='store_true',
         help='Get key investment metrics for a stock.'
     )
+    parser.add_argument(
+        '--workers',
+        type=_positive_int,
+        default=1,
+        help='Number of stocks to fetch concurrently (default: 1). Output keeps the order of --stocks.'
+    )
+    parser.add_argument(
+        '--backfill',
+        action='store_true',
+        help='Load the history of --stocks from --start-date (to --end-date or today) into the local database in bulk.'
+    )
+    parser.add_argument(
+        '--sync',
+        action='store_true',
+        help='Update the cached data of --stocks to today, downloading only the days after the latest cached date. '
+             'Stocks without cached data start at --start-date.'
+    )
+
+    parser.add_argument(
+        '--replay',
+        metavar='DIR',
+        help='Read market data from responses recorded with --record in DIR instead of Yahoo Finance.'
+    )
+    parser.add_argument(
+        '--replay-latency',
+        type=float,
+        default=0.0,
+        metavar='SECONDS',
+        help='Delay added to every replayed request (default: 0).'
+    )
+    parser.add_argument(
+        '--record',
+        metavar='DIR',
+        help='Record the Yahoo Finance responses in DIR for later use with --replay.'
+    )
+    parser.add_argument(
+        '--stats',
+        action='store_true',
+        help='Print timings, cache hit rates and network counters when done (to stderr with --stream).'
+    )
+    parser.add_argument(
+        '--stats-json',
+        metavar='FILE',
+        help='Write the statistics to FILE as JSON when done.'
+    )
+    parser.add_argument(
+        '--stats-prometheus',
+        metavar='FILE',
+        help='Write the statistics to FILE in the Prometheus text format when done.'
+    )
+    parser.add_argument(
+        '--serve',
+        action='store_true',
+        help='Keep running and answer queries over HTTP from the local database (see --host and --port).'
+    )
+    parser.add_argument(
+        '--host',
+        help='Address to listen on with --serve (default: 127.0.0.1).'
+    )
+    parser.add_argument(
+        '--port',
+        type=int,
+        help='Port to listen on with --serve (default: 8765).'
+    )
+    parser.add_argument(
+        '--server',
+        metavar='URL',
+        help='Send the query to a server started with --serve (e.g. "http://127.0.0.1:8765") instead of running it locally.'
+    )
 
     args = parser.parse_args()
     today = date.today()
 
+    # Initialize the database once the arguments are valid, so --help does not touch it.
+    # Queries sent to a server use the server's database instead.
+    if not args.server:
+        db_service.initialize_db()
+
+    if args.replay:
+        data_source.set_data_source(data_source.ReplaySource(args.replay, latency=args.replay_latency))
+    elif args.record:
+        data_source.set_data_source(data_source.RecordingSource(data_source.YFinanceSource(), args.record))
+
+    try:
+        _run(args, today)
+    except data_source.FetchError as e:
+        # Days that could not be downloaded stay missing, so a rerun fetches them
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        _report_stats(args)
+
+def _report_stats(args: argparse.Namespace):
+    """Prints or writes the collected statistics as requested on the command line."""
+    if args.stats:
+        # Streamed output is meant for other programs, so the summary must not end up in it
+        print(stats.format_summary(), file=sys.stderr if args.stream else sys.stdout)
+    if args.stats_json:
+        with open(args.stats_json, "w") as f:
+            f.write(stats.to_json())
+    if args.stats_prometheus:
+        with open(args.stats_prometheus, "w") as f:
+            f.write(stats.to_prometheus())
+
+def _run(args: argparse.Namespace, today: date):
+    """Runs the mode selected on the command line."""
+    if args.serve or args.server:
+        # The HTTP modules are only imported when needed, to keep the startup of local queries short
+        from src.services import server
+
+    if args.serve:
+        server.serve(args.host or server.DEFAULT_HOST, args.port or server.DEFAULT_PORT)
+        return
+
+    if args.server:
+        if args.backfill or args.sync:
+            print("Error: --backfill and --sync write to the local database and cannot be used with --server", file=sys.stderr)
+            sys.exit(1)
+        try:
+            _run_queries(args, today, server.QueryClient(args.server))
+        except (ValueError, ConnectionError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        return
+
+    _run_queries(args, today)
+
+def _run_queries(args: argparse.Namespace, today: date, client: "server.QueryClient" = None):
+    """Runs the query mode selected on the command line, locally or through client when given."""
+    if args.stream and not args.start_date:
+        print("Error: --start-date is required with --stream", file=sys.stderr)
+        sys.exit(1)
+
     if args.info:
         if not args.stocks:
             print("Error: --stocks is required with --info", file=sys.stderr)
             sys.exit(1)
         stock_codes = [code.strip() for code in args.stocks.split(',')]
-        for code in stock_codes:
-            summary_service.display_stock_info(code)
+        if client:
+            infos = client.info(stock_codes)
+        else:
+            infos = concurrency.map_ordered(summary_service.get_stock_info, stock_codes, args.workers)
+        for code, info in zip(stock_codes, infos):
+            summary_service.print_stock_info(code, info)
+
+    elif args.snapshot:
+        stock_codes = [code.strip() for code in args.stocks.split(',')] if args.stocks else None
+        try:
+            day = today if args.snapshot == 'today' else _validate_and_parse_date(args.snapshot)
+        except ValueError:
+            print("Invalid date format. Please use YYYY-MM-DD.", file=sys.stderr)
+            sys.exit(1)
+
+        if client:
+            records = client.snapshot(day, stock_codes)
+        else:
+            records = data_fetcher.snapshot(day, stock_codes)
+        print(f"--- Market Snapshot for {day} ({len(records)} stocks) ---")
+        if records:
+            with stats.timer("format.table"):
+                print(formatting.format_transactions(records))
+        else:
+            print("No data found on this date.")
+
+    elif args.backfill:
+        if not args.stocks or not args.start_date:
+            print("Error: --stocks and --start-date are required with --backfill", file=sys.stderr)
+            sys.exit(1)
+        stock_codes = [code.strip() for code in args.stocks.split(',')]
+        try:
+            start_date = _validate_and_parse_date(args.start_date)
+            end_date = _validate_and_parse_date(args.end_date) if args.end_date else today
+        except ValueError:
+            print("Invalid date format. Please use YYYY-MM-DD.", file=sys.stderr)
+            sys.exit(1)
+
+        # The database is a cache that a rerun can refill, so durability is relaxed during the load
+        with db_service.BulkWriter(relax_durability=True) as writer:
+            data_fetcher.backfill(stock_codes, start_date, end_date, writer)
+        print(f"Backfilled {writer.rows_written} rows for {len(stock_codes)} stocks "
+              f"in {writer.elapsed:.1f}s ({writer.rows_per_second:,.0f} rows/s).")
+
+    elif args.sync:
+        if not args.stocks:
+            print("Error: --stocks is required with --sync", file=sys.stderr)
+            sys.exit(1)
+        stock_codes = [code.strip() for code in args.stocks.split(',')]
+        try:
+            start_date = _validate_and_parse_date(args.start_date) if args.start_date else None
+        except ValueError:
+            print("Invalid date format. Please use YYYY-MM-DD.", file=sys.stderr)
+            sys.exit(1)
+
+        synced = data_fetcher.sync(stock_codes, today, start_date)
+        for stock_code in stock_codes:
+            print(f"{stock_code}: {synced.get(stock_code, 0)} rows synced")
+
+    elif args.interval or args.weeks_back or args.months_back:
+        if not args.stocks:
+            print("Error: --stocks is required with --interval, --weeks-back and --months-back", file=sys.stderr)
+            sys.exit(1)
+        stock_codes = [code.strip() for code in args.stocks.split(',')]
+        if args.interval:
+            if not args.start_date:
+                print("Error: --start-date is required with --interval", file=sys.stderr)
+                sys.exit(1)
+            try:
+                start_date = _validate_and_parse_date(args.start_date)
+                end_date = _validate_and_parse_date(args.end_date) if args.end_date else today
+            except ValueError:
+                print("Invalid date format. Please use YYYY-MM-DD.", file=sys.stderr)
+                sys.exit(1)
+            if start_date > end_date:
+                print("Start date cannot be after end date.", file=sys.stderr)
+                sys.exit(1)
+            period = args.interval
+        else:
+            period, count = ("week", args.weeks_back) if args.weeks_back else ("month", args.months_back)
+            start_date, end_date = summary_service.periods_back(today, period, count)
+
+        # Each stock's whole span is fetched once and split into periods in memory
+        if client:
+            results = client.periods(stock_codes, start_date, end_date, period)
+        else:
+            results = concurrency.map_ordered(
+                lambda code: summary_service.generate_period_summaries(code, start_date, end_date, period),
+                stock_codes,
+                args.workers
+            )
+        for code, summaries in zip(stock_codes, results):
+            print(f"--- {period.capitalize()}ly Summaries for {code} from {start_date} to {end_date} ---")
+            print(formatting.format_period_summaries(summaries))
 
     elif args.start_date:
         try:
@@ -85,6 +348,24 @@ def main():
             print("Start date cannot be after end date.", file=sys.stderr)
             sys.exit(1)
 
+        if args.stream:
+            _stream_range(stock_codes, start_date, end_date, args.stream, client)
+            return
+
+        if client:
+            data = client.ranges(stock_codes, start_date, end_date)
+            for stock_code in stock_codes:
+                summary_service.print_date_range_data(stock_code, start_date, end_date, data[stock_code])
+            return
+
+        if args.workers > 1:
+            # Warm the cache concurrently; the displays below then read from the database in order
+            concurrency.map_ordered(
+                lambda code: data_fetcher.fetch_stock_data_in_range(code, start_date, end_date, silent=True),
+                stock_codes,
+                args.workers
+            )
+
         for stock_code in stock_codes:
             summary_service.display_date_range_data(
                 stock_code=stock_code,
@@ -95,31 +376,35 @@ def main():
     elif args.weekly:
         print(f"--- Weekly Summary for Week Ending {today} ---")
         stock_codes = [code.strip() for code in args.stocks.split(',')]
-        for code in stock_codes:
-            summary = summary_service.generate_weekly_summary(code, today)
+        if client:
+            summaries = client.weekly(stock_codes, today)
+        else:
+            summaries = concurrency.map_ordered(
+                lambda code: summary_service.generate_weekly_summary(code, today), stock_codes, args.workers
+            )
+        for summary in summaries:
             if summary.data:
-                df = pd.DataFrame(summary.data)
-                # Reorder columns to place stock_name after stock_code
-                cols = ['stock_code', 'stock_name', 'date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume']
-                df_cols = [col for col in cols if col in df.columns]
-                df = df[df_cols]
-                print(df.to_string(index=False))
+                print(formatting.format_transactions(summary.data))
+                if summary.aggregate:
+                    print(formatting.format_period_stats(summary.aggregate))
             else:
                 print("No data found for this period.")
     
     elif args.monthly:
         print(f"--- Monthly Summary ---")
         stock_codes = [code.strip() for code in args.stocks.split(',')]
-        for code in stock_codes:
-            summary = summary_service.generate_monthly_summary(code, today)
+        if client:
+            summaries = client.monthly(stock_codes, today)
+        else:
+            summaries = concurrency.map_ordered(
+                lambda code: summary_service.generate_monthly_summary(code, today), stock_codes, args.workers
+            )
+        for code, summary in zip(stock_codes, summaries):
             print(f"\nStock: {code} (Month: {summary.month})")
             if summary.data:
-                df = pd.DataFrame(summary.data)
-                # Reorder columns to place stock_name after stock_code
-                cols = ['stock_code', 'stock_name', 'date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume']
-                df_cols = [col for col in cols if col in df.columns]
-                df = df[df_cols]
-                print(df.to_string(index=False))
+                print(formatting.format_transactions(summary.data))
+                if summary.aggregate:
+                    print(formatting.format_period_stats(summary.aggregate))
             else:
                 print("No data found for this period.")
 
@@ -127,22 +412,43 @@ def main():
         print(f"--- Daily Transaction Data for {today} ---")
         stock_codes = [code.strip() for code in args.stocks.split(',')]
         all_data = []
-        for code in stock_codes:
-            # For daily, we might need to fetch if not in DB
-            # The fetch_stock_data function handles caching
-            data = data_fetcher.fetch_stock_data(code, today)
+        # For daily, we might need to fetch if not in DB
+        # The fetch_stock_data function handles caching
+        if client:
+            results = client.daily(stock_codes, today)
+        else:
+            results = concurrency.map_ordered(
+                lambda code: data_fetcher.fetch_stock_data(code, today), stock_codes, args.workers
+            )
+        for data in results:
             if data:
                 all_data.extend(data)
         
         if all_data:
-            df = pd.DataFrame(all_data)
-            # Reorder columns to place stock_name after stock_code
-            cols = ['stock_code', 'stock_name', 'date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume']
-            df_cols = [col for col in cols if col in df.columns]
-            df = df[df_cols]
-            print(df.to_string(index=False))
+            # Columns are printed with stock_name after stock_code
+            with stats.timer("format.table"):
+                print(formatting.format_transactions(all_data))
         else:
             print("No data found for the specified stocks on this date.")
 
+def _stream_range(stock_codes: List[str], start_date: date, end_date: date, fmt: str, client: "server.QueryClient" = None):
+    """Writes the rows of a date range for every stock to stdout as they are read."""
+    if client:
+        # The server answers with whole ranges, so only the output is streamed
+        records = itertools.chain.from_iterable(client.ranges(stock_codes, start_date, end_date).values())
+    else:
+        # Missing days are downloaded first, then the database is read one cursor batch at a time
+        data_fetcher.cache_range(stock_codes, start_date, end_date, silent=True)
+        records = db_service.iter_transaction_data(stock_codes, start_date, end_date)
+    try:
+        with stats.timer("format.stream"):
+            formatting.write_transactions(records, sys.stdout, fmt)
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader (e.g. head) stopped early; send the rest of the output nowhere and exit quietly
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        sys.exit(1)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,67 @@
+import contextlib
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+def map_ordered(func: Callable[[T], R], items: Iterable[T], workers: int = 1) -> List[R]:
+    """
+    Applies func to every item on a bounded thread pool and returns the results in input order.
+    With a single worker the items are processed sequentially on the calling thread.
+    """
+    items = list(items)
+    if workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as executor:
+        return list(executor.map(func, items))
+
+class RateLimiter:
+    """Spaces out calls so that at most `rate` of them start per second, across all threads."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+
+    def wait(self):
+        """Blocks until the caller is allowed to make its next call."""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_time)
+            self._next_time = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+_stderr_lock = threading.Lock()
+_stderr_depth = 0
+_saved_stderr = None
+_devnull = None
+
+@contextlib.contextmanager
+def suppress_stderr():
+    """
+    Thread-safe replacement for redirect_stderr(devnull). contextlib.redirect_stderr swaps
+    sys.stderr for the whole process, so overlapping uses from worker threads can restore the
+    wrong stream. Here the first caller redirects and the last one to leave restores.
+    """
+    global _stderr_depth, _saved_stderr, _devnull
+    with _stderr_lock:
+        if _stderr_depth == 0:
+            _devnull = open(os.devnull, 'w')
+            _saved_stderr = sys.stderr
+            sys.stderr = _devnull
+        _stderr_depth += 1
+    try:
+        yield
+    finally:
+        with _stderr_lock:
+            _stderr_depth -= 1
+            if _stderr_depth == 0:
+                sys.stderr = _saved_stderr
+                _devnull.close()
+                _saved_stderr = _devnull = None
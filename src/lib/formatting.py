@@ -0,0 +1,113 @@
+import csv
+import json
+from datetime import date
+from typing import Any, Iterable, List, Sequence, TextIO
+
+# Display order of transaction data, matching db_service.TRANSACTION_COLUMNS
+TRANSACTION_COLUMNS = ['stock_code', 'stock_name', 'date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume']
+
+def _float_decimals(values: List[float]) -> int:
+    """Returns the number of decimals that shows every value of a float column, from 1 to 6."""
+    decimals = 1
+    for value in values:
+        fraction = f"{value:.6f}".rstrip("0").split(".")[1]
+        decimals = max(decimals, len(fraction))
+    return decimals
+
+def _format_column(values: List[Any]) -> List[str]:
+    """Formats the values of one column; float columns share a number of decimals, like pandas."""
+    if values and all(isinstance(v, float) for v in values):
+        decimals = _float_decimals(values)
+        return [f"{v:.{decimals}f}" for v in values]
+    return ["N/A" if v is None else v.isoformat() if isinstance(v, date) else str(v) for v in values]
+
+def format_table(rows: Sequence[Sequence[Any]], columns: Sequence[str]) -> str:
+    """
+    Formats rows as a plain-text table with a header line and right-aligned columns, in the
+    layout of DataFrame.to_string(index=False), without importing pandas.
+    """
+    cells = [_format_column([row[i] for row in rows]) for i in range(len(columns))]
+    widths = [max([len(name)] + [len(cell) for cell in column]) for name, column in zip(columns, cells)]
+    lines = [" ".join(name.rjust(width) for name, width in zip(columns, widths))]
+    for r in range(len(rows)):
+        lines.append(" ".join(column[r].rjust(width) for column, width in zip(cells, widths)))
+    return "\n".join(lines)
+
+def format_transactions(records: Iterable[Any], columns: Sequence[str] = TRANSACTION_COLUMNS) -> str:
+    """Formats TransactionData records (or any objects with these attributes) as a table."""
+    return format_table([[getattr(record, name) for name in columns] for record in records], columns)
+
+def format_period_stats(aggregate: Any) -> str:
+    """Formats a PeriodStats as a single line of period OHLCV, VWAP, return and volatility."""
+    vwap = "N/A" if aggregate.vwap is None else f"{aggregate.vwap:.2f}"
+    volatility = "N/A" if aggregate.volatility is None else f"{aggregate.volatility:.2%}"
+    return (
+        f"Open {aggregate.open_price:.2f}  High {aggregate.high_price:.2f}  Low {aggregate.low_price:.2f}  "
+        f"Close {aggregate.close_price:.2f}  Volume {aggregate.volume:,}  VWAP {vwap}  "
+        f"Return {aggregate.period_return:+.2%}  Volatility {volatility}"
+    )
+
+# Columns of format_period_summaries
+PERIOD_COLUMNS = ['period', 'start_date', 'end_date', 'open_price', 'high_price', 'low_price', 'close_price',
+                  'volume', 'vwap', 'return', 'volatility']
+
+def format_period_summaries(summaries: Iterable[Any]) -> str:
+    """Formats PeriodSummary objects as a table with one row of aggregates per period."""
+    rows = []
+    for summary in summaries:
+        aggregate = summary.aggregate
+        if aggregate is None:
+            rows.append([summary.label, summary.start_date, summary.end_date] + ["N/A"] * 8)
+            continue
+        rows.append([
+            summary.label, summary.start_date, summary.end_date,
+            f"{aggregate.open_price:.2f}", f"{aggregate.high_price:.2f}", f"{aggregate.low_price:.2f}",
+            f"{aggregate.close_price:.2f}", f"{aggregate.volume:,}",
+            "N/A" if aggregate.vwap is None else f"{aggregate.vwap:.2f}",
+            f"{aggregate.period_return:+.2%}",
+            "N/A" if aggregate.volatility is None else f"{aggregate.volatility:.2%}",
+        ])
+    return format_table(rows, PERIOD_COLUMNS)
+
+# Formats of write_transactions
+STREAM_FORMATS = ("table", "csv", "jsonl")
+# Column widths of a streamed table, which cannot be measured without holding every row
+STREAM_WIDTHS = {'stock_code': 10, 'stock_name': 24, 'date': 10, 'open_price': 10, 'high_price': 10,
+                 'low_price': 10, 'close_price': 11, 'volume': 12}
+
+def _plain(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, date) else value
+
+def write_transactions(records: Iterable[Any], out: TextIO, fmt: str = "table",
+                       columns: Sequence[str] = TRANSACTION_COLUMNS) -> int:
+    """
+    Writes TransactionData records to out one row at a time, as a table with fixed column
+    widths (prices with 2 decimals), as CSV with a header line, or as JSON lines. Nothing is
+    kept after a row is written, so records can be a generator of any length.
+    Returns the number of records written.
+    """
+    if fmt not in STREAM_FORMATS:
+        raise ValueError(f"Unknown format: {fmt}. Use one of {', '.join(STREAM_FORMATS)}.")
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(out, lineterminator="\n")
+        writer.writerow(columns)
+        for record in records:
+            writer.writerow([_plain(getattr(record, name)) for name in columns])
+            count += 1
+    elif fmt == "jsonl":
+        for record in records:
+            out.write(json.dumps({name: _plain(getattr(record, name)) for name in columns}, ensure_ascii=False) + "\n")
+            count += 1
+    else:
+        widths = [max(len(name), STREAM_WIDTHS.get(name, 0)) for name in columns]
+        out.write(" ".join(name.rjust(width) for name, width in zip(columns, widths)) + "\n")
+        for record in records:
+            cells = []
+            for name, width in zip(columns, widths):
+                value = getattr(record, name)
+                cell = f"{value:.2f}" if isinstance(value, float) else "N/A" if value is None else str(_plain(value))
+                cells.append(cell.rjust(width))
+            out.write(" ".join(cells) + "\n")
+            count += 1
+    return count
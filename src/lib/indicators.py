@@ -0,0 +1,126 @@
+from typing import Dict
+
+import numpy as np
+
+# Vectorized aggregates and rolling indicators over the price arrays of a PriceSeries or of
+# db_service.get_transaction_arrays. Rolling indicators are NaN until their window is full.
+
+# Periods that daily rows can be aggregated into
+PERIODS = ("week", "month", "quarter")
+
+def period_keys(dates: np.ndarray, period: str) -> np.ndarray:
+    """Returns an integer per datetime64[D] date that is equal for all dates of the same period."""
+    if period == "week":
+        # Day 0 (1970-01-01) is a Thursday, so shifting by 3 days makes weeks start on Monday
+        return (dates.astype('int64') + 3) // 7
+    if period == "month":
+        return dates.astype('datetime64[M]').astype('int64')
+    if period == "quarter":
+        return dates.astype('datetime64[M]').astype('int64') // 3
+    raise ValueError(f"Unknown period: {period}. Use one of {', '.join(PERIODS)}.")
+
+def group_starts(*keys: np.ndarray) -> np.ndarray:
+    """
+    Returns the index of the first row of every group of consecutive rows with equal keys.
+    The rows must be sorted so that each group is contiguous (e.g., by stock code and date).
+    """
+    if len(keys[0]) == 0:
+        return np.empty(0, dtype='int64')
+    changed = np.zeros(len(keys[0]) - 1, dtype=bool)
+    for key in keys:
+        changed |= key[1:] != key[:-1]
+    return np.flatnonzero(np.r_[True, changed])
+
+def aggregate(starts: np.ndarray, opens: np.ndarray, highs: np.ndarray, lows: np.ndarray,
+              closes: np.ndarray, volumes: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Aggregates daily rows into periods in one pass, given the first row of each period
+    (see group_starts). Returns one array per statistic with an element per period:
+    first/last (row indices), open, high, low, close, volume, vwap, return, volatility
+    and trading_days.
+
+    The VWAP weights the typical price (high + low + close) / 3 by volume, since only daily
+    bars are stored. The return is close / open - 1 over the period, and the volatility is
+    the sample standard deviation of the daily close-to-close returns within the period.
+    """
+    if len(starts) == 0:
+        empty = np.empty(0, dtype='float64')
+        return {
+            "first": starts, "last": starts, "open": empty, "high": empty, "low": empty, "close": empty,
+            "volume": np.empty(0, dtype='int64'), "vwap": empty, "return": empty, "volatility": empty,
+            "trading_days": np.empty(0, dtype='int64'),
+        }
+    ends = np.r_[starts[1:], len(closes)]
+    lengths = ends - starts
+    volume = np.add.reduceat(volumes, starts)
+    turnover = np.add.reduceat((highs + lows + closes) / 3 * volumes, starts)
+
+    # Daily returns, without the first day of each period, which has no previous close inside it
+    daily = np.full(len(closes), np.nan)
+    daily[1:] = closes[1:] / closes[:-1] - 1
+    daily[starts] = np.nan
+    valid = ~np.isnan(daily)
+    count = np.add.reduceat(valid.astype('int64'), starts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vwap = np.where(volume > 0, turnover / volume, np.nan)
+        mean = np.add.reduceat(np.where(valid, daily, 0.0), starts) / count
+        deviations = np.where(valid, daily - np.repeat(mean, lengths), 0.0)
+        variance = np.add.reduceat(deviations ** 2, starts) / (count - 1)
+        volatility = np.where(count > 1, np.sqrt(variance), np.nan)
+        period_return = closes[ends - 1] / opens[starts] - 1
+
+    return {
+        "first": starts,
+        "last": ends - 1,
+        "open": opens[starts],
+        "high": np.maximum.reduceat(highs, starts),
+        "low": np.minimum.reduceat(lows, starts),
+        "close": closes[ends - 1],
+        "volume": volume,
+        "vwap": vwap,
+        "return": period_return,
+        "volatility": volatility,
+        "trading_days": lengths,
+    }
+
+def sma(values: np.ndarray, window: int) -> np.ndarray:
+    """Simple moving average over the last window values."""
+    values = np.asarray(values, dtype='float64')
+    result = np.full(len(values), np.nan)
+    if 0 < window <= len(values):
+        result[window - 1:] = np.lib.stride_tricks.sliding_window_view(values, window).mean(axis=1)
+    return result
+
+def _smooth(values: np.ndarray, **ewm) -> np.ndarray:
+    """Exponentially weighted mean, seeded with the first value (pandas' adjust=False)."""
+    import pandas as pd
+
+    return pd.Series(values, dtype='float64').ewm(adjust=False, **ewm).mean().to_numpy()
+
+def ema(values: np.ndarray, span: int) -> np.ndarray:
+    """Exponential moving average with smoothing factor 2 / (span + 1)."""
+    return _smooth(values, span=span, min_periods=span)
+
+def rsi(closes: np.ndarray, period: int = 14) -> np.ndarray:
+    """
+    Relative strength index (0 to 100) with Wilder's smoothing of gains and losses. A window
+    without any gain or loss (a flat price) has the neutral value 50.
+    """
+    closes = np.asarray(closes, dtype='float64')
+    result = np.full(len(closes), np.nan)
+    if len(closes) < 2:
+        return result
+    delta = np.diff(closes)
+    gains = _smooth(np.clip(delta, 0, None), alpha=1 / period, min_periods=period)
+    losses = _smooth(np.clip(-delta, 0, None), alpha=1 / period, min_periods=period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result[1:] = np.where(losses == 0, np.where(gains == 0, 50.0, 100.0), 100 - 100 / (1 + gains / losses))
+    result[1:][np.isnan(gains)] = np.nan
+    return result
+
+def atr(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int = 14) -> np.ndarray:
+    """Average true range with Wilder's smoothing. The first day's true range is high - low."""
+    highs, lows, closes = (np.asarray(a, dtype='float64') for a in (highs, lows, closes))
+    previous = np.r_[np.nan, closes[:-1]]
+    true_range = np.fmax(highs - lows, np.fmax(np.abs(highs - previous), np.abs(lows - previous)))
+    return _smooth(true_range, alpha=1 / period, min_periods=period)
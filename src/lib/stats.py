@@ -0,0 +1,102 @@
+import contextlib
+import functools
+import json
+import threading
+import time
+from typing import Callable, Dict, Iterator
+
+# Process-wide counters and timers, shared by all threads. Names are dotted paths such as
+# "cache.day.hit" or "network.download"; they are grouped by their first component in summaries.
+_lock = threading.Lock()
+_counters: Dict[str, float] = {}
+_timers: Dict[str, Dict[str, float]] = {}
+
+def increment(name: str, value: float = 1):
+    """Adds value to the counter called name."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+def record_time(name: str, seconds: float):
+    """Adds one call taking seconds to the timer called name."""
+    with _lock:
+        timer = _timers.get(name)
+        if timer is None:
+            timer = _timers[name] = {"count": 0, "total": 0.0, "max": 0.0}
+        timer["count"] += 1
+        timer["total"] += seconds
+        timer["max"] = max(timer["max"], seconds)
+
+@contextlib.contextmanager
+def timer(name: str) -> Iterator[None]:
+    """Times the enclosed block under the timer called name, also when it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_time(name, time.perf_counter() - start)
+
+def timed(name: str) -> Callable:
+    """Decorator that times every call of a function under the timer called name."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def reset():
+    """Clears all counters and timers."""
+    with _lock:
+        _counters.clear()
+        _timers.clear()
+
+def snapshot() -> Dict[str, Dict]:
+    """Returns a copy of all counters and timers."""
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "timers": {name: dict(timer) for name, timer in _timers.items()},
+        }
+
+def format_summary() -> str:
+    """Formats the counters and timers as a human-readable table, with a hit rate per cache."""
+    data = snapshot()
+    lines = ["--- Statistics ---"]
+    for name, value in sorted(data["counters"].items()):
+        lines.append(f"{name:<32} {value:>14,.0f}")
+    caches = sorted({name.rsplit(".", 1)[0] for name in data["counters"] if name.startswith("cache.")})
+    for cache in caches:
+        hits = data["counters"].get(f"{cache}.hit", 0)
+        misses = data["counters"].get(f"{cache}.miss", 0)
+        if hits + misses:
+            lines.append(f"{cache + ' hit rate':<32} {hits / (hits + misses):>14.1%}")
+    if data["timers"]:
+        lines.append(f"{'timer':<32} {'calls':>8} {'total':>10} {'mean':>10} {'max':>10}")
+        for name, timer in sorted(data["timers"].items()):
+            mean = timer["total"] / timer["count"] if timer["count"] else 0.0
+            lines.append(f"{name:<32} {timer['count']:>8} {timer['total']:>9.3f}s {mean * 1000:>8.2f}ms {timer['max'] * 1000:>8.2f}ms")
+    return "\n".join(lines)
+
+def to_json() -> str:
+    """Dumps the counters and timers as JSON."""
+    return json.dumps(snapshot(), indent=2, sort_keys=True)
+
+def to_prometheus(prefix: str = "twstockfetcher") -> str:
+    """
+    Dumps the counters and timers in the Prometheus text exposition format. Counters become
+    <prefix>_<name>_total and timers become summaries <prefix>_<name>_seconds (count and sum).
+    """
+    data = snapshot()
+    lines = []
+    for name, value in sorted(data["counters"].items()):
+        metric = f"{prefix}_{name.replace('.', '_')}_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {value:g}"]
+    for name, timer in sorted(data["timers"].items()):
+        metric = f"{prefix}_{name.replace('.', '_')}_seconds"
+        lines += [
+            f"# TYPE {metric} summary",
+            f"{metric}_count {timer['count']}",
+            f"{metric}_sum {timer['total']:.6f}",
+        ]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,69 @@
+from datetime import date, timedelta
+from typing import Iterable, List, Set, Tuple
+
+# Fixed-date national holidays on which TWSE and TPEx are closed when they fall on a weekday.
+# Lunar holidays (Lunar New Year, Dragon Boat, Mid-Autumn) and make-up days move every year,
+# so they are not listed here; the data fetcher learns them per stock as "no-data days".
+# The list is not year-aware, so it only skips days when looking for gaps in a range; a
+# request for one of these days alone is still asked of the data source.
+FIXED_HOLIDAYS = {
+    (1, 1),    # Founding Day
+    (2, 28),   # Peace Memorial Day
+    (4, 4),    # Children's Day
+    (5, 1),    # Labor Day
+    (10, 10),  # National Day
+}
+
+def is_trading_day(day: date) -> bool:
+    """Returns True if the market is expected to be open on the given day."""
+    return day.weekday() < 5 and (day.month, day.day) not in FIXED_HOLIDAYS
+
+def is_weekday(day: date) -> bool:
+    """Returns True from Monday to Friday, including the fixed holidays."""
+    return day.weekday() < 5
+
+def trading_days(start_date: date, end_date: date) -> List[date]:
+    """Returns the expected trading days between start_date and end_date, inclusive."""
+    days = []
+    current_date = start_date
+    while current_date <= end_date:
+        if is_trading_day(current_date):
+            days.append(current_date)
+        current_date += timedelta(days=1)
+    return days
+
+def missing_ranges(start_date: date, end_date: date, known_dates: Iterable[date]) -> List[Tuple[date, date]]:
+    """
+    Returns the trading days between start_date and end_date that are not in known_dates,
+    grouped into contiguous (start, end) ranges. Non-trading days between two missing days
+    do not split a range, so each range can be fetched with a single download.
+    """
+    known: Set[date] = set(known_dates)
+    ranges = []
+    gap_start = gap_end = None
+    for day in trading_days(start_date, end_date):
+        if day in known:
+            if gap_start is not None:
+                ranges.append((gap_start, gap_end))
+                gap_start = None
+        else:
+            if gap_start is None:
+                gap_start = day
+            gap_end = day
+    if gap_start is not None:
+        ranges.append((gap_start, gap_end))
+    return ranges
+
+def period_bounds(day: date, period: str) -> Tuple[date, date]:
+    """Returns the first and last calendar day of the week (Monday to Sunday), month or quarter containing day."""
+    if period == "week":
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    if period in ("month", "quarter"):
+        months = 3 if period == "quarter" else 1
+        start = day.replace(month=day.month - (day.month - 1) % months, day=1)
+        end = start
+        for _ in range(months):
+            end = (end + timedelta(days=31)).replace(day=1)
+        return start, end - timedelta(days=1)
+    raise ValueError(f"Unknown period: {period}. Use week, month or quarter.")
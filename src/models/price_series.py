@@ -0,0 +1,163 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Union
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+from .stock_data import TransactionData
+
+# Column order of to_frame(), matching db_service.TRANSACTION_COLUMNS and the CLI's display order
+FRAME_COLUMNS = ['stock_code', 'stock_name', 'date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume']
+
+# Array fields, compared element by element in __eq__
+ARRAY_FIELDS = ('dates', 'open_prices', 'high_prices', 'low_prices', 'close_prices', 'volumes')
+
+@dataclass(eq=False)
+class PriceSeries:
+    """
+    Represents the daily transaction data for one stock in columnar form.
+    The stock code and name are stored once; dates (datetime64[D]) and OHLCV values are
+    typed NumPy arrays of equal length, sorted by date. Slices share memory with the original.
+    """
+    stock_code: str
+    stock_name: str
+    dates: np.ndarray
+    open_prices: np.ndarray
+    high_prices: np.ndarray
+    low_prices: np.ndarray
+    close_prices: np.ndarray
+    volumes: np.ndarray
+
+    def __eq__(self, other) -> bool:
+        """Series are equal if they hold the same stock and the same rows; the generated __eq__ cannot compare arrays."""
+        if not isinstance(other, PriceSeries):
+            return NotImplemented
+        return (
+            self.stock_code == other.stock_code
+            and self.stock_name == other.stock_name
+            and all(np.array_equal(getattr(self, name), getattr(other, name)) for name in ARRAY_FIELDS)
+        )
+
+    @classmethod
+    def empty(cls, stock_code: str, stock_name: str = None) -> "PriceSeries":
+        """Creates a series without any rows."""
+        prices = np.empty(0, dtype='float64')
+        return cls(stock_code, stock_name or stock_code, np.empty(0, dtype='datetime64[D]'),
+                   prices, prices, prices, prices, np.empty(0, dtype='int64'))
+
+    @classmethod
+    def from_records(cls, records: Iterable[TransactionData], stock_code: str = None) -> "PriceSeries":
+        """Creates a series from TransactionData objects of a single stock, sorting them by date."""
+        records = sorted(records, key=lambda d: d.date)
+        if not records:
+            return cls.empty(stock_code)
+        return cls(
+            stock_code=records[0].stock_code,
+            stock_name=records[0].stock_name,
+            dates=np.array([d.date for d in records], dtype='datetime64[D]'),
+            open_prices=np.array([d.open_price for d in records], dtype='float64'),
+            high_prices=np.array([d.high_price for d in records], dtype='float64'),
+            low_prices=np.array([d.low_price for d in records], dtype='float64'),
+            close_prices=np.array([d.close_price for d in records], dtype='float64'),
+            volumes=np.array([d.volume for d in records], dtype='int64'),
+        )
+
+    @classmethod
+    def from_frame(cls, df: "pd.DataFrame", stock_code: str = None) -> "PriceSeries":
+        """Creates a series from a single-stock DataFrame with the columns in FRAME_COLUMNS."""
+        if df.empty:
+            return cls.empty(stock_code)
+        df = df.sort_values('date')
+        return cls(
+            stock_code=df['stock_code'].iloc[0],
+            stock_name=df['stock_name'].iloc[0],
+            dates=df['date'].to_numpy(dtype='datetime64[D]'),
+            open_prices=df['open_price'].to_numpy(dtype='float64'),
+            high_prices=df['high_price'].to_numpy(dtype='float64'),
+            low_prices=df['low_price'].to_numpy(dtype='float64'),
+            close_prices=df['close_price'].to_numpy(dtype='float64'),
+            volumes=df['volume'].to_numpy(dtype='int64'),
+        )
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[TransactionData, "PriceSeries"]:
+        """Returns a TransactionData for an integer index and a PriceSeries view for a slice."""
+        if isinstance(index, slice):
+            return PriceSeries(
+                self.stock_code, self.stock_name, self.dates[index], self.open_prices[index],
+                self.high_prices[index], self.low_prices[index], self.close_prices[index], self.volumes[index],
+            )
+        return TransactionData(
+            stock_code=self.stock_code,
+            stock_name=self.stock_name,
+            date=self.dates[index].item(),
+            open_price=self.open_prices[index].item(),
+            close_price=self.close_prices[index].item(),
+            high_price=self.high_prices[index].item(),
+            low_price=self.low_prices[index].item(),
+            volume=self.volumes[index].item(),
+        )
+
+    def __iter__(self) -> Iterator[TransactionData]:
+        return (self[i] for i in range(len(self)))
+
+    def between(self, start_date: date, end_date: date) -> "PriceSeries":
+        """Returns the rows from start_date to end_date, inclusive, as a view found by binary search."""
+        start = np.searchsorted(self.dates, np.datetime64(start_date, 'D'), side='left')
+        end = np.searchsorted(self.dates, np.datetime64(end_date, 'D'), side='right')
+        return self[start:end]
+
+    def to_records(self) -> List[TransactionData]:
+        """Converts the series to a list of TransactionData objects."""
+        return list(self)
+
+    def to_frame(self) -> "pd.DataFrame":
+        """Converts the series to a DataFrame with the columns in FRAME_COLUMNS."""
+        import pandas as pd
+
+        return pd.DataFrame({
+            'stock_code': self.stock_code,
+            'stock_name': self.stock_name,
+            'date': self.dates,
+            'open_price': self.open_prices,
+            'high_price': self.high_prices,
+            'low_price': self.low_prices,
+            'close_price': self.close_prices,
+            'volume': self.volumes,
+        }, columns=FRAME_COLUMNS, index=pd.RangeIndex(len(self)))
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the arrays, in bytes."""
+        return sum(a.nbytes for a in (self.dates, self.open_prices, self.high_prices,
+                                      self.low_prices, self.close_prices, self.volumes))
+
+def series_from_arrays(arrays: Dict[str, np.ndarray]) -> Dict[str, PriceSeries]:
+    """
+    Splits the column arrays returned by db_service.get_transaction_arrays, which are ordered
+    by stock code and date, into one PriceSeries per stock code. The series are views.
+    """
+    codes = arrays['stock_code']
+    if len(codes) == 0:
+        return {}
+    # Rows are grouped by stock code, so each code starts where the value changes
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    ends = np.r_[starts[1:], len(codes)]
+    return {
+        codes[start]: PriceSeries(
+            stock_code=codes[start],
+            stock_name=arrays['stock_name'][start],
+            dates=arrays['date'][start:end],
+            open_prices=arrays['open_price'][start:end],
+            high_prices=arrays['high_price'][start:end],
+            low_prices=arrays['low_price'][start:end],
+            close_prices=arrays['close_price'][start:end],
+            volumes=arrays['volume'][start:end],
+        )
+        for start, end in zip(starts, ends)
+    }
@@ -1,14 +1,19 @@
 from dataclasses import dataclass
 from datetime import date
-from typing import List
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from .price_series import PriceSeries
 
 @dataclass
 class Stock:
     """Represents a stock in the Taiwan stock market."""
     stock_code: str
-    stock_name: str
+    stock_name: Optional[str]
+    market: Optional[str] = None  # "TWSE" for listed stocks, "TPEx" for over-the-counter stocks
+    suffix: Optional[str] = None  # yfinance ticker suffix, e.g., ".TW" or ".TWO"
 
-@dataclass
+@dataclass(slots=True)
 class TransactionData:
     """Represents the daily transaction data for a stock."""
     stock_code: str
@@ -20,17 +25,46 @@ class TransactionData:
     low_price: float
     volume: int
 
+@dataclass
+class PeriodStats:
+    """Represents the transaction data of a stock aggregated over a period, e.g., a week."""
+    stock_code: str
+    start_date: date  # first trading day with data in the period
+    end_date: date  # last trading day with data in the period
+    open_price: float
+    high_price: float
+    low_price: float
+    close_price: float
+    volume: int
+    vwap: Optional[float]  # volume-weighted average of the daily typical price (high + low + close) / 3
+    period_return: float  # close / open - 1
+    volatility: Optional[float]  # sample standard deviation of the daily returns in the period
+    trading_days: int
+
 @dataclass
 class WeeklySummary:
     """Represents the summary of transaction data for a week."""
     stock_code: str
     start_date: date
     end_date: date
-    data: List[TransactionData]
+    data: "PriceSeries"
+    aggregate: Optional[PeriodStats] = None  # None when there is no data for the week
 
 @dataclass
 class MonthlySummary:
     """Represents the summary of transaction data for a month."""
     stock_code: str
     month: str  # e.g., "2025-09"
-    data: List[TransactionData]
+    data: "PriceSeries"
+    aggregate: Optional[PeriodStats] = None  # None when there is no data for the month
+
+@dataclass
+class PeriodSummary:
+    """Represents the summary of transaction data for one of several consecutive periods."""
+    stock_code: str
+    period: str  # "week", "month" or "quarter"
+    label: str  # e.g., "2025-09-29" (the Monday), "2025-09" or "2025-Q3"
+    start_date: date
+    end_date: date
+    data: "PriceSeries"
+    aggregate: Optional[PeriodStats] = None  # None when there is no data for the period
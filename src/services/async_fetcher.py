@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import sqlite3
+from datetime import date
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+from ..models.stock_data import TransactionData
+from . import data_fetcher, summary_service
+from .data_source import FetchError
+
+if TYPE_CHECKING:
+    from ..models.price_series import PriceSeries
+
+# Default number of blocking fetches that may run at the same time
+MAX_CONCURRENCY = 8
+# Default number of attempts per call, and the delay in seconds before the first retry (doubled after each failure)
+RETRIES = 3
+BACKOFF = 0.5
+# Errors that may pass on their own: a failed download, or a database locked by another writer.
+# Anything else (a bad date, a bug) would fail the same way again, so it is raised at once.
+RETRIABLE_ERRORS = (FetchError, sqlite3.OperationalError)
+
+logger = logging.getLogger(__name__)
+
+class AsyncFetcher:
+    """
+    Asynchronous front end to data_fetcher for use inside an asyncio event loop.
+    The blocking yfinance and SQLite calls run in worker threads via asyncio.to_thread, at most
+    max_concurrency at a time, so the event loop is never blocked. Calls that raise one of RETRIABLE_ERRORS
+    (a FetchError from a failed download or a locked database) are retried with exponential backoff and
+    each retry is logged as a warning. Cache writes from concurrent
+    calls are safe: every worker thread has its own SQLite connection, and WAL mode with a busy
+    timeout serializes the writers. Requests to Yahoo Finance stay rate-limited by data_fetcher.throttle.
+    """
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY, retries: int = RETRIES, backoff: float = BACKOFF):
+        self.retries = retries
+        self.backoff = backoff
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Runs a blocking function in a worker thread under the semaphore, retrying on RETRIABLE_ERRORS."""
+        delay = self.backoff
+        for attempt in range(1, self.retries + 1):
+            async with self._semaphore:
+                try:
+                    return await asyncio.to_thread(func, *args, **kwargs)
+                except RETRIABLE_ERRORS as e:
+                    if attempt >= self.retries:
+                        raise
+                    logger.warning("Request failed (%s); retrying in %.1fs.", e, delay)
+            # Wait outside the semaphore so other calls can use the slot
+            await asyncio.sleep(delay)
+            delay *= 2
+
+    async def fetch_stock_data(self, stock_code: str, fetch_date: date, silent: bool = False) -> List[TransactionData]:
+        """Asynchronous version of data_fetcher.fetch_stock_data."""
+        return await self._call(data_fetcher.fetch_stock_data, stock_code, fetch_date, silent)
+
+    async def fetch_stock_data_in_range(self, stock_code: str, start_date: date, end_date: date, silent: bool = False) -> List[TransactionData]:
+        """Asynchronous version of data_fetcher.fetch_stock_data_in_range."""
+        return await self._call(data_fetcher.fetch_stock_data_in_range, stock_code, start_date, end_date, silent)
+
+    async def fetch_price_series_in_range(self, stock_code: str, start_date: date, end_date: date, silent: bool = False) -> "PriceSeries":
+        """Asynchronous version of data_fetcher.fetch_price_series_in_range."""
+        return await self._call(data_fetcher.fetch_price_series_in_range, stock_code, start_date, end_date, silent)
+
+    async def fetch_many(self, stock_codes: List[str], start_date: date, end_date: date) -> Dict[str, List[TransactionData]]:
+        """Asynchronous version of data_fetcher.fetch_many, which downloads the codes in batches."""
+        return await self._call(data_fetcher.fetch_many, stock_codes, start_date, end_date)
+
+    async def fetch_ranges(self, stock_codes: List[str], start_date: date, end_date: date, silent: bool = True) -> Dict[str, List[TransactionData]]:
+        """Fetches a date range for many stock codes concurrently, returning the rows per code in input order."""
+        results = await asyncio.gather(*(
+            self.fetch_stock_data_in_range(stock_code, start_date, end_date, silent) for stock_code in stock_codes
+        ))
+        return dict(zip(stock_codes, results))
+
+    async def get_stock_info(self, stock_code: str) -> Optional[Dict[str, Any]]:
+        """Asynchronous version of summary_service.get_stock_info."""
+        return await self._call(summary_service.get_stock_info, stock_code)
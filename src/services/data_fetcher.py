@@ -1,84 +1,319 @@
-from datetime import date, timedelta
-from typing import List, Tuple, Optional
-import yfinance as yf
-import pandas as pd
-import os
-import contextlib
-
-from ..models.stock_data import TransactionData
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, Dict, List, Tuple, Optional, Union
+
+from ..lib import concurrency, stats, trading_calendar
+from ..models.stock_data import Stock, TransactionData
 from . import db_service
+from .data_source import FetchError, get_data_source
 
-# Cache for stock names to avoid repeated API calls
-_stock_name_cache = {}
+if TYPE_CHECKING:
+    import pandas as pd
+    from ..models.price_series import PriceSeries
 
-def _get_stock_name(stock_code: str, ticker: str) -> str:
-    """Gets the stock name from cache or yfinance, defaulting to stock_code on failure."""
-    if stock_code in _stock_name_cache:
-        return _stock_name_cache[stock_code]
-    
+# Ticker suffixes for listed (TWSE) and over-the-counter (TPEx) stocks, in the order they are tried
+SUFFIXES = [".TW", ".TWO"]
+MARKETS = {".TW": "TWSE", ".TWO": "TPEx"}
+
+# How long a "no data" result for the current trading day is trusted before asking again
+NO_DATA_TTL = timedelta(minutes=30)
+# How long a suffix is skipped after the other suffix returned data for the same code
+SUFFIX_MISS_TTL = timedelta(days=30)
+# How long a code is treated as unknown after every suffix came back empty over a long range
+UNKNOWN_TICKER_TTL = timedelta(days=1)
+# Minimum number of trading days a download must cover for an empty result to mean "unknown code"
+UNKNOWN_TICKER_MIN_DAYS = 10
+# How long a stored stock name is used before it is looked up again
+NAME_REFRESH_INTERVAL = timedelta(days=30)
+# Maximum number of tickers requested in one multi-ticker yf.download call
+BATCH_SIZE = 50
+# How far before the latest cached date a sync starts, so recently revised bars are replaced
+SYNC_OVERLAP = timedelta(days=7)
+
+# All yfinance requests go to Yahoo Finance; requests to one host are spaced out across worker threads
+YAHOO_HOST = "finance.yahoo.com"
+REQUESTS_PER_SECOND = 4.0
+_rate_limiters = {}
+
+def throttle(host: str = YAHOO_HOST):
+    """Waits until another request to the given host is allowed under REQUESTS_PER_SECOND."""
+    limiter = _rate_limiters.get(host)
+    if limiter is None:
+        limiter = _rate_limiters.setdefault(host, concurrency.RateLimiter(REQUESTS_PER_SECOND))
+    with stats.timer("network.throttle_wait"):
+        limiter.wait()
+
+def _download(tickers: Union[str, List[str]], start_date: date, end_date: date) -> "pd.DataFrame":
+    """
+    Downloads from the data source after throttling, counting the request, the rows received and the
+    in-memory size of the frames (network.frame_bytes; the response size is not known to the data source).
+    Any failure of the data source is raised as FetchError, so it is never mistaken for a day without data.
+    """
+    throttle()
     try:
-        name = yf.Ticker(ticker).info.get('longName', stock_code)
-        _stock_name_cache[stock_code] = name
-        return name
+        with stats.timer("network.download"):
+            df = get_data_source().download(tickers, start_date, end_date)
+    except FetchError as e:
+        stats.increment("network.errors")
+        _count_frame(e.frame)
+        raise
+    except Exception as e:
+        stats.increment("network.errors")
+        names = tickers if isinstance(tickers, str) else ", ".join(tickers)
+        raise FetchError(f"Could not fetch data for {names}: {e}") from e
+    _count_frame(df)
+    return df
+
+def _count_frame(df: Optional["pd.DataFrame"]):
+    """Counts the rows and in-memory size of a downloaded frame."""
+    if df is not None and not df.empty:
+        stats.increment("network.rows", len(df))
+        stats.increment("network.frame_bytes", int(df.memory_usage(deep=False).sum()))
+
+def _lookup_stock_name(ticker: str) -> Optional[str]:
+    """Looks up the long name of a ticker with the data source, returning None on failure."""
+    try:
+        throttle()
+        with stats.timer("network.info"):
+            return get_data_source().info(ticker).get('longName')
     except Exception:
-        # On any exception, just use the stock code as the name and cache it
-        _stock_name_cache[stock_code] = stock_code
-        return stock_code
+        return None
 
-def _fetch_with_suffix_handling(stock_code: str, start_date: date, end_date: date) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+def _get_stock_name(stock_code: str, ticker: str) -> str:
+    """
+    Gets the stock name from the database, or from yfinance when it is missing or older than
+    NAME_REFRESH_INTERVAL. Defaults to a stale stored name or the stock_code on failure.
+    """
+    names = db_service.get_stock_names([stock_code], updated_after=datetime.now() - NAME_REFRESH_INTERVAL)
+    if stock_code in names:
+        stats.increment("cache.name.hit")
+        return names[stock_code]
+
+    stats.increment("cache.name.miss")
+    name = _lookup_stock_name(ticker)
+    if name:
+        db_service.save_stock_names({stock_code: name})
+        return name
+    # On failure, fall back to any stored name, then to the stock code
+    return db_service.get_stock_names([stock_code]).get(stock_code, stock_code)
+
+def prefetch_stock_names(stock_codes: List[str]) -> Dict[str, str]:
+    """
+    Loads the names for many stock codes with one database query. Codes whose name is missing
+    or stale are looked up with yfinance, provided their ticker suffix is already known, and
+    all new names are saved in one batch. Returns the names that are available.
+    """
+    names = db_service.get_stock_names(stock_codes, updated_after=datetime.now() - NAME_REFRESH_INTERVAL)
+    new_names = {}
+    for stock_code in stock_codes:
+        if stock_code in names:
+            continue
+        stock = db_service.get_stock(stock_code)
+        if not stock or not stock.suffix:
+            continue # Resolved on the first download instead
+        name = _lookup_stock_name(f"{stock_code}{stock.suffix}")
+        if name:
+            new_names[stock_code] = name
+    db_service.save_stock_names(new_names)
+    names.update(new_names)
+    return names
+
+def _candidate_suffixes(stock_code: str, long_range: bool) -> Tuple[List[str], bool]:
+    """
+    Returns the ticker suffixes to try for a stock code and whether the code's suffix is already known.
+    A known code only uses its resolved suffix, unless a long range is requested, in which case the
+    other suffixes are kept as a fallback (e.g., for a stock that moved from TPEx to TWSE).
+    Unknown codes probe every suffix that is not recorded as a miss.
+    """
+    stock = db_service.get_stock(stock_code)
+    if stock and stock.suffix:
+        suffixes = [stock.suffix]
+        if long_range:
+            suffixes += [s for s in SUFFIXES if s != stock.suffix]
+        return suffixes, True
+    misses = db_service.get_ticker_misses(stock_code)
+    return [s for s in SUFFIXES if s not in misses], False
+
+def _fetch_with_suffix_handling(stock_code: str, start_date: date, end_date: date) -> Tuple[Optional["pd.DataFrame"], Optional[str]]:
     """
     Fetches data from yfinance, automatically handling .TW and .TWO suffixes.
-    It tries the .TW suffix first. If no data is returned, it tries .TWO.
-    Returns the DataFrame and the successful ticker, or (None, None) on failure.
+    The suffix resolved on an earlier call is read from the stocks table; codes that have
+    never been seen try the .TW suffix first and, if no data is returned, .TWO.
+    The resolved suffix and any misses are recorded so later calls do not probe again.
+    Returns the DataFrame and the successful ticker, or (None, None) when no suffix has data.
+    Raises FetchError when a download fails.
     """
-    tickers_to_try = [f"{stock_code}.TW", f"{stock_code}.TWO"]
-    for ticker in tickers_to_try:
+    long_range = len(trading_calendar.trading_days(start_date, end_date - timedelta(days=1))) >= UNKNOWN_TICKER_MIN_DAYS
+    suffixes, known = _candidate_suffixes(stock_code, long_range)
+    empty_suffixes = []
+    for suffix in suffixes:
+        ticker = f"{stock_code}{suffix}"
+        # Suppress yfinance's stderr output for expected "errors"; a failed request raises FetchError,
+        # which is passed on instead of trying the next suffix, so no suffix is recorded as a miss
+        with concurrency.suppress_stderr():
+            stock_data = _download(ticker, start_date, end_date)
+        if stock_data is not None and not stock_data.empty:
+            if not known or empty_suffixes:
+                db_service.save_stock(Stock(stock_code=stock_code, stock_name=None, market=MARKETS[suffix], suffix=suffix))
+            # The code trades under this suffix, so the ones that came back empty can be skipped
+            for empty_suffix in empty_suffixes:
+                db_service.save_ticker_miss(stock_code, empty_suffix, datetime.now() + SUFFIX_MISS_TTL)
+            return stock_data, ticker
+        empty_suffixes.append(suffix)
+
+    # An empty result over a long enough range means the code itself is unknown.
+    # Short ranges may simply be holidays, so they are not recorded here.
+    if empty_suffixes and long_range and not known:
+        for empty_suffix in empty_suffixes:
+            db_service.save_ticker_miss(stock_code, empty_suffix, datetime.now() + UNKNOWN_TICKER_TTL)
+    return None, None
+
+def _record_no_data_days(stock_code: str, days: List[date], confirmed: bool = True):
+    """
+    Records trading days that returned no data. Confirmed past days are recorded permanently.
+    The current trading day, and every day whose empty answer is not confirmed (e.g., for a code
+    whose ticker suffix is not resolved yet), expire after NO_DATA_TTL so they are asked again.
+    """
+    today = date.today()
+    db_service.save_no_data_days(stock_code, [d for d in days if d < today] if confirmed else [])
+    expiring = [d for d in days if d >= today or not confirmed]
+    if expiring:
+        db_service.save_no_data_days(stock_code, expiring, expires_at=datetime.now() + NO_DATA_TTL)
+
+def _split_by_ticker(df: "pd.DataFrame", tickers: List[str]) -> Dict[str, "pd.DataFrame"]:
+    """
+    Splits a wide multi-ticker yfinance DataFrame into one frame per ticker with flat
+    Open/High/Low/Close/Volume columns. Days on which a ticker did not trade are dropped,
+    and tickers without any data are left out.
+    """
+    if df is None or df.empty:
+        return {}
+    frames = {}
+    if df.columns.nlevels > 1:
+        # group_by='ticker' puts the ticker on the first level, but accept either layout
+        level = 0 if set(tickers) & set(df.columns.get_level_values(0)) else 1
+        available = set(df.columns.get_level_values(level))
+        for ticker in tickers:
+            if ticker in available:
+                frames[ticker] = df.xs(ticker, axis=1, level=level)
+    elif len(tickers) == 1:
+        frames[tickers[0]] = df
+    frames = {ticker: frame.dropna(subset=['Close']) for ticker, frame in frames.items()}
+    return {ticker: frame for ticker, frame in frames.items() if not frame.empty}
+
+def _download_many(tickers: List[str], start_date: date, end_date: date) -> Tuple[Dict[str, "pd.DataFrame"], Dict[str, str]]:
+    """
+    Downloads many tickers with one yf.download call per BATCH_SIZE tickers; end_date is exclusive,
+    as in yf.download. Returns a frame per ticker that returned data, and the error message per
+    ticker whose download failed. Those have no answer at all, unlike tickers that simply had no
+    data. When only some tickers of a batch fail, the data of the others is kept.
+    """
+    frames = {}
+    failed = {}
+    for i in range(0, len(tickers), BATCH_SIZE):
+        chunk = tickers[i:i + BATCH_SIZE]
         try:
             # Suppress yfinance's stderr output for expected "errors"
-            with open(os.devnull, 'w') as devnull:
-                with contextlib.redirect_stderr(devnull):
-                    stock_data = yf.download(ticker, start=start_date, end=end_date, progress=False, auto_adjust=False)
-            if not stock_data.empty:
-                return stock_data, ticker
-        except Exception as e:
-            # Still print genuine exceptions
-            print(f"Could not fetch data for {ticker}: {e}")
-            continue # Try the next ticker
-    return None, None
+            with concurrency.suppress_stderr():
+                stock_data = _download(chunk, start_date, end_date)
+        except FetchError as e:
+            failed_tickers = set(e.tickers or chunk)
+            failed.update((ticker, str(e)) for ticker in failed_tickers)
+            if e.frame is not None:
+                frames.update(
+                    (ticker, frame) for ticker, frame in _split_by_ticker(e.frame, chunk).items() if ticker not in failed_tickers
+                )
+            continue
+        frames.update(_split_by_ticker(stock_data, chunk))
+    return frames, failed
 
-def _convert_df_to_transaction_data(df: pd.DataFrame, stock_code: str, stock_name: str) -> List[TransactionData]:
+def _flatten_columns(df: "pd.DataFrame") -> "pd.DataFrame":
+    """
+    Returns the frame with flat Open/High/Low/Close/Volume columns. Single-ticker downloads from
+    recent yfinance versions carry a (Price, Ticker) MultiIndex; the ticker level is dropped once
+    here instead of unwrapping every cell. If several tickers are present, the first one is kept.
+    """
+    if df.columns.nlevels == 1:
+        return df
+    level = next(i for i in range(df.columns.nlevels) if 'Close' in df.columns.get_level_values(i))
+    flat = df.copy(deep=False)
+    flat.columns = df.columns.get_level_values(level)
+    return flat.loc[:, ~flat.columns.duplicated()]
+
+def _frame_to_columns(df: "pd.DataFrame") -> Tuple[list, list, list, list, list, list]:
+    """
+    Extracts the dates and the open, close, high, low and volume columns of a yfinance frame
+    as Python lists, converting each column with a single NumPy call.
+    """
+    df = _flatten_columns(df)
+    return (
+        df.index.date.tolist(),
+        df['Open'].to_numpy(dtype='float64').tolist(),
+        df['Close'].to_numpy(dtype='float64').tolist(),
+        df['High'].to_numpy(dtype='float64').tolist(),
+        df['Low'].to_numpy(dtype='float64').tolist(),
+        df['Volume'].to_numpy(dtype='int64').tolist(),
+    )
+
+@stats.timed("convert.transaction_data")
+def _convert_df_to_transaction_data(df: "pd.DataFrame", stock_code: str, stock_name: str) -> List[TransactionData]:
     """
     Converts a yfinance DataFrame to a list of TransactionData objects.
     """
-    transactions = []
-    for index, row in df.iterrows():
-        transactions.append(TransactionData(
-            stock_code=stock_code,
-            stock_name=stock_name,
-            date=index.date(),
-            open_price=float(row['Open'].iloc[0] if hasattr(row['Open'], 'iloc') else row['Open']),
-            close_price=float(row['Close'].iloc[0] if hasattr(row['Close'], 'iloc') else row['Close']),
-            high_price=float(row['High'].iloc[0] if hasattr(row['High'], 'iloc') else row['High']),
-            low_price=float(row['Low'].iloc[0] if hasattr(row['Low'], 'iloc') else row['Low']),
-            volume=int(row['Volume'].iloc[0] if hasattr(row['Volume'], 'iloc') else row['Volume'])
-        ))
-    return transactions
+    dates, opens, closes, highs, lows, volumes = _frame_to_columns(df)
+    return [
+        TransactionData(stock_code, stock_name, d, o, c, h, l, v)
+        for d, o, c, h, l, v in zip(dates, opens, closes, highs, lows, volumes)
+    ]
+
+@stats.timed("convert.rows")
+def _convert_df_to_rows(df: "pd.DataFrame", stock_code: str) -> List[tuple]:
+    """
+    Converts a yfinance DataFrame straight to row tuples for db_service.save_transaction_rows,
+    without building TransactionData objects. The stock name is not part of the rows; it is
+    saved to the stocks table separately.
+    """
+    _, opens, closes, highs, lows, volumes = _frame_to_columns(df)
+    # Day numbers since 1970-01-01, as stored by db_service, computed for the whole index at once
+    days = _flatten_columns(df).index.values.astype('datetime64[D]').astype('int64').tolist()
+    return [
+        (stock_code, d, o, c, h, l, v)
+        for d, o, c, h, l, v in zip(days, opens, closes, highs, lows, volumes)
+    ]
 
 def fetch_stock_data(stock_code: str, fetch_date: date, silent: bool = False) -> List[TransactionData]:
     """
     Fetches transaction data for a given stock code and date using yfinance.
     It first checks the local database. If data is not found, it fetches from the web
-    and saves the new data to the database.
+    and saves the new data to the database. Days that return no data are remembered in
+    the negative cache so they are not requested again. Raises FetchError when the download fails.
     """
     # 1. Check local database first
     cached_data = db_service.get_transaction_data_by_date(stock_code, fetch_date)
     if cached_data:
+        stats.increment("cache.day.hit")
         return [cached_data]
 
+    # Weekends, future days and days already known to have no data never hit the network.
+    # A fixed holiday is asked once, since the calendar does not know every year's exceptions.
+    if (
+        not trading_calendar.is_weekday(fetch_date)
+        or fetch_date > date.today()
+        or fetch_date in db_service.get_no_data_days(stock_code, fetch_date, fetch_date)
+    ):
+        stats.increment("cache.day.skipped")
+        if not silent:
+            print(f"No data found for {stock_code} on {fetch_date}.")
+        return []
+
     # 2. If not in DB, fetch from the web using yfinance
+    stats.increment("cache.day.miss")
     stock_data_df, ticker = _fetch_with_suffix_handling(stock_code, start_date=fetch_date, end_date=fetch_date + timedelta(days=1))
     
     if stock_data_df is None or stock_data_df.empty:
+        # The download succeeded (a failure raises FetchError), but an empty answer is only final
+        # for a code known to trade under its suffix; an unresolved code may simply be mistyped
+        stock = db_service.get_stock(stock_code)
+        _record_no_data_days(stock_code, [fetch_date], confirmed=bool(stock and stock.suffix))
         if not silent:
             print(f"No data found for {stock_code} on {fetch_date}.")
         return []
@@ -93,35 +328,308 @@ def fetch_stock_data(stock_code: str, fetch_date: date, silent: bool = False) ->
     
     return fetched_data
 
-def fetch_stock_data_in_range(stock_code: str, start_date: date, end_date: date) -> List[TransactionData]:
+def _fill_missing_ranges(stock_code: str, start_date: date, end_date: date, silent: bool = False):
     """
-    Fetches transaction data for a given stock code and date range using yfinance.
-    It checks the local database first. If data is incomplete, it fetches from the web
-    for the required date range and backfills the database.
+    Makes sure the local database holds every available trading day of a date range.
+    The cached dates are compared against the trading calendar and the stock's known
+    no-data days. Only the missing sub-ranges are downloaded, using one request per
+    contiguous gap, and all new rows are saved in a single batch.
     """
     # 1. Check local database for the entire range
-    cached_data = db_service.get_transaction_data_by_range(stock_code, start_date, end_date)
-    
-    # A simple check to see if we have all days. This is not perfect.
-    # A more robust solution would check for gaps.
-    if len(cached_data) >= (end_date - start_date).days + 1:
-        return cached_data
-    
-    # 2. Fetch from the web for the required date range
-    stock_data_df, ticker = _fetch_with_suffix_handling(stock_code, start_date=start_date, end_date=end_date + timedelta(days=1))
+    known_dates = db_service.get_cached_dates(stock_code, start_date, end_date)
+    known_dates.update(db_service.get_no_data_days(stock_code, start_date, end_date))
 
-    if stock_data_df is None or stock_data_df.empty:
-        print(f"No data found for {stock_code} in range {start_date}-{end_date}.")
-        return cached_data # Return what we have from the cache
+    # Days after today cannot have data yet, so they never count as missing
+    today = date.today()
+    missing_ranges = trading_calendar.missing_ranges(start_date, min(end_date, today), known_dates)
+    if not missing_ranges:
+        stats.increment("cache.range.hit")
+        return
+    stats.increment("cache.range.miss")
+    stats.increment("cache.range.missing_days", sum(
+        len(trading_calendar.trading_days(gap_start, gap_end)) for gap_start, gap_end in missing_ranges
+    ))
 
-    # Get stock name
-    stock_name = _get_stock_name(stock_code, ticker)
-    fetched_data = _convert_df_to_transaction_data(stock_data_df, stock_code, stock_name)
+    # 2. Fetch each missing sub-range from the web. A gap whose download fails stays missing,
+    # while the gaps that did download are still saved; the first error is raised at the end.
+    fetched_data = []
+    downloaded_ranges = []
+    error = None
+    for gap_start, gap_end in missing_ranges:
+        try:
+            stock_data_df, ticker = _fetch_with_suffix_handling(stock_code, start_date=gap_start, end_date=gap_end + timedelta(days=1))
+        except FetchError as e:
+            error = error or e
+            continue
+        downloaded_ranges.append((gap_start, gap_end))
+        if stock_data_df is None or stock_data_df.empty:
+            continue
+        stock_name = _get_stock_name(stock_code, ticker)
+        fetched_data.extend(_convert_df_to_transaction_data(stock_data_df, stock_code, stock_name))
 
-    # 3. Save the newly fetched data to the database
+    # 3. Save the newly fetched data to the database in one batch
     if fetched_data:
         db_service.save_transaction_data(fetched_data)
-        # Re-query the database to return a complete and consistent list
-        return db_service.get_transaction_data_by_range(stock_code, start_date, end_date)
 
-    return cached_data
+    # 4. Remember the trading days that still have no data (holidays, suspensions), like in
+    # fetch_stock_data. The empty answer is only trusted when rows came back or the code's
+    # suffix is resolved, so an unknown code is never recorded as a run of no-data days, and
+    # only inside the gaps whose own download succeeded, so a network failure is never recorded.
+    if downloaded_ranges:
+        stock = None if fetched_data else db_service.get_stock(stock_code)
+        if fetched_data or (stock and stock.suffix):
+            fetched_dates = {d.date for d in fetched_data}
+            _record_no_data_days(stock_code, [
+                day
+                for gap_start, gap_end in downloaded_ranges
+                for day in trading_calendar.trading_days(gap_start, gap_end)
+                if day not in fetched_dates
+            ])
+    if not fetched_data and not silent and error is None:
+        print(f"No data found for {stock_code} in range {start_date}-{end_date}.")
+
+    if error is not None:
+        raise error
+
+def cache_range(stock_codes: List[str], start_date: date, end_date: date, silent: bool = False):
+    """
+    Makes sure the local database holds a date range for every stock, so it can then be read
+    for all of them at once (e.g., with db_service.get_transaction_arrays).
+    """
+    for stock_code in stock_codes:
+        _fill_missing_ranges(stock_code, start_date, end_date, silent)
+
+def fetch_stock_data_in_range(stock_code: str, start_date: date, end_date: date, silent: bool = False) -> List[TransactionData]:
+    """
+    Fetches transaction data for a given stock code and date range using yfinance.
+    Missing trading days are downloaded into the local database first (see _fill_missing_ranges),
+    then the whole range is read back from it. Raises FetchError when a download fails.
+    """
+    _fill_missing_ranges(stock_code, start_date, end_date, silent)
+    return db_service.get_transaction_data_by_range(stock_code, start_date, end_date)
+
+def fetch_price_series_in_range(stock_code: str, start_date: date, end_date: date, silent: bool = False) -> "PriceSeries":
+    """
+    Same as fetch_stock_data_in_range, but reads the range back as a columnar PriceSeries
+    holding the stock code and name once and the prices in typed arrays.
+    """
+    _fill_missing_ranges(stock_code, start_date, end_date, silent)
+    from ..models.price_series import PriceSeries
+
+    series = db_service.get_price_series(stock_code, start_date, end_date)
+    return series.get(stock_code) or PriceSeries.empty(stock_code)
+
+def _download_frames(stock_codes: List[str], start_date: date, end_date: date) -> Tuple[Dict[str, "pd.DataFrame"], Dict[str, str]]:
+    """
+    Downloads many stock codes for a date range with batched multi-ticker downloads.
+    Codes are grouped by their stored ticker suffix and downloaded BATCH_SIZE tickers per request.
+    Codes that have never been seen are probed in batches as well, .TW first and then .TWO, and
+    their resolved suffix is saved. Returns a frame per stock code that returned data, and the
+    error message per code without data whose download failed; those must not be cached as
+    having no data.
+    """
+    end = end_date + timedelta(days=1)
+    long_range = len(trading_calendar.trading_days(start_date, end_date)) >= UNKNOWN_TICKER_MIN_DAYS
+    frames = {}
+    failed = {}
+
+    # 1. Codes with a known suffix: one batched download per suffix
+    codes_by_suffix = {}
+    unknown_codes = []
+    for stock_code in stock_codes:
+        stock = db_service.get_stock(stock_code)
+        if stock and stock.suffix:
+            codes_by_suffix.setdefault(stock.suffix, []).append(stock_code)
+        else:
+            unknown_codes.append(stock_code)
+    for suffix, codes in codes_by_suffix.items():
+        downloaded, failed_tickers = _download_many([f"{code}{suffix}" for code in codes], start_date, end)
+        for code in codes:
+            if f"{code}{suffix}" in downloaded:
+                frames[code] = downloaded[f"{code}{suffix}"]
+            elif f"{code}{suffix}" in failed_tickers:
+                failed[code] = failed_tickers[f"{code}{suffix}"]
+
+    # 2. Unknown codes: probe each suffix in turn for the codes that are still unresolved.
+    # A suffix whose download failed is not known to be empty, so it is never recorded as a miss.
+    misses = {code: db_service.get_ticker_misses(code) for code in unknown_codes}
+    empty_suffixes = {code: [] for code in unknown_codes}
+    for suffix in SUFFIXES:
+        candidates = [code for code in unknown_codes if code not in frames and suffix not in misses[code]]
+        if not candidates:
+            continue
+        downloaded, failed_tickers = _download_many([f"{code}{suffix}" for code in candidates], start_date, end)
+        for code in candidates:
+            if f"{code}{suffix}" in failed_tickers:
+                failed[code] = failed_tickers[f"{code}{suffix}"]
+                continue
+            if f"{code}{suffix}" not in downloaded:
+                empty_suffixes[code].append(suffix)
+                continue
+            frames[code] = downloaded[f"{code}{suffix}"]
+            db_service.save_stock(Stock(stock_code=code, stock_name=None, market=MARKETS[suffix], suffix=suffix))
+            for empty_suffix in empty_suffixes[code]:
+                db_service.save_ticker_miss(code, empty_suffix, datetime.now() + SUFFIX_MISS_TTL)
+    failed = {code: error for code, error in failed.items() if code not in frames}
+    if long_range:
+        for code in unknown_codes:
+            if code not in frames and code not in failed:
+                for empty_suffix in empty_suffixes[code]:
+                    db_service.save_ticker_miss(code, empty_suffix, datetime.now() + UNKNOWN_TICKER_TTL)
+    return frames, failed
+
+def _fetch_failure(failed: Dict[str, str]) -> FetchError:
+    """Returns the FetchError to raise for the stock codes whose download failed, once the others are saved."""
+    codes = sorted(failed)
+    return FetchError(f"Could not fetch data for {', '.join(codes)}: {failed[codes[0]]}", codes)
+
+def _fetch_many(stock_codes: List[str], start_date: date, end_date: date) -> Tuple[Dict[str, List[TransactionData]], Dict[str, str]]:
+    """
+    Downloads and saves many stock codes like fetch_many. Returns the fetched rows per stock code,
+    with an empty list for codes without data, and the error message per code whose download failed.
+    """
+    stock_codes = list(dict.fromkeys(stock_codes))
+    frames, failed = _download_frames(stock_codes, start_date, end_date)
+
+    # Convert every frame and save all rows in one batch
+    names = prefetch_stock_names(list(frames))
+    results = {stock_code: [] for stock_code in stock_codes}
+    all_data = []
+    for stock_code, frame in frames.items():
+        results[stock_code] = _convert_df_to_transaction_data(frame, stock_code, names.get(stock_code, stock_code))
+        all_data.extend(results[stock_code])
+    if all_data:
+        db_service.save_transaction_data(all_data)
+    return results, failed
+
+def fetch_many(stock_codes: List[str], start_date: date, end_date: date) -> Dict[str, List[TransactionData]]:
+    """
+    Fetches transaction data for many stock codes and a date range with batched multi-ticker
+    downloads (see _download_frames). All rows are written to the database in one batch.
+    Returns the fetched rows per stock code, with an empty list for codes without data.
+    If a batch fails, the rows of the other batches are saved and FetchError is raised.
+    """
+    results, failed = _fetch_many(stock_codes, start_date, end_date)
+    if failed:
+        raise _fetch_failure(failed)
+    return results
+
+def snapshot(target_date: date, stock_codes: Optional[List[str]] = None, silent: bool = False) -> List[TransactionData]:
+    """
+    Returns the transaction data of many stocks on one date. Without stock codes, every stock
+    cached for the date is returned, ordered by code, from one query on the date index. With
+    stock codes, the codes that are not cached are downloaded together with fetch_many, and
+    the result follows the order of stock_codes. Codes that still have no data are remembered
+    as no-data days, like in fetch_stock_data. If some downloads failed, the others are saved
+    and then FetchError is raised naming the codes that failed.
+    """
+    if stock_codes is None:
+        return db_service.get_snapshot(target_date)
+
+    # 1. Read every requested code that is already cached with one query
+    stock_codes = list(dict.fromkeys(stock_codes))
+    records = db_service.get_snapshot(target_date, stock_codes)
+    cached = {record.stock_code for record in records}
+    missing = [code for code in stock_codes if code not in cached]
+    stats.increment("cache.snapshot.hit", len(cached))
+
+    # 2. Download the missing codes in batches, unless the day cannot have (new) data
+    if missing and trading_calendar.is_weekday(target_date) and target_date <= date.today():
+        no_data = db_service.get_no_data_stocks(target_date, missing)
+        missing = [code for code in missing if code not in no_data]
+    else:
+        missing = []
+    stats.increment("cache.snapshot.miss", len(missing))
+    if missing:
+        fetched, failed = _fetch_many(missing, target_date, target_date)
+        for stock_code, data in fetched.items():
+            # A multi-day frame can hold neighbouring days, so only the target date counts
+            data = [d for d in data if d.date == target_date]
+            if data:
+                records.extend(data)
+            elif stock_code not in failed:
+                # Only a batch that downloaded proves the day empty; a failed one is asked again next time
+                stock = db_service.get_stock(stock_code)
+                _record_no_data_days(stock_code, [target_date], confirmed=bool(stock and stock.suffix))
+                if not silent:
+                    print(f"No data found for {stock_code} on {target_date}.")
+        if failed:
+            raise _fetch_failure(failed)
+
+    order = {code: i for i, code in enumerate(stock_codes)}
+    records.sort(key=lambda record: order[record.stock_code])
+    return records
+
+def backfill(stock_codes: List[str], start_date: date, end_date: date, writer: db_service.BulkWriter, silent: bool = False) -> int:
+    """
+    Loads the full history of many stock codes for a date range into the database.
+    Codes are downloaded BATCH_SIZE at a time and their rows are streamed into the bulk writer
+    without building TransactionData objects, so memory stays bounded by one batch.
+    Names are looked up and saved per batch. Returns the number of rows handed to the writer.
+    If some downloads failed, the rows of the others are flushed and then FetchError is raised
+    naming the codes that failed.
+    """
+    stock_codes = list(dict.fromkeys(stock_codes))
+    total_rows = 0
+    failed = {}
+    for i in range(0, len(stock_codes), BATCH_SIZE):
+        chunk = stock_codes[i:i + BATCH_SIZE]
+        frames, failed_codes = _download_frames(chunk, start_date, end_date)
+        failed.update(failed_codes)
+        prefetch_stock_names(list(frames))
+        for stock_code, frame in frames.items():
+            rows = _convert_df_to_rows(frame, stock_code)
+            writer.add_rows(rows)
+            total_rows += len(rows)
+        if not silent:
+            print(f"Fetched {min(i + BATCH_SIZE, len(stock_codes))}/{len(stock_codes)} stocks, "
+                  f"{total_rows} rows ({writer.rows_per_second:,.0f} rows/s written).")
+    if failed:
+        writer.flush()
+        raise _fetch_failure(failed)
+    return total_rows
+
+def sync(stock_codes: List[str], end_date: Optional[date] = None, start_date: Optional[date] = None,
+         silent: bool = False) -> Dict[str, int]:
+    """
+    Brings the local database up to date for many stock codes. For each code, only the days
+    after its latest cached date are downloaded, starting SYNC_OVERLAP earlier so revised
+    bars are overwritten. Codes sharing a start date are downloaded together in batches.
+    Codes without cached data start at start_date, or are skipped if it is not given.
+    Returns the number of rows saved per stock code. If some downloads failed, the rows of the
+    others are saved first and then FetchError is raised naming the codes that failed.
+    """
+    stock_codes = list(dict.fromkeys(stock_codes))
+    end_date = end_date or date.today()
+    latest_dates = db_service.get_latest_dates(stock_codes)
+
+    # 1. Work out where each code's tail starts and group the codes by it
+    codes_by_start = {}
+    for stock_code in stock_codes:
+        if stock_code in latest_dates:
+            tail_start = latest_dates[stock_code] - SYNC_OVERLAP
+        elif start_date:
+            tail_start = start_date
+        else:
+            if not silent:
+                print(f"No cached data for {stock_code}; use --start-date to load its history first.")
+            continue
+        codes_by_start.setdefault(min(tail_start, end_date), []).append(stock_code)
+
+    # 2. Download the tails and upsert all rows in one batch
+    synced = {stock_code: 0 for stock_code in stock_codes}
+    rows = []
+    failed = {}
+    for tail_start, codes in codes_by_start.items():
+        frames, failed_codes = _download_frames(codes, tail_start, end_date)
+        failed.update(failed_codes)
+        prefetch_stock_names(list(frames))
+        for stock_code, frame in frames.items():
+            stock_rows = _convert_df_to_rows(frame, stock_code)
+            synced[stock_code] = len(stock_rows)
+            rows.extend(stock_rows)
+    if rows:
+        db_service.save_transaction_rows(rows)
+    if failed:
+        raise _fetch_failure(failed)
+    return synced
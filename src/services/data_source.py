@@ -0,0 +1,233 @@
+import json
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import date
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+
+# pandas and yfinance take a large share of the CLI's startup time, so they are imported
+# inside the methods that need them; answers served from the cache never load them
+if TYPE_CHECKING:
+    import pandas as pd
+
+class FetchError(Exception):
+    """
+    Raised when a provider could not be reached or refused a request, as opposed to answering
+    that there is no data. Callers must not remember such a result as a no-data day or an
+    unknown ticker, and may retry later. `tickers` lists the tickers (or stock codes) that
+    failed, or is None if all of them did; when only some tickers of a multi-ticker request
+    failed, `frame` holds the data of the others.
+    """
+
+    def __init__(self, message: str, tickers: Optional[List[str]] = None, frame: Optional["pd.DataFrame"] = None):
+        super().__init__(message)
+        self.tickers = tickers
+        self.frame = frame
+
+# Fragments of yfinance log messages that mean a request failed instead of returning no data
+NETWORK_ERRORS = ("Failed to perform", "DNSError", "Timeout", "timed out", "Too Many Requests", "RateLimit", "ConnectionError")
+
+class _ErrorCollector(logging.Handler):
+    """Collects the yfinance errors that point at a failed request, and the requested tickers they name."""
+
+    def __init__(self, tickers: List[str]):
+        super().__init__(logging.ERROR)
+        self.tickers = tickers
+        self.errors = []
+        self.failed = set()
+
+    def emit(self, record: logging.LogRecord):
+        message = record.getMessage()
+        if not any(error in message for error in NETWORK_ERRORS):
+            return
+        # yfinance quotes the tickers, which keeps "2330.TW" apart from "2330.TWO"
+        failed = {ticker for ticker in self.tickers if f"'{ticker}'" in message}
+        if failed:
+            self.failed.update(failed)
+            self.errors.append(message.strip())
+
+class DataSource(ABC):
+    """
+    Provider of market data for data_fetcher and summary_service. Frames follow the layout of
+    yf.download: a DatetimeIndex and Open/High/Low/Close/Volume columns, and for a list of
+    tickers one column group per ticker (group_by='ticker'). Subclasses implement all three methods.
+    """
+
+    @abstractmethod
+    def download(self, tickers: Union[str, List[str]], start_date: date, end_date: date) -> "pd.DataFrame":
+        """
+        Returns the daily bars of one or many tickers from start_date up to, but excluding, end_date.
+        An empty frame means there is no data; a failed request raises an exception (e.g., FetchError).
+        """
+
+    @abstractmethod
+    def history(self, ticker: str, period: str = "1d") -> "pd.DataFrame":
+        """Returns the most recent daily bars of a ticker, e.g., period="5d" for the last five days."""
+
+    @abstractmethod
+    def info(self, ticker: str) -> Dict[str, Any]:
+        """Returns the metadata of a ticker (longName, marketCap, trailingPE, ...)."""
+
+class YFinanceSource(DataSource):
+    """
+    Live data from Yahoo Finance through yfinance. yf.download returns an empty frame when a
+    request fails (DNS, timeout, rate limit) and only logs the error, so the errors it logs for
+    the requested tickers are collected and raised as FetchError. If only some tickers of a
+    multi-ticker download failed, the error carries the frame of the others.
+    """
+
+    def download(self, tickers: Union[str, List[str]], start_date: date, end_date: date) -> "pd.DataFrame":
+        import yfinance as yf
+
+        collector = _ErrorCollector([tickers] if isinstance(tickers, str) else tickers)
+        logger = logging.getLogger("yfinance")
+        logger.addHandler(collector)
+        try:
+            if isinstance(tickers, str):
+                df = yf.download(tickers, start=start_date, end=end_date, progress=False, auto_adjust=False)
+            else:
+                df = yf.download(tickers, start=start_date, end=end_date, progress=False, auto_adjust=False, group_by='ticker')
+        finally:
+            logger.removeHandler(collector)
+        if collector.failed:
+            failed = sorted(collector.failed)
+            if isinstance(tickers, str) or len(failed) == len(tickers):
+                raise FetchError(collector.errors[-1], failed)
+            raise FetchError(collector.errors[-1], failed, frame=df)
+        return df
+
+    def history(self, ticker: str, period: str = "1d") -> "pd.DataFrame":
+        import yfinance as yf
+
+        return yf.Ticker(ticker).history(period=period)
+
+    def info(self, ticker: str) -> Dict[str, Any]:
+        import yfinance as yf
+
+        return yf.Ticker(ticker).info
+
+def _fixture_path(directory: str, ticker: str, extension: str) -> str:
+    return os.path.join(directory, f"{ticker}.{extension}")
+
+class ReplaySource(DataSource):
+    """
+    Replays responses recorded by RecordingSource from a directory, without network access.
+    Each ticker has a <ticker>.csv file with its daily bars and a <ticker>.json file with its info;
+    tickers without a file behave like unknown tickers. Every call sleeps for `latency` seconds
+    first, so fetch throughput and caching can be benchmarked against a realistic provider.
+    """
+
+    def __init__(self, directory: str, latency: float = 0.0):
+        self.directory = directory
+        self.latency = latency
+        self._frames = {}
+
+    def _load(self, ticker: str) -> "pd.DataFrame":
+        import pandas as pd
+
+        frame = self._frames.get(ticker)
+        if frame is None:
+            path = _fixture_path(self.directory, ticker, "csv")
+            if os.path.exists(path):
+                frame = pd.read_csv(path, index_col=0, parse_dates=True)
+            else:
+                frame = pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'], index=pd.DatetimeIndex([]))
+            self._frames[ticker] = frame
+        return frame
+
+    def download(self, tickers: Union[str, List[str]], start_date: date, end_date: date) -> "pd.DataFrame":
+        import pandas as pd
+
+        time.sleep(self.latency)
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        frames = {}
+        for ticker in [tickers] if isinstance(tickers, str) else tickers:
+            frame = self._load(ticker)
+            frames[ticker] = frame[(frame.index >= start) & (frame.index < end)]
+        if isinstance(tickers, str):
+            return frames[tickers]
+        frames = {ticker: frame for ticker, frame in frames.items() if not frame.empty}
+        return pd.concat(frames, axis=1) if frames else pd.DataFrame()
+
+    def history(self, ticker: str, period: str = "1d") -> "pd.DataFrame":
+        time.sleep(self.latency)
+        return self._load(ticker).tail(int(period.rstrip("d")))
+
+    def info(self, ticker: str) -> Dict[str, Any]:
+        time.sleep(self.latency)
+        path = _fixture_path(self.directory, ticker, "json")
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+class RecordingSource(DataSource):
+    """
+    Passes every call through to another source and records the responses in a directory
+    in the format read by ReplaySource. Bars of repeated downloads are merged per ticker.
+    """
+
+    def __init__(self, source: DataSource, directory: str):
+        self.source = source
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _save_frame(self, ticker: str, frame: "pd.DataFrame"):
+        import pandas as pd
+
+        frame = frame.dropna(subset=['Close'])
+        if frame.empty:
+            return
+        if frame.index.tz is not None:
+            # Ticker.history returns exchange-local timestamps; store plain dates like yf.download
+            frame = frame.tz_localize(None).normalize()
+        path = _fixture_path(self.directory, ticker, "csv")
+        with self._lock:
+            if os.path.exists(path):
+                frame = pd.concat([pd.read_csv(path, index_col=0, parse_dates=True), frame])
+                frame = frame[~frame.index.duplicated(keep='last')].sort_index()
+            frame.to_csv(path)
+
+    def download(self, tickers: Union[str, List[str]], start_date: date, end_date: date) -> "pd.DataFrame":
+        df = self.source.download(tickers, start_date, end_date)
+        if df is None or df.empty:
+            return df
+        if df.columns.nlevels > 1:
+            # Same layout handling as data_fetcher._split_by_ticker
+            names = [tickers] if isinstance(tickers, str) else tickers
+            level = 0 if set(names) & set(df.columns.get_level_values(0)) else 1
+            for ticker in set(df.columns.get_level_values(level)):
+                self._save_frame(ticker, df.xs(ticker, axis=1, level=level))
+        elif isinstance(tickers, str):
+            self._save_frame(tickers, df)
+        return df
+
+    def history(self, ticker: str, period: str = "1d") -> "pd.DataFrame":
+        df = self.source.history(ticker, period)
+        if df is not None and not df.empty:
+            self._save_frame(ticker, df[['Open', 'High', 'Low', 'Close', 'Volume']])
+        return df
+
+    def info(self, ticker: str) -> Dict[str, Any]:
+        info = self.source.info(ticker)
+        if info:
+            with open(_fixture_path(self.directory, ticker, "json"), "w", encoding="utf-8") as f:
+                json.dump(info, f, ensure_ascii=False, default=str)
+        return info
+
+_source: Optional[DataSource] = None
+
+def get_data_source() -> DataSource:
+    """Returns the data source used for all market data requests, Yahoo Finance by default."""
+    global _source
+    if _source is None:
+        _source = YFinanceSource()
+    return _source
+
+def set_data_source(source: Optional[DataSource]):
+    """Replaces the data source used for all market data requests; None restores the default."""
+    global _source
+    _source = source
@@ -1,21 +1,106 @@
+import contextlib
 import sqlite3
-from datetime import date
-from typing import List, Optional
+import threading
+import time
+from datetime import date, datetime
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Union
 
-from ..models.stock_data import TransactionData
+from ..lib import stats, trading_calendar
+from ..models.stock_data import PeriodStats, Stock, TransactionData
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+    from ..models.price_series import PriceSeries
 
 DB_PATH = "stock_data.db"
+# Rows fetched from the cursor at a time by iter_transaction_data
+STREAM_BATCH_SIZE = 1000
+# Seconds to wait for a lock held by another connection, e.g., a concurrent fetch worker
+DB_TIMEOUT = 30
+# Applied to every new connection: WAL lets readers run alongside the writer, and with WAL
+# synchronous=NORMAL only gives up durability of the last commits on power loss, not consistency.
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -65536,      # 64 MiB page cache (negative values are KiB)
+    "mmap_size": 268435456,    # 256 MiB memory-mapped reads
+    "temp_store": "MEMORY",
+}
+
+# Each thread keeps one long-lived connection, so cache lookups do not pay for connect/close
+_local = threading.local()
 
-def get_db_connection():
-    """Establishes a connection to the SQLite database."""
-    conn = sqlite3.connect(DB_PATH)
+def _open_connection(path: str) -> sqlite3.Connection:
+    """Opens a new connection to the SQLite database at path and applies PRAGMAS."""
+    conn = sqlite3.connect(path, timeout=DB_TIMEOUT)
     conn.row_factory = sqlite3.Row
+    for name, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
     return conn
 
-def initialize_db():
-    """Initializes the database and creates the transaction_data table if it doesn't exist."""
+def get_db_connection() -> sqlite3.Connection:
+    """
+    Returns this thread's connection to the SQLite database, opening it on first use.
+    The connection is reused by later calls and must not be closed by the caller;
+    use close_connection() instead. A change of DB_PATH opens a new connection.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.path == DB_PATH:
+        return conn
+    close_connection()
+    _local.conn = _open_connection(DB_PATH)
+    _local.path = DB_PATH
+    _local.depth = 0
+    return _local.conn
+
+def close_connection():
+    """Closes this thread's connection, if it has one."""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+@contextlib.contextmanager
+def transaction() -> Iterator[sqlite3.Connection]:
+    """
+    Runs the enclosed statements in one transaction on this thread's connection.
+    Commits when the block succeeds and rolls back when it raises. Nested blocks join
+    the outermost transaction, so helpers can be combined into one commit.
+    """
     conn = get_db_connection()
-    cursor = conn.cursor()
+    depth = _local.depth
+    _local.depth = depth + 1
+    try:
+        yield conn
+        if depth == 0:
+            conn.commit()
+    except BaseException:
+        if depth == 0:
+            conn.rollback()
+        raise
+    finally:
+        _local.depth = depth
+
+# Version of the schema created by initialize_db, stored in PRAGMA user_version
+SCHEMA_VERSION = 4
+# Dates are stored as integer day numbers counted from 1970-01-01, which NumPy reads as datetime64[D]
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def to_day_number(day: date) -> int:
+    """Converts a date to the integer day number stored in the database."""
+    return day.toordinal() - EPOCH_ORDINAL
+
+def from_day_number(day_number: int) -> date:
+    """Converts an integer day number stored in the database back to a date."""
+    return date.fromordinal(day_number + EPOCH_ORDINAL)
+
+def _table_columns(cursor: sqlite3.Cursor, table: str) -> List[str]:
+    """Returns the column names of a table, or an empty list if it doesn't exist."""
+    return [row[1] for row in cursor.execute(f"PRAGMA table_info({table})").fetchall()]
+
+def _migrate_v1(cursor: sqlite3.Cursor):
+    """Schema version 1: one row per stock and day with the name repeated and ISO TEXT dates."""
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS transaction_data (
             stock_code TEXT NOT NULL,
@@ -29,85 +114,719 @@ def initialize_db():
             PRIMARY KEY (stock_code, date)
         );
     """)
-    conn.commit()
-    conn.close()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stocks (
+            stock_code TEXT PRIMARY KEY,
+            stock_name TEXT,
+            market TEXT,
+            suffix TEXT,
+            name_updated_at TEXT,
+            updated_at TEXT NOT NULL
+        );
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS no_data_days (
+            stock_code TEXT NOT NULL,
+            date TEXT NOT NULL,
+            expires_at TEXT,
+            PRIMARY KEY (stock_code, date)
+        );
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ticker_misses (
+            stock_code TEXT NOT NULL,
+            suffix TEXT NOT NULL,
+            expires_at TEXT NOT NULL,
+            PRIMARY KEY (stock_code, suffix)
+        );
+    """)
+
+def _migrate_v2(cursor: sqlite3.Cursor):
+    """
+    Schema version 2: stock names live only in the stocks table, dates are integer day numbers,
+    and the (stock_code, date) tables are WITHOUT ROWID, so rows are stored in primary key order.
+    """
+    now = datetime.now().isoformat(timespec='seconds')
+    # 1. Move the names into the stocks table. Names from old rows have no name_updated_at,
+    #    so they are refreshed from Yahoo Finance the next time the stock is fetched.
+    cursor.execute("""
+        INSERT INTO stocks (stock_code, stock_name, updated_at)
+        SELECT stock_code, MAX(stock_name), ? FROM transaction_data WHERE true GROUP BY stock_code
+        ON CONFLICT (stock_code) DO UPDATE SET stock_name = COALESCE(stock_name, excluded.stock_name)
+    """, (now,))
+
+    # 2. Rebuild the transaction table with integer dates
+    cursor.execute("""
+        CREATE TABLE transaction_data_v2 (
+            stock_code TEXT NOT NULL,
+            date INTEGER NOT NULL,
+            open_price REAL NOT NULL,
+            close_price REAL NOT NULL,
+            high_price REAL NOT NULL,
+            low_price REAL NOT NULL,
+            volume INTEGER NOT NULL,
+            PRIMARY KEY (stock_code, date)
+        ) WITHOUT ROWID;
+    """)
+    cursor.execute("""
+        INSERT INTO transaction_data_v2
+        SELECT stock_code, CAST(julianday(date) - julianday('1970-01-01') AS INTEGER),
+               open_price, close_price, high_price, low_price, volume
+        FROM transaction_data
+    """)
+    cursor.execute("DROP TABLE transaction_data")
+    cursor.execute("ALTER TABLE transaction_data_v2 RENAME TO transaction_data")
+
+    # 3. Rebuild the no-data days the same way; databases from before expiry was added lack expires_at
+    expires = "expires_at" if "expires_at" in _table_columns(cursor, "no_data_days") else "NULL"
+    cursor.execute("""
+        CREATE TABLE no_data_days_v2 (
+            stock_code TEXT NOT NULL,
+            date INTEGER NOT NULL,
+            expires_at TEXT,
+            PRIMARY KEY (stock_code, date)
+        ) WITHOUT ROWID;
+    """)
+    cursor.execute(f"""
+        INSERT INTO no_data_days_v2
+        SELECT stock_code, CAST(julianday(date) - julianday('1970-01-01') AS INTEGER), {expires}
+        FROM no_data_days
+    """)
+    cursor.execute("DROP TABLE no_data_days")
+    cursor.execute("ALTER TABLE no_data_days_v2 RENAME TO no_data_days")
+
+# Rollup table of each period that transaction_data is aggregated into
+ROLLUP_TABLES = {"week": "weekly_rollup", "month": "monthly_rollup"}
+_ROLLUP_COLUMNS = [
+    'stock_code', 'period_start', 'first_date', 'last_date', 'open_price', 'high_price', 'low_price',
+    'close_price', 'volume', 'vwap', 'period_return', 'volatility', 'trading_days',
+]
+
+def _migrate_v3(cursor: sqlite3.Cursor):
+    """
+    Schema version 3: weekly and monthly rollups of transaction_data, one row per stock and
+    period keyed by the day number of the period's first calendar day (a Monday or the 1st).
+    """
+    for table in ROLLUP_TABLES.values():
+        cursor.execute(f"""
+            CREATE TABLE {table} (
+                stock_code TEXT NOT NULL,
+                period_start INTEGER NOT NULL,
+                first_date INTEGER NOT NULL,
+                last_date INTEGER NOT NULL,
+                open_price REAL NOT NULL,
+                high_price REAL NOT NULL,
+                low_price REAL NOT NULL,
+                close_price REAL NOT NULL,
+                volume INTEGER NOT NULL,
+                vwap REAL,
+                period_return REAL,
+                volatility REAL,
+                trading_days INTEGER NOT NULL,
+                PRIMARY KEY (stock_code, period_start)
+            ) WITHOUT ROWID;
+        """)
+    spans = cursor.execute("SELECT stock_code, MIN(date), MAX(date) FROM transaction_data GROUP BY stock_code").fetchall()
+    # Existing data is rolled up 100 stocks at a time, so a large database is never read into memory at once
+    for i in range(0, len(spans), 100):
+        _refresh_rollups(cursor, {code: (first, last) for code, first, last in spans[i:i + 100]})
+
+def _refresh_rollups(cursor: sqlite3.Cursor, spans: Dict[str, Sequence[int]]):
+    """
+    Rebuilds the rollups of every week and month that overlaps the (first, last) day number
+    span written for each stock. The periods are aggregated again from all their daily rows,
+    so a rollup always matches transaction_data. All stocks are aggregated in one vectorized
+    pass with indicators.aggregate.
+    """
+    import numpy as np
+
+    from ..lib import indicators
+
+    if not spans:
+        return
+    # 1. Read the daily rows of every period touching a span. A week can start in the previous
+    #    month and a month in the previous week, so each read covers both periods' bounds.
+    reader = cursor.connection.cursor()
+    reader.row_factory = None # Plain tuples, which NumPy reads directly
+    rows, firsts, lasts, counts = [], [], [], []
+    for stock_code, (first, last) in spans.items():
+        start = min(trading_calendar.period_bounds(from_day_number(first), period)[0] for period in ROLLUP_TABLES)
+        end = max(trading_calendar.period_bounds(from_day_number(last), period)[1] for period in ROLLUP_TABLES)
+        reader.execute(f"""
+            SELECT stock_code, {', '.join(_ARRAY_COLUMNS)} FROM transaction_data
+            WHERE stock_code = ? AND date BETWEEN ? AND ?
+            ORDER BY date
+        """, (stock_code, to_day_number(start), to_day_number(end)))
+        chunk = reader.fetchall()
+        rows.extend(chunk)
+        firsts.append(first)
+        lasts.append(last)
+        counts.append(len(chunk))
+    records = np.array(rows, dtype=np.dtype([
+        ('stock_code', 'O'), ('date', 'i8'), ('open_price', 'f8'), ('high_price', 'f8'),
+        ('low_price', 'f8'), ('close_price', 'f8'), ('volume', 'i8'),
+    ]))
+    if not len(records):
+        return
+    days = records['date']
+    dates = days.astype('datetime64[D]')
+    span_firsts = np.repeat(np.array(firsts, dtype='datetime64[D]'), counts)
+    span_lasts = np.repeat(np.array(lasts, dtype='datetime64[D]'), counts)
+
+    # 2. Aggregate and store the periods of each rollup table
+    for period, table in ROLLUP_TABLES.items():
+        keys = indicators.period_keys(dates, period)
+        starts = indicators.group_starts(records['stock_code'], keys)
+        result = indicators.aggregate(starts, records['open_price'], records['high_price'], records['low_price'],
+                                      records['close_price'], records['volume'])
+        # Only periods that overlap a span were read completely; the others did not change
+        keep = ((keys[starts] >= indicators.period_keys(span_firsts[starts], period))
+                & (keys[starts] <= indicators.period_keys(span_lasts[starts], period)))
+        if period == "week":
+            period_starts = days[starts] - (days[starts] + 3) % 7
+        else:
+            period_starts = dates[starts].astype('datetime64[M]').astype('datetime64[D]').astype('int64')
+        columns = [
+            records['stock_code'][starts], period_starts, days[result["first"]], days[result["last"]],
+            result["open"], result["high"], result["low"], result["close"], result["volume"],
+            result["vwap"], result["return"], result["volatility"], result["trading_days"],
+        ]
+        # NaN (e.g., no volume, or too few days for a volatility) is stored as NULL
+        for i in (9, 10, 11):
+            columns[i] = np.where(np.isnan(columns[i]), None, columns[i])
+        cursor.executemany(f"""
+            INSERT OR REPLACE INTO {table} ({', '.join(_ROLLUP_COLUMNS)})
+            VALUES ({', '.join('?' * len(_ROLLUP_COLUMNS))})
+        """, zip(*(column[keep].tolist() for column in columns)))
+
+def _migrate_v4(cursor: sqlite3.Cursor):
+    """
+    Schema version 4: an index on transaction_data.date for snapshots of many stocks on one day.
+    The table is WITHOUT ROWID, so the index holds (date, stock_code) and points at the primary key.
+    """
+    cursor.execute("CREATE INDEX IF NOT EXISTS transaction_data_by_date ON transaction_data (date)")
+
+# MIGRATIONS[i] upgrades a database from schema version i to i + 1
+MIGRATIONS = [_migrate_v1, _migrate_v2, _migrate_v3, _migrate_v4]
+
+def initialize_db():
+    """
+    Initializes the database, creating the tables or upgrading an existing database to
+    SCHEMA_VERSION. Existing data is carried over by the migrations in MIGRATIONS.
+    This thread's connection is reopened, so a database file that was removed is created again.
+    """
+    close_connection()
+    with transaction() as conn:
+        cursor = conn.cursor()
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        for migrate in MIGRATIONS[version:SCHEMA_VERSION]:
+            migrate(cursor)
+        if version < SCHEMA_VERSION:
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
 
 def save_transaction_data(data: List[TransactionData]):
-    """Saves a list of TransactionData objects to the database."""
+    """
+    Saves a list of TransactionData objects to the database. The stock names are kept
+    in the stocks table; a name only fills in a stock that doesn't have one yet.
+    """
+    names = {d.stock_code: d.stock_name for d in data if d.stock_name}
+    with transaction() as conn:
+        if names:
+            now = datetime.now().isoformat(timespec='seconds')
+            conn.executemany("""
+                INSERT INTO stocks (stock_code, stock_name, updated_at)
+                VALUES (?, ?, ?)
+                ON CONFLICT (stock_code) DO UPDATE SET stock_name = COALESCE(stock_name, excluded.stock_name)
+            """, [(code, name, now) for code, name in names.items()])
+        save_transaction_rows([
+            (
+                d.stock_code,
+                to_day_number(d.date),
+                d.open_price,
+                d.close_price,
+                d.high_price,
+                d.low_price,
+                d.volume
+            )
+            for d in data
+        ])
+
+@stats.timed("db.write")
+def save_transaction_rows(rows: Iterable[tuple]):
+    """
+    Saves pre-built row tuples to the database in one transaction. Each tuple holds
+    (stock_code, day number, open, close, high, low, volume); see to_day_number.
+    """
+    if not isinstance(rows, list):
+        rows = list(rows)
+    stats.increment("db.rows_written", len(rows))
+    with transaction() as conn:
+        cursor = conn.cursor()
+
+        cursor.executemany("""
+            INSERT OR REPLACE INTO transaction_data (stock_code, date, open_price, close_price, high_price, low_price, volume)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+
+        # Keep the weekly and monthly rollups of the written days up to date in the same transaction
+        spans = {}
+        for stock_code, day, *_ in rows:
+            span = spans.get(stock_code)
+            if span is None:
+                spans[stock_code] = [day, day]
+            elif day < span[0]:
+                span[0] = day
+            elif day > span[1]:
+                span[1] = day
+        _refresh_rollups(cursor, spans)
+
+# Rows committed per transaction by BulkWriter
+BULK_BATCH_SIZE = 50000
+
+class BulkWriter:
+    """
+    Writes transaction rows for a bulk load, e.g., a backfill of many stocks, on this thread's
+    connection. Rows are buffered and committed every batch_size rows with one prepared INSERT,
+    so the load takes a few large transactions instead of one per stock. With relax_durability,
+    synchronous is turned off until the writer is closed: a crash can lose the last commits,
+    but in WAL mode the database stays consistent. Use it as a context manager; rows still
+    buffered are committed when the block exits.
+    """
+
+    def __init__(self, batch_size: int = BULK_BATCH_SIZE, relax_durability: bool = False):
+        self.batch_size = batch_size
+        self.relax_durability = relax_durability
+        self.rows_written = 0
+        self._rows = []
+        self._started = None
+        self._elapsed = None
+
+    def __enter__(self) -> "BulkWriter":
+        if self.relax_durability:
+            get_db_connection().execute("PRAGMA synchronous = OFF")
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            # Rows added before an error are still valid; only a failing write discards them
+            if exc_type is None or not issubclass(exc_type, sqlite3.Error):
+                self.flush()
+        finally:
+            self._rows = []
+            self._elapsed = time.perf_counter() - self._started
+            if self.relax_durability:
+                get_db_connection().execute(f"PRAGMA synchronous = {PRAGMAS.get('synchronous', 'FULL')}")
+
+    def add_rows(self, rows: Iterable[tuple]):
+        """Buffers row tuples in the format of save_transaction_rows, committing full batches."""
+        self._rows.extend(rows)
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Commits the buffered rows in one transaction."""
+        if not self._rows:
+            return
+        save_transaction_rows(self._rows)
+        self.rows_written += len(self._rows)
+        self._rows = []
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the writer was opened, or the total duration once it is closed."""
+        if self._started is None:
+            return 0.0
+        return self._elapsed if self._elapsed is not None else time.perf_counter() - self._started
+
+    @property
+    def rows_per_second(self) -> float:
+        """Committed rows per second of elapsed time."""
+        elapsed = self.elapsed
+        return self.rows_written / elapsed if elapsed > 0 else 0.0
+
+# Selects transaction rows with the stock name from the stocks table, falling back to the code
+_TRANSACTION_SELECT = """
+    SELECT t.stock_code, COALESCE(s.stock_name, t.stock_code) AS stock_name, t.date,
+           t.open_price, t.close_price, t.high_price, t.low_price, t.volume
+    FROM transaction_data t
+    LEFT JOIN stocks s ON s.stock_code = t.stock_code
+"""
+
+def _row_to_transaction_data(row: sqlite3.Row) -> TransactionData:
+    return TransactionData(
+        stock_code=row['stock_code'],
+        stock_name=row['stock_name'],
+        date=from_day_number(row['date']),
+        open_price=row['open_price'],
+        close_price=row['close_price'],
+        high_price=row['high_price'],
+        low_price=row['low_price'],
+        volume=row['volume']
+    )
+
+@stats.timed("db.read_day")
+def get_transaction_data_by_date(stock_code: str, target_date: date) -> Optional[TransactionData]:
+    """Retrieves transaction data for a specific stock and date from the database."""
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    data_to_insert = [
-        (
-            d.stock_code, 
-            d.stock_name,
-            d.date.isoformat(), 
-            d.open_price, 
-            d.close_price, 
-            d.high_price, 
-            d.low_price, 
-            d.volume
-        ) 
-        for d in data
-    ]
-    
-    cursor.executemany("""
-        INSERT OR REPLACE INTO transaction_data (stock_code, stock_name, date, open_price, close_price, high_price, low_price, volume)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, data_to_insert)
-    
-    conn.commit()
-    conn.close()
+    cursor.execute(_TRANSACTION_SELECT + """
+        WHERE t.stock_code = ? AND t.date = ?
+    """, (stock_code, to_day_number(target_date)))
+    
+    row = cursor.fetchone()
+    
+    if row:
+        return _row_to_transaction_data(row)
+    return None
+
+@stats.timed("db.read_range")
+def get_transaction_data_by_range(stock_code: str, start_date: date, end_date: date) -> List[TransactionData]:
+    """Retrieves all transaction data for a specific stock within a date range."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute(_TRANSACTION_SELECT + """
+        WHERE t.stock_code = ? AND t.date BETWEEN ? AND ?
+        ORDER BY t.date ASC
+    """, (stock_code, to_day_number(start_date), to_day_number(end_date)))
+    
+    rows = cursor.fetchall()
+    stats.increment("db.rows_read", len(rows))
+    return [_row_to_transaction_data(row) for row in rows]
+
+def iter_transaction_data(stock_codes: List[str], start_date: date, end_date: date,
+                          batch_size: int = STREAM_BATCH_SIZE) -> Iterator[TransactionData]:
+    """
+    Yields the transaction data of many stocks within a date range, stock by stock in the order
+    of stock_codes and by date within each stock. Rows are read from the cursor batch_size at a
+    time, so memory stays flat however long the range is.
+    """
+    conn = get_db_connection()
+    start, end = to_day_number(start_date), to_day_number(end_date)
+    for stock_code in stock_codes:
+        cursor = conn.cursor()
+        cursor.execute(_TRANSACTION_SELECT + """
+            WHERE t.stock_code = ? AND t.date BETWEEN ? AND ?
+            ORDER BY t.date ASC
+        """, (stock_code, start, end))
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                stats.increment("db.rows_read", len(rows))
+                for row in rows:
+                    yield _row_to_transaction_data(row)
+        finally:
+            cursor.close()
+
+@stats.timed("db.read_snapshot")
+def get_snapshot(target_date: date, stock_codes: Optional[List[str]] = None) -> List[TransactionData]:
+    """
+    Retrieves the transaction data of every cached stock, or of the given stock codes, on one
+    date, ordered by stock code. Without codes this is a single scan of the date index.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    day = to_day_number(target_date)
+    if stock_codes is None:
+        cursor.execute(_TRANSACTION_SELECT + """
+            WHERE t.date = ?
+            ORDER BY t.stock_code
+        """, (day,))
+        rows = cursor.fetchall()
+    else:
+        rows = []
+        for i in range(0, len(stock_codes), 500):
+            chunk = stock_codes[i:i + 500]
+            cursor.execute(_TRANSACTION_SELECT + f"""
+                WHERE t.date = ? AND t.stock_code IN ({','.join('?' * len(chunk))})
+            """, (day, *chunk))
+            rows.extend(cursor.fetchall())
+        rows.sort(key=lambda row: row['stock_code'])
+    stats.increment("db.rows_read", len(rows))
+    return [_row_to_transaction_data(row) for row in rows]
+
+def get_cached_dates(stock_code: str, start_date: date, end_date: date) -> Set[date]:
+    """Retrieves the dates with cached transaction data for a specific stock within a date range."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        SELECT date FROM transaction_data
+        WHERE stock_code = ? AND date BETWEEN ? AND ?
+    """, (stock_code, to_day_number(start_date), to_day_number(end_date)))
+    
+    return {from_day_number(row[0]) for row in cursor.fetchall()}
+
+def get_latest_dates(stock_codes: List[str]) -> Dict[str, date]:
+    """
+    Retrieves the latest cached date for many stock codes with one query per 500 codes.
+    Codes without any cached data are left out.
+    """
+    latest = {}
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    for i in range(0, len(stock_codes), 500):
+        chunk = stock_codes[i:i + 500]
+        # MAX over the (stock_code, date) primary key only reads the last entry of each stock
+        cursor.execute(f"""
+            SELECT stock_code, MAX(date) FROM transaction_data
+            WHERE stock_code IN ({','.join('?' * len(chunk))})
+            GROUP BY stock_code
+        """, chunk)
+        latest.update({row[0]: from_day_number(row[1]) for row in cursor.fetchall()})
+    return latest
+
+@stats.timed("db.read_rollups")
+def get_rollups(stock_codes: List[str], period: str, start_date: date, end_date: date) -> Dict[str, List[PeriodStats]]:
+    """
+    Retrieves the weekly or monthly rollups (see ROLLUP_TABLES) of many stock codes for the
+    periods starting between start_date and end_date, ordered by period. Each is one primary
+    key range scan. Codes without rollups in the range are left out.
+    """
+    if period not in ROLLUP_TABLES:
+        raise ValueError(f"Unknown period: {period}. Use one of {', '.join(ROLLUP_TABLES)}.")
+    rollups = {}
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    for i in range(0, len(stock_codes), 500):
+        chunk = stock_codes[i:i + 500]
+        cursor.execute(f"""
+            SELECT {', '.join(_ROLLUP_COLUMNS)} FROM {ROLLUP_TABLES[period]}
+            WHERE stock_code IN ({','.join('?' * len(chunk))}) AND period_start BETWEEN ? AND ?
+            ORDER BY stock_code, period_start
+        """, (*chunk, to_day_number(start_date), to_day_number(end_date)))
+        for row in cursor.fetchall():
+            rollups.setdefault(row['stock_code'], []).append(PeriodStats(
+                stock_code=row['stock_code'],
+                start_date=from_day_number(row['first_date']),
+                end_date=from_day_number(row['last_date']),
+                open_price=row['open_price'],
+                high_price=row['high_price'],
+                low_price=row['low_price'],
+                close_price=row['close_price'],
+                volume=row['volume'],
+                vwap=row['vwap'],
+                period_return=row['period_return'],
+                volatility=row['volatility'],
+                trading_days=row['trading_days'],
+            ))
+    return rollups
+
+# Column order of the columnar read API, matching the CLI's display order
+TRANSACTION_COLUMNS = ['stock_code', 'stock_name', 'date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume']
+# Columns read from transaction_data by the columnar read API; the code and name are filled in per stock
+_ARRAY_COLUMNS = ['date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume']
+
+@stats.timed("db.read_arrays")
+def get_transaction_arrays(stock_codes: Union[str, List[str]], start_date: date, end_date: date) -> Dict[str, "np.ndarray"]:
+    """
+    Retrieves transaction data for one or many stocks within a date range as NumPy arrays,
+    one per column in TRANSACTION_COLUMNS. Rows are ordered by stock code and date; dates
+    are returned as datetime64[D]. No per-row Python objects are built.
+    """
+    import numpy as np
+
+    if isinstance(stock_codes, str):
+        stock_codes = [stock_codes]
+    stock_codes = sorted(set(stock_codes))
+    dtype = np.dtype([
+        ('date', 'i8'), ('open_price', 'f8'), ('high_price', 'f8'),
+        ('low_price', 'f8'), ('close_price', 'f8'), ('volume', 'i8'),
+    ])
+    names = get_stock_names(stock_codes)
 
-def get_transaction_data_by_date(stock_code: str, target_date: date) -> Optional[TransactionData]:
-    """Retrieves transaction data for a specific stock and date from the database."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.row_factory = None # Plain tuples, which NumPy reads directly
+    chunks, codes, stock_names = [], [], []
+    # One primary key range scan per stock, so the code and name columns repeat one string object
+    for stock_code in stock_codes:
+        cursor.execute(f"""
+            SELECT {', '.join(_ARRAY_COLUMNS)} FROM transaction_data
+            WHERE stock_code = ? AND date BETWEEN ? AND ?
+            ORDER BY date
+        """, (stock_code, to_day_number(start_date), to_day_number(end_date)))
+        records = np.array(cursor.fetchall(), dtype=dtype)
+        if len(records):
+            chunks.append(records)
+            codes.append(np.full(len(records), stock_code, dtype=object))
+            stock_names.append(np.full(len(records), names.get(stock_code, stock_code), dtype=object))
+
+    records = np.concatenate(chunks) if chunks else np.empty(0, dtype=dtype)
+    stats.increment("db.rows_read", len(records))
+    # Copy each field into its own contiguous array so the row-oriented buffer can be freed
+    arrays = {name: np.ascontiguousarray(records[name]) for name in _ARRAY_COLUMNS}
+    arrays['date'] = arrays['date'].astype('datetime64[D]')
+    arrays['stock_code'] = np.concatenate(codes) if codes else np.empty(0, dtype=object)
+    arrays['stock_name'] = np.concatenate(stock_names) if stock_names else np.empty(0, dtype=object)
+    return {name: arrays[name] for name in TRANSACTION_COLUMNS}
+
+def get_transaction_frame(stock_codes: Union[str, List[str]], start_date: date, end_date: date) -> "pd.DataFrame":
+    """
+    Retrieves transaction data for one or many stocks within a date range as a DataFrame
+    with the columns in TRANSACTION_COLUMNS. The date column keeps a datetime64 dtype.
+    """
+    import pandas as pd
+
+    return pd.DataFrame(get_transaction_arrays(stock_codes, start_date, end_date), columns=TRANSACTION_COLUMNS)
+
+def get_price_series(stock_codes: Union[str, List[str]], start_date: date, end_date: date) -> Dict[str, "PriceSeries"]:
+    """
+    Retrieves transaction data for one or many stocks within a date range as one columnar
+    PriceSeries per stock code. Codes without data in the range are left out.
+    """
+    from ..models.price_series import series_from_arrays
+
+    return series_from_arrays(get_transaction_arrays(stock_codes, start_date, end_date))
+
+def get_stock(stock_code: str) -> Optional[Stock]:
+    """Retrieves the stored metadata (name, market and ticker suffix) for a stock code."""
     conn = get_db_connection()
     cursor = conn.cursor()
     
     cursor.execute("""
-        SELECT * FROM transaction_data
-        WHERE stock_code = ? AND date = ?
-    """, (stock_code, target_date.isoformat()))
+        SELECT * FROM stocks
+        WHERE stock_code = ?
+    """, (stock_code,))
     
     row = cursor.fetchone()
-    conn.close()
     
     if row:
-        return TransactionData(
+        return Stock(
             stock_code=row['stock_code'],
             stock_name=row['stock_name'],
-            date=date.fromisoformat(row['date']),
-            open_price=row['open_price'],
-            close_price=row['close_price'],
-            high_price=row['high_price'],
-            low_price=row['low_price'],
-            volume=row['volume']
+            market=row['market'],
+            suffix=row['suffix']
         )
     return None
 
-def get_transaction_data_by_range(stock_code: str, start_date: date, end_date: date) -> List[TransactionData]:
-    """Retrieves all transaction data for a specific stock within a date range."""
+def save_stock(stock: Stock):
+    """
+    Saves the metadata for a stock code. Fields that are None keep their stored value,
+    so the name and the resolved suffix can be saved independently.
+    """
+    now = datetime.now().isoformat(timespec='seconds')
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO stocks (stock_code, stock_name, market, suffix, name_updated_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (stock_code) DO UPDATE SET
+                stock_name = COALESCE(excluded.stock_name, stock_name),
+                market = COALESCE(excluded.market, market),
+                suffix = COALESCE(excluded.suffix, suffix),
+                name_updated_at = COALESCE(excluded.name_updated_at, name_updated_at),
+                updated_at = excluded.updated_at
+        """, (stock.stock_code, stock.stock_name, stock.market, stock.suffix, now if stock.stock_name else None, now))
+
+def save_stock_names(names: Dict[str, str]):
+    """Saves the names for many stock codes in one transaction, keeping their other metadata."""
+    if not names:
+        return
+    now = datetime.now().isoformat(timespec='seconds')
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.executemany("""
+            INSERT INTO stocks (stock_code, stock_name, name_updated_at, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (stock_code) DO UPDATE SET
+                stock_name = excluded.stock_name,
+                name_updated_at = excluded.name_updated_at,
+                updated_at = excluded.updated_at
+        """, [(code, name, now, now) for code, name in names.items()])
+
+def get_stock_names(stock_codes: List[str], updated_after: Optional[datetime] = None) -> Dict[str, str]:
+    """
+    Retrieves the stored names for many stock codes with one query per 500 codes.
+    If updated_after is given, names saved before it are treated as stale and left out.
+    """
+    names = {}
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    for i in range(0, len(stock_codes), 500):
+        chunk = stock_codes[i:i + 500]
+        query = f"""
+            SELECT stock_code, stock_name FROM stocks
+            WHERE stock_code IN ({','.join('?' * len(chunk))}) AND stock_name IS NOT NULL
+        """
+        params = list(chunk)
+        if updated_after:
+            query += " AND name_updated_at > ?"
+            params.append(updated_after.isoformat(timespec='seconds'))
+        cursor.execute(query, params)
+        names.update({row['stock_code']: row['stock_name'] for row in cursor.fetchall()})
+    return names
+
+def save_no_data_days(stock_code: str, days: Iterable[date], expires_at: Optional[datetime] = None):
+    """
+    Records trading days on which a stock is known to have no data (e.g., holidays or suspensions).
+    Entries with an expires_at timestamp are ignored once it has passed; entries without one never expire.
+    """
+    expires = expires_at.isoformat(timespec='seconds') if expires_at else None
+    rows = [(stock_code, to_day_number(d), expires) for d in days]
+    if not rows:
+        return
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.executemany("""
+            INSERT OR REPLACE INTO no_data_days (stock_code, date, expires_at)
+            VALUES (?, ?, ?)
+        """, rows)
+
+def get_no_data_days(stock_code: str, start_date: date, end_date: date) -> Set[date]:
+    """Retrieves the unexpired no-data days for a specific stock within a date range."""
     conn = get_db_connection()
     cursor = conn.cursor()
     
     cursor.execute("""
-        SELECT * FROM transaction_data
+        SELECT date FROM no_data_days
         WHERE stock_code = ? AND date BETWEEN ? AND ?
-        ORDER BY date ASC
-    """, (stock_code, start_date.isoformat(), end_date.isoformat()))
+        AND (expires_at IS NULL OR expires_at > ?)
+    """, (stock_code, to_day_number(start_date), to_day_number(end_date), datetime.now().isoformat(timespec='seconds')))
     
     rows = cursor.fetchall()
-    conn.close()
     
-    return [
-        TransactionData(
-            stock_code=row['stock_code'],
-            stock_name=row['stock_name'],
-            date=date.fromisoformat(row['date']),
-            open_price=row['open_price'],
-            close_price=row['close_price'],
-            high_price=row['high_price'],
-            low_price=row['low_price'],
-            volume=row['volume']
-        ) for row in rows
-    ]
+    return {from_day_number(row['date']) for row in rows}
+
+def get_no_data_stocks(target_date: date, stock_codes: List[str]) -> Set[str]:
+    """Retrieves the stock codes with an unexpired no-data entry on one date, with one query per 500 codes."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    now = datetime.now().isoformat(timespec='seconds')
+    codes = set()
+    for i in range(0, len(stock_codes), 500):
+        chunk = stock_codes[i:i + 500]
+        cursor.execute(f"""
+            SELECT stock_code FROM no_data_days
+            WHERE date = ? AND stock_code IN ({','.join('?' * len(chunk))})
+            AND (expires_at IS NULL OR expires_at > ?)
+        """, (to_day_number(target_date), *chunk, now))
+        codes.update(row[0] for row in cursor.fetchall())
+    return codes
+
+def save_ticker_miss(stock_code: str, suffix: str, expires_at: datetime):
+    """Records that a ticker suffix (e.g., ".TW") returned no data for a stock code until expires_at."""
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT OR REPLACE INTO ticker_misses (stock_code, suffix, expires_at)
+            VALUES (?, ?, ?)
+        """, (stock_code, suffix, expires_at.isoformat(timespec='seconds')))
+
+def get_ticker_misses(stock_code: str) -> Set[str]:
+    """Retrieves the ticker suffixes currently known to return no data for a stock code."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        SELECT suffix FROM ticker_misses
+        WHERE stock_code = ? AND expires_at > ?
+    """, (stock_code, datetime.now().isoformat(timespec='seconds')))
+    
+    rows = cursor.fetchall()
+    
+    return {row['suffix'] for row in rows}
@@ -0,0 +1,301 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import date
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Callable, Dict, List, Optional, Union
+from urllib.error import HTTPError, URLError
+from urllib.parse import parse_qs, urlencode, urlparse
+from urllib.request import urlopen
+
+from ..lib import stats, trading_calendar
+from ..models.stock_data import MonthlySummary, PeriodStats, PeriodSummary, TransactionData, WeeklySummary
+from . import data_fetcher, summary_service
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Requests are handled on a fixed pool of threads, so each keeps its SQLite connection warm
+WORKERS = 8
+# Seconds the client waits for an answer; queries that miss the cache may download first
+CLIENT_TIMEOUT = 120
+
+def _records_to_json(records) -> List[Dict[str, Any]]:
+    return [{**asdict(record), "date": record.date.isoformat()} for record in records]
+
+def _records_from_json(rows: List[Dict[str, Any]]) -> List[TransactionData]:
+    return [TransactionData(**{**row, "date": date.fromisoformat(row["date"])}) for row in rows]
+
+def _aggregate_to_json(aggregate: Optional[PeriodStats]) -> Optional[Dict[str, Any]]:
+    if aggregate is None:
+        return None
+    return {**asdict(aggregate), "start_date": aggregate.start_date.isoformat(), "end_date": aggregate.end_date.isoformat()}
+
+def _aggregate_from_json(row: Optional[Dict[str, Any]]) -> Optional[PeriodStats]:
+    if row is None:
+        return None
+    return PeriodStats(**{**row, "start_date": date.fromisoformat(row["start_date"]), "end_date": date.fromisoformat(row["end_date"])})
+
+def _stock_codes(params: Dict[str, List[str]]) -> List[str]:
+    """Reads the comma-separated stocks parameter of a request."""
+    codes = [code.strip() for code in params.get("stocks", [""])[0].split(",") if code.strip()]
+    if not codes:
+        raise ValueError("The stocks parameter is required.")
+    return codes
+
+def _date(params: Dict[str, List[str]], name: str, default: Optional[date] = None) -> date:
+    """Reads a YYYY-MM-DD date parameter of a request."""
+    if name not in params:
+        if default is None:
+            raise ValueError(f"The {name} parameter is required.")
+        return default
+    try:
+        return date.fromisoformat(params[name][0])
+    except ValueError:
+        raise ValueError(f"Invalid {name}: {params[name][0]}. Please use YYYY-MM-DD.")
+
+def handle_daily(params: Dict[str, List[str]]) -> Dict[str, Any]:
+    day = _date(params, "date", date.today())
+    return {
+        "date": day.isoformat(),
+        "data": {code: _records_to_json(data_fetcher.fetch_stock_data(code, day, silent=True)) for code in _stock_codes(params)},
+    }
+
+def handle_snapshot(params: Dict[str, List[str]]) -> Dict[str, Any]:
+    day = _date(params, "date", date.today())
+    stock_codes = _stock_codes(params) if params.get("stocks") else None
+    return {"date": day.isoformat(), "data": _records_to_json(data_fetcher.snapshot(day, stock_codes, silent=True))}
+
+def handle_range(params: Dict[str, List[str]]) -> Dict[str, Any]:
+    start_date = _date(params, "start")
+    end_date = _date(params, "end", date.today())
+    if start_date > end_date:
+        raise ValueError("Start date cannot be after end date.")
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "data": {
+            code: _records_to_json(data_fetcher.fetch_stock_data_in_range(code, start_date, end_date, silent=True))
+            for code in _stock_codes(params)
+        },
+    }
+
+def handle_weekly(params: Dict[str, List[str]]) -> Dict[str, Any]:
+    today = _date(params, "date", date.today())
+    summaries = [summary_service.generate_weekly_summary(code, today) for code in _stock_codes(params)]
+    return {"summaries": [
+        {
+            "stock_code": summary.stock_code,
+            "start_date": summary.start_date.isoformat(),
+            "end_date": summary.end_date.isoformat(),
+            "data": _records_to_json(summary.data),
+            "aggregate": _aggregate_to_json(summary.aggregate),
+        }
+        for summary in summaries
+    ]}
+
+def handle_monthly(params: Dict[str, List[str]]) -> Dict[str, Any]:
+    today = _date(params, "date", date.today())
+    summaries = [summary_service.generate_monthly_summary(code, today) for code in _stock_codes(params)]
+    return {"summaries": [
+        {
+            "stock_code": summary.stock_code,
+            "month": summary.month,
+            "data": _records_to_json(summary.data),
+            "aggregate": _aggregate_to_json(summary.aggregate),
+        }
+        for summary in summaries
+    ]}
+
+def handle_periods(params: Dict[str, List[str]]) -> Dict[str, Any]:
+    start_date = _date(params, "start")
+    end_date = _date(params, "end", date.today())
+    period = params.get("period", [""])[0]
+    trading_calendar.period_bounds(start_date, period) # Raises ValueError for an unknown period
+    if start_date > end_date:
+        raise ValueError("Start date cannot be after end date.")
+    return {"summaries": {
+        code: [
+            {
+                "label": summary.label,
+                "start_date": summary.start_date.isoformat(),
+                "end_date": summary.end_date.isoformat(),
+                "data": _records_to_json(summary.data),
+                "aggregate": _aggregate_to_json(summary.aggregate),
+            }
+            for summary in summary_service.generate_period_summaries(code, start_date, end_date, period)
+        ]
+        for code in _stock_codes(params)
+    }}
+
+def handle_info(params: Dict[str, List[str]]) -> Dict[str, Any]:
+    return {"info": {code: summary_service.get_stock_info(code) for code in _stock_codes(params)}}
+
+def handle_metrics(params: Dict[str, List[str]]) -> str:
+    return stats.to_prometheus()
+
+# Endpoints answer with JSON, except /metrics, which uses the Prometheus text format
+ENDPOINTS: Dict[str, Callable[[Dict[str, List[str]]], Union[Dict[str, Any], str]]] = {
+    "/daily": handle_daily,
+    "/snapshot": handle_snapshot,
+    "/range": handle_range,
+    "/weekly": handle_weekly,
+    "/monthly": handle_monthly,
+    "/periods": handle_periods,
+    "/info": handle_info,
+    "/metrics": handle_metrics,
+}
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """Answers GET requests for the endpoints in ENDPOINTS."""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        handler = ENDPOINTS.get(url.path)
+        if handler is None:
+            self._send(404, {"error": f"Unknown endpoint: {url.path}"})
+            return
+        stats.increment("server.requests")
+        try:
+            with stats.timer(f"server.{url.path.strip('/')}"):
+                body = handler(parse_qs(url.query))
+        except ValueError as e:
+            self._send(400, {"error": str(e)})
+            return
+        except Exception as e:
+            stats.increment("server.errors")
+            self._send(500, {"error": str(e)})
+            return
+        self._send(200, body)
+
+    def _send(self, status: int, body: Union[Dict[str, Any], str]):
+        if isinstance(body, str):
+            payload, content_type = body.encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            payload, content_type = json.dumps(body, ensure_ascii=False).encode("utf-8"), "application/json"
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass # Requests are counted in stats instead of logged to stderr
+
+class QueryServer(HTTPServer):
+    """
+    HTTP server that handles requests on a fixed pool of worker threads. Unlike a thread per
+    request, the workers live as long as the server, so their SQLite connections stay open.
+    """
+
+    def __init__(self, address, workers: int = WORKERS):
+        super().__init__(address, QueryHandler)
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def process_request(self, request, client_address):
+        self._executor.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=True)
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, workers: int = WORKERS):
+    """Serves queries over HTTP until interrupted. The database must be initialized first."""
+    server = QueryServer((host, port), workers)
+    print(f"Serving stock data on http://{host}:{server.server_port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+class QueryClient:
+    """Sends queries to a running QueryServer and returns the same objects as the local functions."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+
+    def _get(self, endpoint: str, **params) -> Dict[str, Any]:
+        query = urlencode({name: value for name, value in params.items() if value is not None})
+        try:
+            with urlopen(f"{self.url}/{endpoint}?{query}", timeout=CLIENT_TIMEOUT) as response:
+                return json.loads(response.read())
+        except HTTPError as e:
+            raise ValueError(json.loads(e.read()).get("error", str(e)))
+        except URLError as e:
+            raise ConnectionError(f"Could not reach the server at {self.url}: {e.reason}")
+
+    def daily(self, stock_codes: List[str], day: date) -> List[List[TransactionData]]:
+        data = self._get("daily", stocks=",".join(stock_codes), date=day.isoformat())["data"]
+        return [_records_from_json(data.get(code, [])) for code in stock_codes]
+
+    def snapshot(self, day: date, stock_codes: Optional[List[str]] = None) -> List[TransactionData]:
+        stocks = ",".join(stock_codes) if stock_codes else None
+        return _records_from_json(self._get("snapshot", stocks=stocks, date=day.isoformat())["data"])
+
+    def ranges(self, stock_codes: List[str], start_date: date, end_date: date) -> Dict[str, List[TransactionData]]:
+        data = self._get("range", stocks=",".join(stock_codes), start=start_date.isoformat(), end=end_date.isoformat())["data"]
+        return {code: _records_from_json(data.get(code, [])) for code in stock_codes}
+
+    def weekly(self, stock_codes: List[str], today: date) -> List[WeeklySummary]:
+        from ..models.price_series import PriceSeries
+
+        summaries = self._get("weekly", stocks=",".join(stock_codes), date=today.isoformat())["summaries"]
+        return [
+            WeeklySummary(
+                stock_code=s["stock_code"],
+                start_date=date.fromisoformat(s["start_date"]),
+                end_date=date.fromisoformat(s["end_date"]),
+                data=PriceSeries.from_records(_records_from_json(s["data"]), s["stock_code"]),
+                aggregate=_aggregate_from_json(s["aggregate"])
+            )
+            for s in summaries
+        ]
+
+    def monthly(self, stock_codes: List[str], today: date) -> List[MonthlySummary]:
+        from ..models.price_series import PriceSeries
+
+        summaries = self._get("monthly", stocks=",".join(stock_codes), date=today.isoformat())["summaries"]
+        return [
+            MonthlySummary(
+                stock_code=s["stock_code"],
+                month=s["month"],
+                data=PriceSeries.from_records(_records_from_json(s["data"]), s["stock_code"]),
+                aggregate=_aggregate_from_json(s["aggregate"])
+            )
+            for s in summaries
+        ]
+
+    def periods(self, stock_codes: List[str], start_date: date, end_date: date, period: str) -> List[List[PeriodSummary]]:
+        from ..models.price_series import PriceSeries
+
+        summaries = self._get(
+            "periods", stocks=",".join(stock_codes), start=start_date.isoformat(), end=end_date.isoformat(), period=period
+        )["summaries"]
+        return [
+            [
+                PeriodSummary(
+                    stock_code=code,
+                    period=period,
+                    label=s["label"],
+                    start_date=date.fromisoformat(s["start_date"]),
+                    end_date=date.fromisoformat(s["end_date"]),
+                    data=PriceSeries.from_records(_records_from_json(s["data"]), code),
+                    aggregate=_aggregate_from_json(s["aggregate"])
+                )
+                for s in summaries.get(code, [])
+            ]
+            for code in stock_codes
+        ]
+
+    def info(self, stock_codes: List[str]) -> List[Optional[Dict[str, Any]]]:
+        info = self._get("info", stocks=",".join(stock_codes))["info"]
+        return [info.get(code) for code in stock_codes]
@@ -1,26 +1,27 @@
-import os
-import contextlib
 from datetime import date, timedelta
-from typing import List
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
-from ..models.stock_data import TransactionData, WeeklySummary, MonthlySummary
+from ..lib import concurrency, formatting, stats, trading_calendar
+from ..models.stock_data import PeriodStats, PeriodSummary, Stock, TransactionData, WeeklySummary, MonthlySummary
 from . import data_fetcher, db_service
+from .data_source import get_data_source
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from ..models.price_series import PriceSeries
 
 def get_data_for_date_range(
     stock_code: str, start_date: date, end_date: date
-) -> List[TransactionData]:
-    """Retrieves all transaction data for a stock for a given date range from the database."""
-    all_data = []
-    current_date = start_date
-    while current_date <= end_date:
-        # Assuming fetch_stock_data will now primarily hit the cache for recent data
-        data = data_fetcher.fetch_stock_data(stock_code, current_date, silent=True)
-        if data:
-            all_data.extend(data)
-        current_date += timedelta(days=1)
-    return all_data
+) -> "PriceSeries":
+    """
+    Retrieves all transaction data for a stock for a given date range as a columnar PriceSeries.
+    Cached days are read from the database and only missing trading days are downloaded.
+    """
+    return data_fetcher.fetch_price_series_in_range(stock_code, start_date, end_date, silent=True)
 
 
+@stats.timed("summary.weekly")
 def generate_weekly_summary(stock_code: str, today: date) -> WeeklySummary:
     """
     Generates a weekly summary for a given stock code for the current week (Monday to Friday).
@@ -36,14 +37,15 @@ def generate_weekly_summary(stock_code: str, today: date) -> WeeklySummary:
         stock_code=stock_code,
         start_date=start_of_week,
         end_date=end_of_week,
-        data=weekly_data
+        data=weekly_data,
+        aggregate=summarize(weekly_data)
     )
 
     return summary
 
 def get_past_month_data(
     stock_code: str, year: int, month: int
-) -> List[TransactionData]:
+) -> "PriceSeries":
     """Retrieves all transaction data for a stock for a specific month."""
     import calendar
 
@@ -51,15 +53,9 @@ def get_past_month_data(
     start_date = date(year, month, 1)
     end_date = date(year, month, num_days)
 
-    all_data = []
-    current_date = start_date
-    while current_date <= end_date:
-        data = data_fetcher.fetch_stock_data(stock_code, current_date, silent=True)
-        if data:
-            all_data.extend(data)
-        current_date += timedelta(days=1)
-    return all_data
+    return get_data_for_date_range(stock_code, start_date, end_date)
 
+@stats.timed("summary.monthly")
 def generate_monthly_summary(stock_code: str, today: date) -> MonthlySummary:
     """
     Generates a monthly summary for the previous month.
@@ -75,61 +71,270 @@ def generate_monthly_summary(stock_code: str, today: date) -> MonthlySummary:
     summary = MonthlySummary(
         stock_code=stock_code,
         month=f"{year}-{month:02d}",
-        data=monthly_data
+        data=monthly_data,
+        aggregate=summarize(monthly_data)
     )
 
     return summary
 
+def period_label(start_date: date, period: str) -> str:
+    """Returns the display name of the period starting on start_date, e.g., "2025-Q3"."""
+    if period == "month":
+        return f"{start_date.year}-{start_date.month:02d}"
+    if period == "quarter":
+        return f"{start_date.year}-Q{(start_date.month - 1) // 3 + 1}"
+    return start_date.isoformat()
+
+def periods_back(today: date, period: str, count: int) -> Tuple[date, date]:
+    """
+    Returns the date range of the last count periods, matching the single-period summaries:
+    weeks end with the current week (Monday to Friday), while months and quarters end with
+    the last one completed before today's.
+    """
+    if period == "week":
+        start_of_week, _ = trading_calendar.period_bounds(today, "week")
+        return start_of_week - timedelta(weeks=count - 1), start_of_week + timedelta(days=4)
+    current_start, _ = trading_calendar.period_bounds(today, period)
+    start_date = current_start
+    for _ in range(count):
+        start_date, _ = trading_calendar.period_bounds(start_date - timedelta(days=1), period)
+    return start_date, current_start - timedelta(days=1)
+
+@stats.timed("summary.period_summaries")
+def generate_period_summaries(stock_code: str, start_date: date, end_date: date, period: str) -> List[PeriodSummary]:
+    """
+    Generates one summary per week, month or quarter from start_date to end_date. The whole
+    range is fetched with one ranged call and split into periods in memory; the first and
+    last period are cut to the range. The aggregates of whole weeks and months that ended
+    before today are read from the rollup tables kept by db_service, like in summarize_many;
+    the other periods are aggregated from their daily rows.
+    """
+    series = get_data_for_date_range(stock_code, start_date, end_date)
+    rollups = {}
+    if period in db_service.ROLLUP_TABLES:
+        rollups = {
+            trading_calendar.period_bounds(rollup.start_date, period)[0]: rollup
+            for rollup in db_service.get_rollups([stock_code], period, start_date, end_date).get(stock_code, [])
+        }
+    today = date.today()
+    summaries = []
+    period_start, period_end = trading_calendar.period_bounds(start_date, period)
+    while period_start <= end_date:
+        # Like generate_weekly_summary, a week is reported as Monday to Friday
+        full_end = period_start + timedelta(days=4) if period == "week" else period_end
+        first_day, last_day = max(period_start, start_date), min(full_end, end_date)
+        data = series.between(first_day, last_day)
+        if first_day == period_start and last_day == full_end and last_day < today and period_start in rollups:
+            aggregate = rollups[period_start]
+        else:
+            aggregate = summarize(data)
+        summaries.append(PeriodSummary(
+            stock_code=stock_code,
+            period=period,
+            label=period_label(period_start, period),
+            start_date=first_day,
+            end_date=last_day,
+            data=data,
+            aggregate=aggregate
+        ))
+        period_start, period_end = trading_calendar.period_bounds(period_end + timedelta(days=1), period)
+    return summaries
+
+def _to_period_stats(stock_codes: List[str], dates: "np.ndarray", result: Dict[str, "np.ndarray"]) -> List[PeriodStats]:
+    """Converts the arrays returned by indicators.aggregate into PeriodStats, one per period."""
+    import math
+
+    columns = {name: values.tolist() for name, values in result.items()}
+    return [
+        PeriodStats(
+            stock_code=stock_codes[first],
+            start_date=dates[first].item(),
+            end_date=dates[last].item(),
+            open_price=open_price,
+            high_price=high_price,
+            low_price=low_price,
+            close_price=close_price,
+            volume=volume,
+            vwap=None if math.isnan(vwap) else vwap,
+            period_return=period_return,
+            volatility=None if math.isnan(volatility) else volatility,
+            trading_days=trading_days,
+        )
+        for first, last, open_price, high_price, low_price, close_price, volume, vwap, period_return, volatility, trading_days in zip(
+            columns["first"], columns["last"], columns["open"], columns["high"], columns["low"], columns["close"],
+            columns["volume"], columns["vwap"], columns["return"], columns["volatility"], columns["trading_days"]
+        )
+    ]
+
+def summarize_periods(series: "PriceSeries", period: str) -> List[PeriodStats]:
+    """
+    Aggregates the daily data of a series into one PeriodStats per week or month (see
+    indicators.PERIODS), computed with vectorized operations over the whole series.
+    """
+    from ..lib import indicators
+
+    starts = indicators.group_starts(indicators.period_keys(series.dates, period))
+    result = indicators.aggregate(starts, series.open_prices, series.high_prices, series.low_prices,
+                                  series.close_prices, series.volumes)
+    return _to_period_stats([series.stock_code] * len(series), series.dates, result)
+
+def summarize(series: "PriceSeries") -> Optional[PeriodStats]:
+    """Aggregates all the daily data of a series into one PeriodStats, or None if it is empty."""
+    import numpy as np
+
+    from ..lib import indicators
+
+    if not len(series):
+        return None
+    # The whole series is a single period starting at its first row
+    result = indicators.aggregate(np.zeros(1, dtype='int64'), series.open_prices, series.high_prices, series.low_prices,
+                                  series.close_prices, series.volumes)
+    return _to_period_stats([series.stock_code] * len(series), series.dates, result)[0]
+
+def _aggregate_daily(stock_codes: List[str], start_date: date, end_date: date, period: str) -> Dict[str, List[PeriodStats]]:
+    """Aggregates the cached daily rows of many stocks into periods, in one vectorized pass."""
+    from ..lib import indicators
+
+    arrays = db_service.get_transaction_arrays(stock_codes, start_date, end_date)
+    codes = arrays['stock_code']
+    starts = indicators.group_starts(codes, indicators.period_keys(arrays['date'], period))
+    result = indicators.aggregate(starts, arrays['open_price'], arrays['high_price'], arrays['low_price'],
+                                  arrays['close_price'], arrays['volume'])
+
+    summaries = {}
+    for period_stats in _to_period_stats(codes, arrays['date'], result):
+        summaries.setdefault(period_stats.stock_code, []).append(period_stats)
+    return summaries
+
+@stats.timed("summary.periods")
+def summarize_many(stock_codes: List[str], start_date: date, end_date: date, period: str,
+                   fetch_missing: bool = True) -> Dict[str, List[PeriodStats]]:
+    """
+    Aggregates the daily data of many stocks into weekly, monthly or quarterly PeriodStats.
+    Weeks and months that lie entirely within the range and ended before today can no longer
+    change, so they are read from the rollup tables kept by db_service; only the partial
+    periods at either end are aggregated from daily rows. Missing days are downloaded first
+    unless fetch_missing is False, in which case only the local database is read. Stocks
+    without data map to an empty list.
+    """
+    if fetch_missing:
+        data_fetcher.cache_range(stock_codes, start_date, end_date, silent=True)
+
+    # 1. Find the closed periods that lie entirely within the range
+    first_start, _ = trading_calendar.period_bounds(start_date, period)
+    if first_start < start_date:
+        first_start = trading_calendar.period_bounds(start_date, period)[1] + timedelta(days=1)
+    closed_until = min(end_date, date.today() - timedelta(days=1))
+    last_start, last_end = trading_calendar.period_bounds(closed_until, period)
+    if last_end > closed_until:
+        last_end = last_start - timedelta(days=1)
+    if first_start > last_end or period not in db_service.ROLLUP_TABLES:
+        parts = [_aggregate_daily(stock_codes, start_date, end_date, period)]
+        return {code: parts[0].get(code, []) for code in stock_codes}
+
+    # 2. Read them from the rollups and aggregate the partial periods before and after them
+    parts = [db_service.get_rollups(stock_codes, period, first_start, last_end)]
+    if start_date < first_start:
+        parts.insert(0, _aggregate_daily(stock_codes, start_date, first_start - timedelta(days=1), period))
+    if last_end < end_date:
+        parts.append(_aggregate_daily(stock_codes, last_end + timedelta(days=1), end_date, period))
+    return {code: [p for part in parts for p in part.get(code, [])] for code in stock_codes}
+
+def compute_indicators(series: "PriceSeries", sma_window: int = 20, ema_span: int = 20,
+                       rsi_period: int = 14, atr_period: int = 14) -> Dict[str, "np.ndarray"]:
+    """
+    Computes rolling indicators over a whole series: "sma" and "ema" of the close, "rsi" and
+    "atr". Each is an array aligned with series.dates and NaN until its window is full, so
+    callers that need values from the first day should include enough earlier days.
+    """
+    from ..lib import indicators
+
+    return {
+        "date": series.dates,
+        "sma": indicators.sma(series.close_prices, sma_window),
+        "ema": indicators.ema(series.close_prices, ema_span),
+        "rsi": indicators.rsi(series.close_prices, rsi_period),
+        "atr": indicators.atr(series.high_prices, series.low_prices, series.close_prices, atr_period),
+    }
+
+@stats.timed("summary.indicators")
+def compute_indicators_many(stock_codes: List[str], start_date: date, end_date: date, **windows) -> Dict[str, Dict[str, "np.ndarray"]]:
+    """
+    Computes the indicators of compute_indicators for many stocks. Missing days are downloaded
+    first and all stocks are then read with one columnar query.
+    """
+    from ..models.price_series import PriceSeries
+
+    data_fetcher.cache_range(stock_codes, start_date, end_date, silent=True)
+    series = db_service.get_price_series(stock_codes, start_date, end_date)
+    return {
+        code: compute_indicators(series.get(code) or PriceSeries.empty(code), **windows)
+        for code in stock_codes
+    }
+
 def display_date_range_data(stock_code: str, start_date: date, end_date: date):
     """Fetches and displays transaction data for a given stock and date range."""
+    print_date_range_data(stock_code, start_date, end_date, data_fetcher.fetch_stock_data_in_range(stock_code, start_date, end_date))
+
+def print_date_range_data(stock_code: str, start_date: date, end_date: date, data: List[TransactionData]):
+    """Displays transaction data previously fetched for a stock and date range."""
     print(f"--- Transaction Data for {stock_code} from {start_date} to {end_date} ---")
     
-    data = data_fetcher.fetch_stock_data_in_range(stock_code, start_date, end_date)
-    
+    # A display-sized range is printed with the lightweight formatter, so a cache hit never loads pandas
     if data:
-        import pandas as pd
-        df = pd.DataFrame(data)
-        # Reorder columns to place stock_name after stock_code
-        cols = ['stock_code', 'stock_name', 'date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume']
-        df_cols = [col for col in cols if col in df.columns]
-        df = df[df_cols]
-        print(df.to_string(index=False))
+        with stats.timer("format.table"):
+            print(formatting.format_transactions(data))
     else:
         print("No data found for the specified date range.")
 
-
-import yfinance as yf
-
-def display_stock_info(stock_code: str):
-    """Fetches and displays key investment metrics for a given stock code."""
-    print(f"--- Key Investment Metrics for {stock_code} ---")
-    
+@stats.timed("summary.info")
+def get_stock_info(stock_code: str) -> Optional[Dict[str, Any]]:
+    """
+    Fetches key investment metrics for a given stock code.
+    Returns None if no information could be retrieved. Safe to call from worker threads.
+    """
     ticker = None
     info = None
-    
-    # Try different suffixes for Taiwan stocks. The language of the info (e.g., Chinese for longName)
+
+    # A stock whose suffix was resolved before is looked up directly. Otherwise, try different
+    # suffixes for Taiwan stocks. The language of the info (e.g., Chinese for longName)
     # depends on the data source (Yahoo Finance) and is handled automatically.
-    with open(os.devnull, 'w') as devnull:
-        with contextlib.redirect_stderr(devnull):
-            for suffix in [".TW", ".TWO", ""]:
-                try:
-                    temp_ticker = yf.Ticker(f"{stock_code}{suffix}")
-                    # The 'info' attribute can be slow; check a lightweight attribute first
-                    if temp_ticker.history(period="1d").empty:
+    stock = db_service.get_stock(stock_code)
+    known = bool(stock and stock.suffix)
+    suffixes = [stock.suffix] if known else [".TW", ".TWO", ""]
+    source = get_data_source()
+    with concurrency.suppress_stderr():
+        for suffix in suffixes:
+            try:
+                temp_ticker = f"{stock_code}{suffix}"
+                # The info lookup can be slow; check a lightweight request first
+                if not known:
+                    data_fetcher.throttle()
+                    with stats.timer("network.history"):
+                        history = source.history(temp_ticker, period="1d")
+                    if history.empty:
                         continue
-                    info = temp_ticker.info
-                    # Check if we got meaningful data
-                    if info and info.get('longName'):
-                        ticker = temp_ticker
-                        break
-                except Exception:
-                    continue
+                data_fetcher.throttle()
+                with stats.timer("network.info"):
+                    info = source.info(temp_ticker)
+                # Check if we got meaningful data
+                if info and info.get('longName'):
+                    ticker = temp_ticker
+                    if suffix in data_fetcher.MARKETS and (not known or stock.stock_name != info['longName']):
+                        db_service.save_stock(Stock(
+                            stock_code=stock_code,
+                            stock_name=info['longName'],
+                            market=data_fetcher.MARKETS[suffix],
+                            suffix=suffix
+                        ))
+                    break
+            except Exception:
+                continue
 
     if not ticker or not info:
-        print(f"Could not retrieve information for stock code: {stock_code}")
-        return
+        return None
 
-    key_metrics = {
+    return {
         "公司名稱": info.get("longName"),
         "產業": info.get("industry"),
         "市值": f"{info.get('marketCap', 'N/A'):,}",
@@ -143,6 +348,17 @@ def display_stock_info(stock_code: str):
         "52週最低價": info.get("fiftyTwoWeekLow"),
     }
 
+def print_stock_info(stock_code: str, key_metrics: Optional[Dict[str, Any]]):
+    """Displays key investment metrics previously fetched with get_stock_info."""
+    print(f"--- Key Investment Metrics for {stock_code} ---")
+
+    if not key_metrics:
+        print(f"Could not retrieve information for stock code: {stock_code}")
+        return
+
     for key, value in key_metrics.items():
         print(f"{key+':':<20} {value if value is not None else 'N/A'}")
 
+def display_stock_info(stock_code: str):
+    """Fetches and displays key investment metrics for a given stock code."""
+    print_stock_info(stock_code, get_stock_info(stock_code))
@@ -2,12 +2,15 @@ import os
 import unittest
 from unittest.mock import patch, MagicMock
 from io import StringIO
+import subprocess
 import sys
 from datetime import date, datetime, timedelta
 
 from src.cli import main
-from src.models.stock_data import TransactionData, WeeklySummary, MonthlySummary
-from src.services import db_service, data_fetcher
+from src.models.price_series import PriceSeries
+from src.models.stock_data import PeriodSummary, TransactionData, WeeklySummary, MonthlySummary
+from src.services import db_service, data_fetcher, summary_service
+from src.services.data_source import FetchError
 
 
 class TestCli(unittest.TestCase):
@@ -51,6 +54,41 @@ class TestCli(unittest.TestCase):
         self.assertIn("TSMC", output)
         mock_db_service.initialize_db.assert_called_once()
 
+    @patch('src.cli.main.data_fetcher')
+    @patch('src.cli.main.db_service')
+    def test_snapshot_display(self, mock_db_service, mock_data_fetcher):
+        """Test the CLI for a snapshot of one date, with and without --stocks."""
+        mock_data_fetcher.snapshot.return_value = [
+            TransactionData("2317", "Hon Hai", date(2025, 9, 1), 100.0, 102.0, 103.0, 99.0, 200),
+            TransactionData("2330", "TSMC", date(2025, 9, 1), 900.0, 905.0, 910.0, 899.0, 50000),
+        ]
+        sys.argv = ['main.py', '--snapshot', '2025-09-01']
+
+        main.main()
+
+        output = self.captured_output.getvalue()
+        self.assertIn("--- Market Snapshot for 2025-09-01 (2 stocks) ---", output)
+        self.assertIn("Hon Hai", output)
+        mock_data_fetcher.snapshot.assert_called_with(date(2025, 9, 1), None)
+
+        sys.argv = ['main.py', '--snapshot', '--stocks', '2330, 2317']
+        main.main()
+        mock_data_fetcher.snapshot.assert_called_with(date.today(), ["2330", "2317"])
+
+    @patch('src.cli.main.data_fetcher')
+    @patch('src.cli.main.db_service')
+    def test_snapshot_failure(self, mock_db_service, mock_data_fetcher):
+        """Test that a snapshot whose downloads failed reports the codes on stderr and exits with status 1."""
+        mock_data_fetcher.snapshot.side_effect = FetchError("Could not fetch data for 2317: reset", ["2317"])
+        sys.argv = ['main.py', '--snapshot', '2025-09-01', '--stocks', '2330,2317']
+
+        with self.assertRaises(SystemExit) as exited:
+            main.main()
+
+        self.assertEqual(exited.exception.code, 1)
+        self.assertIn("Error: Could not fetch data for 2317", self.captured_stderr.getvalue())
+        self.assertNotIn("No data found", self.captured_output.getvalue())
+
     @patch('src.cli.main.summary_service.generate_weekly_summary')
     @patch('src.cli.main.db_service')
     def test_weekly_summary_display(self, mock_db_service, mock_generate_weekly_summary):
@@ -59,14 +97,15 @@ class TestCli(unittest.TestCase):
         test_date = date.today()
         stock_code = "2330"
         
-        mock_summary_data = [
-            {'stock_code': stock_code, 'stock_name': 'TSMC', 'date': test_date, 'open_price': 890.0, 'close_price': 905.0, 'high_price': 910.0, 'low_price': 888.0, 'volume': 45000}
-        ]
+        mock_summary_data = PriceSeries.from_records([
+            TransactionData(stock_code=stock_code, stock_name='TSMC', date=test_date, open_price=890.0, close_price=905.0, high_price=910.0, low_price=888.0, volume=45000)
+        ])
         mock_summary = WeeklySummary(
             stock_code=stock_code,
             start_date=test_date - timedelta(days=test_date.weekday()),
             end_date=(test_date - timedelta(days=test_date.weekday())) + timedelta(days=4),
-            data=mock_summary_data
+            data=mock_summary_data,
+            aggregate=summary_service.summarize(mock_summary_data)
         )
         
         mock_generate_weekly_summary.return_value = mock_summary
@@ -81,6 +120,7 @@ class TestCli(unittest.TestCase):
         self.assertIn(stock_code, output)
         self.assertIn("TSMC", output)
         self.assertIn("905.0", output) # Check for close price
+        self.assertIn("Return +1.69%", output) # Aggregated over the week
         mock_db_service.initialize_db.assert_called_once()
         mock_generate_weekly_summary.assert_called_once_with(stock_code, test_date)
 
@@ -92,9 +132,9 @@ class TestCli(unittest.TestCase):
         test_date = date.today()
         stock_code = "2317"
         
-        mock_summary_data = [
-            {'stock_code': stock_code, 'stock_name': 'Hon Hai', 'date': test_date.replace(day=15), 'open_price': 100.0, 'close_price': 102.0, 'high_price': 103.0, 'low_price': 99.0, 'volume': 12000}
-        ]
+        mock_summary_data = PriceSeries.from_records([
+            TransactionData(stock_code=stock_code, stock_name='Hon Hai', date=test_date.replace(day=15), open_price=100.0, close_price=102.0, high_price=103.0, low_price=99.0, volume=12000)
+        ])
         mock_summary = MonthlySummary(
             stock_code=stock_code,
             month="2025-09", # Example month
@@ -138,6 +178,38 @@ class TestCli(unittest.TestCase):
             end_date=datetime.strptime(end_date_str, "%Y-%m-%d").date()
         )
 
+    @patch('src.cli.main.data_fetcher')
+    @patch('src.cli.main.db_service')
+    def test_stream_range_as_csv(self, mock_db_service, mock_data_fetcher):
+        """Test that --stream fills the cache and then writes the rows read from the database."""
+        mock_db_service.iter_transaction_data.return_value = iter([
+            TransactionData("2330", "TSMC", date(2025, 9, 1), 900.0, 905.0, 910.0, 899.0, 10000),
+        ])
+        sys.argv = ['main.py', '--stocks', '2330', '--start-date', '2025-09-01', '--end-date', '2025-09-05', '--stream', 'csv']
+
+        main.main()
+
+        self.assertEqual(self.captured_output.getvalue().splitlines(), [
+            "stock_code,stock_name,date,open_price,high_price,low_price,close_price,volume",
+            "2330,TSMC,2025-09-01,900.0,910.0,899.0,905.0,10000",
+        ])
+        mock_data_fetcher.cache_range.assert_called_once_with(["2330"], date(2025, 9, 1), date(2025, 9, 5), silent=True)
+        mock_db_service.iter_transaction_data.assert_called_once_with(["2330"], date(2025, 9, 1), date(2025, 9, 5))
+
+    @patch('src.cli.main.data_fetcher')
+    @patch('src.cli.main.db_service')
+    def test_stream_with_stats(self, mock_db_service, mock_data_fetcher):
+        """Test that --stats prints its summary to stderr with --stream, keeping stdout to the rows."""
+        mock_db_service.iter_transaction_data.return_value = iter([
+            TransactionData("2330", "TSMC", date(2025, 9, 1), 900.0, 905.0, 910.0, 899.0, 10000),
+        ])
+        sys.argv = ['main.py', '--stocks', '2330', '--start-date', '2025-09-01', '--stream', 'jsonl', '--stats']
+
+        main.main()
+
+        self.assertEqual(len(self.captured_output.getvalue().splitlines()), 1)
+        self.assertIn("--- Statistics ---", self.captured_stderr.getvalue())
+
     @patch('src.cli.main.db_service')
     def test_invalid_date_format_handling(self, mock_db_service):
         """Test that an invalid date format exits and prints an error."""
@@ -242,6 +314,179 @@ class TestCli(unittest.TestCase):
             end_date=expected_end_date
         )
 
+    @patch('src.cli.main.data_fetcher')
+    @patch('src.cli.main.db_service')
+    def test_daily_data_with_workers_keeps_order(self, mock_db_service, mock_data_fetcher):
+        """Test that concurrent daily fetching prints the stocks in the order they were given."""
+        test_date = date.today()
+
+        def fetch(code, fetch_date):
+            return [TransactionData(code, f"Name {code}", fetch_date, 100.0, 101.0, 102.0, 99.0, 1000)]
+
+        mock_data_fetcher.fetch_stock_data.side_effect = fetch
+        sys.argv = ['main.py', '--stocks', '2330,2317,6488', '--workers', '3']
+
+        main.main()
+
+        output = self.captured_output.getvalue()
+        self.assertEqual(mock_data_fetcher.fetch_stock_data.call_count, 3)
+        self.assertLess(output.index("Name 2330"), output.index("Name 2317"))
+        self.assertLess(output.index("Name 2317"), output.index("Name 6488"))
+
+    @patch('src.cli.main.summary_service.get_stock_info')
+    @patch('src.cli.main.db_service')
+    def test_info_display(self, mock_db_service, mock_get_stock_info):
+        """Test that --info prints the metrics for every stock, including failures."""
+        mock_get_stock_info.side_effect = lambda code: {"公司名稱": "TSMC"} if code == "2330" else None
+        sys.argv = ['main.py', '--stocks', '2330,0000', '--info', '--workers', '2']
+
+        main.main()
+
+        output = self.captured_output.getvalue()
+        self.assertIn("--- Key Investment Metrics for 2330 ---", output)
+        self.assertIn("TSMC", output)
+        self.assertIn("Could not retrieve information for stock code: 0000", output)
+
+    @patch('src.cli.main.db_service')
+    def test_invalid_workers_handling(self, mock_db_service):
+        """Test that a non-positive worker count is rejected."""
+        sys.argv = ['main.py', '--stocks', '2330', '--workers', '0']
+
+        with self.assertRaises(SystemExit):
+            main.main()
+
+        self.assertIn("must be a positive integer", self.captured_stderr.getvalue())
+
+    @patch('src.cli.main.data_fetcher')
+    @patch('src.cli.main.db_service')
+    def test_backfill(self, mock_db_service, mock_data_fetcher):
+        """Test that --backfill streams every stock into one bulk writer and reports the rate."""
+        writer = mock_db_service.BulkWriter.return_value.__enter__.return_value
+        writer.rows_written = 1200
+        writer.elapsed = 2.0
+        writer.rows_per_second = 600.0
+        sys.argv = ['main.py', '--stocks', '2330,2317', '--start-date', '2024-01-01', '--backfill']
+
+        main.main()
+
+        mock_db_service.BulkWriter.assert_called_once_with(relax_durability=True)
+        mock_data_fetcher.backfill.assert_called_once_with(["2330", "2317"], date(2024, 1, 1), date.today(), writer)
+        self.assertIn("Backfilled 1200 rows for 2 stocks in 2.0s (600 rows/s).", self.captured_output.getvalue())
+
+    @patch('src.cli.main.data_fetcher')
+    @patch('src.cli.main.db_service')
+    def test_sync(self, mock_db_service, mock_data_fetcher):
+        """Test that --sync updates every stock to today and prints the row counts."""
+        mock_data_fetcher.sync.return_value = {"2330": 3, "2317": 0}
+        sys.argv = ['main.py', '--stocks', '2330,2317', '--sync']
+
+        main.main()
+
+        mock_data_fetcher.sync.assert_called_once_with(["2330", "2317"], date.today(), None)
+        output = self.captured_output.getvalue()
+        self.assertIn("2330: 3 rows synced", output)
+        self.assertIn("2317: 0 rows synced", output)
+
+    @patch('src.cli.main.data_fetcher')
+    @patch('src.cli.main.db_service')
+    def test_stats_summary(self, mock_db_service, mock_data_fetcher):
+        """Test that --stats prints the collected statistics at the end of the run."""
+        mock_data_fetcher.fetch_stock_data.return_value = []
+        sys.argv = ['main.py', '--stocks', '2330', '--stats']
+
+        main.main()
+
+        output = self.captured_output.getvalue()
+        self.assertIn("No data found for the specified stocks on this date.", output)
+        self.assertIn("--- Statistics ---", output)
+
+    @patch('src.cli.main.summary_service.generate_period_summaries')
+    @patch('src.cli.main.db_service')
+    def test_months_back(self, mock_db_service, mock_generate_period_summaries):
+        """Test that --months-back asks for the whole span of months in one call per stock."""
+        mock_generate_period_summaries.return_value = []
+        sys.argv = ['main.py', '--stocks', '2330,2317', '--months-back', '60']
+
+        main.main()
+
+        start_date, end_date = summary_service.periods_back(date.today(), "month", 60)
+        mock_generate_period_summaries.assert_any_call("2330", start_date, end_date, "month")
+        self.assertEqual(mock_generate_period_summaries.call_count, 2)
+        self.assertIn(f"--- Monthly Summaries for 2317 from {start_date} to {end_date} ---", self.captured_output.getvalue())
+
+    @patch('src.cli.main.summary_service.generate_period_summaries')
+    @patch('src.cli.main.db_service')
+    def test_quarter_interval(self, mock_db_service, mock_generate_period_summaries):
+        """Test that --interval splits the date range into quarters and prints a row per quarter."""
+        records = [TransactionData("2330", "TSMC", date(2025, 7, 1), 900.0, 905.0, 910.0, 899.0, 1000)]
+        data = PriceSeries.from_records(records)
+        mock_generate_period_summaries.return_value = [
+            PeriodSummary("2330", "quarter", "2025-Q3", date(2025, 7, 1), date(2025, 9, 30), data, summary_service.summarize(data)),
+            PeriodSummary("2330", "quarter", "2025-Q4", date(2025, 10, 1), date(2025, 10, 15), PriceSeries.empty("2330")),
+        ]
+        sys.argv = ['main.py', '--stocks', '2330', '--interval', 'quarter', '--start-date', '2025-07-01', '--end-date', '2025-10-15']
+
+        main.main()
+
+        mock_generate_period_summaries.assert_called_once_with("2330", date(2025, 7, 1), date(2025, 10, 15), "quarter")
+        output = self.captured_output.getvalue()
+        self.assertIn("--- Quarterly Summaries for 2330 from 2025-07-01 to 2025-10-15 ---", output)
+        self.assertIn("2025-Q3", output)
+        self.assertIn("+0.56%", output)
+        self.assertIn("2025-Q4", output)
+
+    @patch('src.cli.main.db_service')
+    def test_interval_requires_start_date(self, mock_db_service):
+        """Test that --interval without --start-date is rejected."""
+        sys.argv = ['main.py', '--stocks', '2330', '--interval', 'quarter']
+
+        with self.assertRaises(SystemExit):
+            main.main()
+
+        self.assertIn("--start-date is required with --interval", self.captured_stderr.getvalue())
+
+    @patch('src.services.server.QueryClient')
+    @patch('src.cli.main.data_fetcher')
+    @patch('src.cli.main.db_service')
+    def test_query_through_server(self, mock_db_service, mock_data_fetcher, mock_client_class):
+        """Test that --server sends the query to the server and leaves the local database alone."""
+        record = TransactionData("2330", "TSMC", date(2025, 9, 1), 900.0, 905.0, 910.0, 899.0, 10000)
+        mock_client_class.return_value.ranges.return_value = {"2330": [record]}
+        sys.argv = ['main.py', '--stocks', '2330', '--start-date', '2025-09-01', '--end-date', '2025-09-05',
+                    '--server', 'http://127.0.0.1:8765']
+
+        main.main()
+
+        mock_client_class.assert_called_once_with('http://127.0.0.1:8765')
+        mock_client_class.return_value.ranges.assert_called_once_with(["2330"], date(2025, 9, 1), date(2025, 9, 5))
+        mock_db_service.initialize_db.assert_not_called()
+        mock_data_fetcher.fetch_stock_data_in_range.assert_not_called()
+        output = self.captured_output.getvalue()
+        self.assertIn("--- Transaction Data for 2330 from 2025-09-01 to 2025-09-05 ---", output)
+        self.assertIn("905.0", output)
+
+    @patch('src.services.server.QueryClient')
+    @patch('src.cli.main.db_service')
+    def test_unreachable_server_handling(self, mock_db_service, mock_client_class):
+        """Test that a server that cannot be reached is reported as an error."""
+        mock_client_class.return_value.daily.side_effect = ConnectionError("Could not reach the server")
+        sys.argv = ['main.py', '--stocks', '2330', '--server', 'http://127.0.0.1:8765']
+
+        with self.assertRaises(SystemExit):
+            main.main()
+
+        self.assertIn("Error: Could not reach the server", self.captured_stderr.getvalue())
+
+    def test_startup_does_not_import_heavy_dependencies(self):
+        """Test that importing the CLI loads neither pandas, yfinance nor numpy."""
+        code = (
+            "import sys; import src.cli.main; "
+            "print(','.join(m for m in ('pandas', 'yfinance', 'numpy') if m in sys.modules))"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+        self.assertEqual(result.stdout.strip(), "")
+
     def test_end_to_end_query(self):
         """A full end-to-end test that queries real data."""
         # Arrange
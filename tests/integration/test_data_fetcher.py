@@ -1,10 +1,13 @@
+import logging
 import unittest
-from unittest.mock import patch, call
+from unittest.mock import MagicMock, patch, call, ANY
 from datetime import date, timedelta
 import pandas as pd
 
-from src.models.stock_data import TransactionData
+from src.lib import stats
+from src.models.stock_data import Stock, TransactionData
 from src.services import data_fetcher
+from src.services.data_source import FetchError
 
 class TestDataFetcher(unittest.TestCase):
 
@@ -27,13 +30,14 @@ class TestDataFetcher(unittest.TestCase):
         self.assertEqual(result[0], mock_cached_data)
 
     @patch('src.services.data_fetcher._get_stock_name', return_value="Hon Hai Precision")
-    @patch('src.services.data_fetcher.yf.download')
+    @patch('yfinance.download')
     @patch('src.services.data_fetcher.db_service')
     def test_02_fetch_listed_from_web_and_save(self, mock_db_service, mock_yf_download, mock_get_name):
         """Test fetching listed stock data from the web (first try success)."""
         test_date = date(2025, 9, 19)
         stock_code = "2317"
 
+        mock_db_service.get_stock.return_value = None
         mock_db_service.get_transaction_data_by_date.return_value = None
 
         mock_df = pd.DataFrame({
@@ -48,18 +52,22 @@ class TestDataFetcher(unittest.TestCase):
             "2317.TW", start=test_date, end=test_date + timedelta(days=1), progress=False, auto_adjust=False
         )
         mock_db_service.save_transaction_data.assert_called_once()
+        mock_db_service.save_stock.assert_called_once_with(
+            Stock(stock_code=stock_code, stock_name=None, market="TWSE", suffix=".TW")
+        )
         self.assertEqual(len(result), 1)
         self.assertEqual(result[0].close_price, 102.0)
         self.assertEqual(result[0].stock_name, "Hon Hai Precision")
 
     @patch('src.services.data_fetcher._get_stock_name', return_value="GlobalWafers")
-    @patch('src.services.data_fetcher.yf.download')
+    @patch('yfinance.download')
     @patch('src.services.data_fetcher.db_service')
     def test_03_fetch_otc_from_web_and_save(self, mock_db_service, mock_yf_download, mock_get_name):
         """Test fetching OTC stock data (.TW fails, .TWO succeeds)."""
         test_date = date(2025, 9, 22)
         stock_code = "6488"
 
+        mock_db_service.get_stock.return_value = None
         mock_db_service.get_transaction_data_by_date.return_value = None
 
         # Mock yf.download to fail on .TW and succeed on .TWO
@@ -82,9 +90,11 @@ class TestDataFetcher(unittest.TestCase):
         mock_yf_download.assert_has_calls(calls)
         self.assertEqual(mock_yf_download.call_count, 2)
         mock_db_service.save_transaction_data.assert_called_once()
+        # .TW is remembered as a miss so the next fetch goes straight to .TWO
+        mock_db_service.save_ticker_miss.assert_called_once_with(stock_code, ".TW", ANY)
 
     @patch('src.services.data_fetcher._get_stock_name', return_value="TSMC")
-    @patch('src.services.data_fetcher.yf.download')
+    @patch('yfinance.download')
     @patch('src.services.data_fetcher.db_service')
     def test_04_fetch_data_for_date_range(self, mock_db_service, mock_yf_download, mock_get_name):
         """Test fetching data for a date range from the web."""
@@ -92,13 +102,12 @@ class TestDataFetcher(unittest.TestCase):
         start_date = date(2025, 9, 1)
         end_date = date(2025, 9, 3)
 
-        mock_db_service.get_transaction_data_by_range.side_effect = [
-            [], 
-            [ # Mock return for the final re-query
-                TransactionData(stock_code, "TSMC", date(2025, 9, 1), 900, 905, 910, 899, 10000),
-                TransactionData(stock_code, "TSMC", date(2025, 9, 2), 906, 910, 915, 905, 12000),
-                TransactionData(stock_code, "TSMC", date(2025, 9, 3), 911, 908, 916, 907, 11000)
-            ]
+        mock_db_service.get_stock.return_value = None
+        mock_db_service.get_cached_dates.return_value = set()
+        mock_db_service.get_transaction_data_by_range.return_value = [ # Mock return for the final re-query
+            TransactionData(stock_code, "TSMC", date(2025, 9, 1), 900, 905, 910, 899, 10000),
+            TransactionData(stock_code, "TSMC", date(2025, 9, 2), 906, 910, 915, 905, 12000),
+            TransactionData(stock_code, "TSMC", date(2025, 9, 3), 911, 908, 916, 907, 11000)
         ]
 
         dates = pd.to_datetime([date(2025, 9, 1), date(2025, 9, 2), date(2025, 9, 3)])
@@ -118,5 +127,567 @@ class TestDataFetcher(unittest.TestCase):
         self.assertEqual(result[1].close_price, 910)
         self.assertEqual(result[0].stock_name, "TSMC")
 
+    @patch('src.services.data_fetcher._get_stock_name', return_value="TSMC")
+    @patch('yfinance.download')
+    @patch('src.services.data_fetcher.db_service')
+    def test_05_fetch_only_missing_ranges(self, mock_db_service, mock_yf_download, mock_get_name):
+        """Test that only the trading days missing from the cache are downloaded."""
+        stock_code = "2330"
+        start_date = date(2025, 9, 1)  # Monday
+        end_date = date(2025, 9, 12)   # Friday of the following week
+
+        # Cached: the first week except Wednesday, and Monday of the second week
+        cached = [
+            TransactionData(stock_code, "TSMC", d, 900, 905, 910, 899, 10000)
+            for d in [date(2025, 9, 1), date(2025, 9, 2), date(2025, 9, 4), date(2025, 9, 5), date(2025, 9, 8)]
+        ]
+        mock_db_service.get_stock.return_value = None
+        mock_db_service.get_cached_dates.return_value = {d.date for d in cached}
+        mock_db_service.get_transaction_data_by_range.return_value = cached
+        mock_yf_download.return_value = pd.DataFrame({
+            'Open': [900], 'High': [910], 'Low': [899], 'Close': [905], 'Volume': [10000]
+        }, index=pd.to_datetime([date(2025, 9, 3)]))
+
+        data_fetcher.fetch_stock_data_in_range(stock_code, start_date, end_date)
+
+        # One download per contiguous gap; weekends are never requested
+        mock_yf_download.assert_has_calls([
+            call("2330.TW", start=date(2025, 9, 3), end=date(2025, 9, 4), progress=False, auto_adjust=False),
+            call("2330.TW", start=date(2025, 9, 9), end=date(2025, 9, 13), progress=False, auto_adjust=False),
+        ])
+        self.assertEqual(mock_yf_download.call_count, 2)
+        # All fetched rows are written in a single batch
+        mock_db_service.save_transaction_data.assert_called_once()
+        self.assertEqual(len(mock_db_service.save_transaction_data.call_args[0][0]), 2)
+
+    @patch('yfinance.download')
+    @patch('src.services.data_fetcher.db_service')
+    def test_06_fully_cached_range_skips_network(self, mock_db_service, mock_yf_download):
+        """Test that a range whose trading days are all cached makes no network calls."""
+        stock_code = "2330"
+        cached = [
+            TransactionData(stock_code, "TSMC", date(2025, 9, d), 900, 905, 910, 899, 10000)
+            for d in [1, 2, 3, 4, 5]
+        ]
+        mock_db_service.get_cached_dates.return_value = {d.date for d in cached}
+        mock_db_service.get_transaction_data_by_range.return_value = cached
+
+        # Saturday 2025-09-06 and Sunday 2025-09-07 are not trading days
+        result = data_fetcher.fetch_stock_data_in_range(stock_code, date(2025, 9, 1), date(2025, 9, 7))
+
+        mock_yf_download.assert_not_called()
+        mock_db_service.save_transaction_data.assert_not_called()
+        self.assertEqual(result, cached)
+
+    @patch('yfinance.download')
+    @patch('src.services.data_fetcher.db_service')
+    def test_07_known_no_data_days_skip_network(self, mock_db_service, mock_yf_download):
+        """Test that a range is complete once its holidays are recorded as no-data days."""
+        stock_code = "2330"
+        cached = [
+            TransactionData(stock_code, "TSMC", date(2025, 9, d), 900, 905, 910, 899, 10000)
+            for d in [1, 2, 4, 5]
+        ]
+        mock_db_service.get_cached_dates.return_value = {d.date for d in cached}
+        mock_db_service.get_transaction_data_by_range.return_value = cached
+        mock_db_service.get_no_data_days.return_value = {date(2025, 9, 3)}
+
+        result = data_fetcher.fetch_stock_data_in_range(stock_code, date(2025, 9, 1), date(2025, 9, 5))
+
+        mock_yf_download.assert_not_called()
+        self.assertEqual(result, cached)
+
+    @patch('src.services.data_fetcher._get_stock_name', return_value="TSMC")
+    @patch('yfinance.download')
+    @patch('src.services.data_fetcher.db_service')
+    def test_08_records_no_data_days(self, mock_db_service, mock_yf_download, mock_get_name):
+        """Test that trading days without rows in a successful download are recorded."""
+        stock_code = "2330"
+        mock_db_service.get_stock.return_value = None
+        mock_db_service.get_cached_dates.return_value = set()
+        mock_db_service.get_no_data_days.return_value = set()
+        mock_yf_download.return_value = pd.DataFrame({
+            'Open': [900, 906], 'High': [910, 915], 'Low': [899, 905],
+            'Close': [905, 910], 'Volume': [10000, 12000]
+        }, index=pd.to_datetime([date(2025, 9, 1), date(2025, 9, 3)]))
+
+        data_fetcher.fetch_stock_data_in_range(stock_code, date(2025, 9, 1), date(2025, 9, 3))
+
+        mock_db_service.save_no_data_days.assert_called_once_with(stock_code, [date(2025, 9, 2)])
+
+    @patch('yfinance.download')
+    @patch('src.services.data_fetcher.db_service')
+    def test_09_weekend_and_known_no_data_day_skip_network(self, mock_db_service, mock_yf_download):
+        """Test that weekends and recorded no-data days are answered without a download."""
+        mock_db_service.get_transaction_data_by_date.return_value = None
+        mock_db_service.get_no_data_days.return_value = {date(2025, 9, 29)}
+
+        self.assertEqual(data_fetcher.fetch_stock_data("2330", date(2025, 9, 27), silent=True), []) # Saturday
+        self.assertEqual(data_fetcher.fetch_stock_data("2330", date(2025, 9, 29), silent=True), []) # Recorded holiday
+
+        mock_yf_download.assert_not_called()
+
+    @patch('yfinance.download', return_value=pd.DataFrame())
+    @patch('src.services.data_fetcher.db_service')
+    def test_10_empty_day_is_recorded(self, mock_db_service, mock_yf_download):
+        """Test that an empty past day is stored permanently only for a code with a known suffix."""
+        test_date = date(2025, 9, 30)
+        mock_db_service.get_stock.return_value = Stock("2330", "TSMC", "TWSE", ".TW")
+        mock_db_service.get_transaction_data_by_date.return_value = None
+        mock_db_service.get_no_data_days.return_value = set()
+
+        result = data_fetcher.fetch_stock_data("2330", test_date, silent=True)
+
+        self.assertEqual(result, [])
+        mock_yf_download.assert_called_once()
+        mock_db_service.save_no_data_days.assert_called_once_with("2330", [test_date])
+
+        # A code that has never been resolved may be mistyped, so its empty day expires
+        mock_db_service.reset_mock()
+        mock_db_service.get_stock.return_value = None
+        mock_db_service.get_ticker_misses.return_value = set()
+
+        data_fetcher.fetch_stock_data("2330", test_date, silent=True)
+
+        mock_db_service.save_no_data_days.assert_has_calls([
+            call("2330", []), call("2330", [test_date], expires_at=ANY)
+        ])
+        # A single empty day is not enough to mark the code as unknown
+        mock_db_service.save_ticker_miss.assert_not_called()
+
+    @patch('src.services.data_fetcher._get_stock_name', return_value="GlobalWafers")
+    @patch('yfinance.download')
+    @patch('src.services.data_fetcher.db_service')
+    def test_11_known_suffix_miss_is_skipped(self, mock_db_service, mock_yf_download, mock_get_name):
+        """Test that a suffix recorded as a miss is not tried again."""
+        test_date = date(2025, 9, 22)
+        mock_db_service.get_stock.return_value = None
+        mock_db_service.get_transaction_data_by_date.return_value = None
+        mock_db_service.get_no_data_days.return_value = set()
+        mock_db_service.get_ticker_misses.return_value = {".TW"}
+        mock_yf_download.return_value = pd.DataFrame({
+            'Open': [500.0], 'High': [510.0], 'Low': [498.0], 'Close': [505.0], 'Volume': [5000]
+        }, index=pd.to_datetime([test_date]))
+
+        data_fetcher.fetch_stock_data("6488", test_date)
+
+        mock_yf_download.assert_called_once_with(
+            "6488.TWO", start=test_date, end=test_date + timedelta(days=1), progress=False, auto_adjust=False
+        )
+
+    @patch('yfinance.download', return_value=pd.DataFrame())
+    @patch('src.services.data_fetcher.db_service')
+    def test_12_unknown_code_over_long_range(self, mock_db_service, mock_yf_download):
+        """Test that a code with no data under any suffix over a long range is marked unknown."""
+        mock_db_service.get_stock.return_value = None
+        mock_db_service.get_cached_dates.return_value = set()
+        mock_db_service.get_no_data_days.return_value = set()
+        mock_db_service.get_ticker_misses.return_value = set()
+
+        data_fetcher.fetch_stock_data_in_range("0000", date(2025, 9, 1), date(2025, 9, 30), silent=True)
+
+        mock_db_service.save_ticker_miss.assert_has_calls([
+            call("0000", ".TW", ANY), call("0000", ".TWO", ANY)
+        ])
+        # Nothing was downloaded, so the range is not recorded as no-data days
+        mock_db_service.save_no_data_days.assert_not_called()
+
+    @patch('src.services.data_fetcher._get_stock_name', return_value="GlobalWafers")
+    @patch('yfinance.download')
+    @patch('src.services.data_fetcher.db_service')
+    def test_13_known_suffix_is_used_directly(self, mock_db_service, mock_yf_download, mock_get_name):
+        """Test that a stock with a stored suffix is fetched with a single download."""
+        test_date = date(2025, 9, 22)
+        mock_db_service.get_transaction_data_by_date.return_value = None
+        mock_db_service.get_no_data_days.return_value = set()
+        mock_db_service.get_stock.return_value = Stock("6488", "GlobalWafers", "TPEx", ".TWO")
+        mock_yf_download.return_value = pd.DataFrame({
+            'Open': [500.0], 'High': [510.0], 'Low': [498.0], 'Close': [505.0], 'Volume': [5000]
+        }, index=pd.to_datetime([test_date]))
+
+        data_fetcher.fetch_stock_data("6488", test_date)
+
+        mock_yf_download.assert_called_once_with(
+            "6488.TWO", start=test_date, end=test_date + timedelta(days=1), progress=False, auto_adjust=False
+        )
+        mock_db_service.get_ticker_misses.assert_not_called()
+        mock_db_service.save_stock.assert_not_called()
+
+    @patch('yfinance.Ticker')
+    @patch('src.services.data_fetcher.db_service')
+    def test_14_stock_name_from_database(self, mock_db_service, mock_yf_ticker):
+        """Test that a stored stock name is used without calling yfinance."""
+        mock_db_service.get_stock_names.return_value = {"2330": "TSMC"}
+
+        self.assertEqual(data_fetcher._get_stock_name("2330", "2330.TW"), "TSMC")
+        mock_yf_ticker.assert_not_called()
+
+    @patch('yfinance.Ticker')
+    @patch('src.services.data_fetcher.db_service')
+    def test_15_missing_stock_name_is_saved(self, mock_db_service, mock_yf_ticker):
+        """Test that a name looked up from yfinance is persisted."""
+        mock_db_service.get_stock_names.return_value = {}
+        mock_yf_ticker.return_value.info = {'longName': 'Hon Hai Precision'}
+
+        self.assertEqual(data_fetcher._get_stock_name("2317", "2317.TW"), "Hon Hai Precision")
+        mock_yf_ticker.assert_called_once_with("2317.TW")
+        mock_db_service.save_stock_names.assert_called_once_with({"2317": "Hon Hai Precision"})
+
+    @patch('yfinance.Ticker')
+    @patch('src.services.data_fetcher.db_service')
+    def test_16_prefetch_stock_names(self, mock_db_service, mock_yf_ticker):
+        """Test that prefetching only looks up codes without a fresh stored name."""
+        mock_db_service.get_stock_names.return_value = {"2330": "TSMC"}
+        mock_db_service.get_stock.side_effect = lambda code: {
+            "6488": Stock("6488", None, "TPEx", ".TWO"),
+        }.get(code)
+        mock_yf_ticker.return_value.info = {'longName': 'GlobalWafers'}
+
+        names = data_fetcher.prefetch_stock_names(["2330", "6488", "9999"])
+
+        self.assertEqual(names, {"2330": "TSMC", "6488": "GlobalWafers"})
+        mock_yf_ticker.assert_called_once_with("6488.TWO")
+        mock_db_service.save_stock_names.assert_called_once_with({"6488": "GlobalWafers"})
+
+    @staticmethod
+    def _wide_frame(rows_by_ticker, dates):
+        """Builds a multi-ticker frame shaped like yf.download(..., group_by='ticker')."""
+        columns = pd.MultiIndex.from_product([list(rows_by_ticker), ['Open', 'High', 'Low', 'Close', 'Volume']])
+        values = []
+        for i in range(len(dates)):
+            row = []
+            for closes in rows_by_ticker.values():
+                close = closes[i]
+                row.extend([close, close, close, close, None if close is None else 1000])
+            values.append(row)
+        return pd.DataFrame(values, index=pd.to_datetime(dates), columns=columns, dtype=float)
+
+    @patch('src.services.data_fetcher.prefetch_stock_names', return_value={"2330": "TSMC"})
+    @patch('yfinance.download')
+    @patch('src.services.data_fetcher.db_service')
+    def test_17_fetch_many_known_suffixes(self, mock_db_service, mock_yf_download, mock_names):
+        """Test that codes with a known suffix are downloaded together and split per stock."""
+        mock_db_service.get_stock.side_effect = lambda code: Stock(code, None, "TWSE", ".TW")
+        dates = [date(2025, 9, 1), date(2025, 9, 2)]
+        mock_yf_download.return_value = self._wide_frame(
+            {"2330.TW": [900.0, 905.0], "2317.TW": [None, 102.0]}, dates
+        )
+
+        results = data_fetcher.fetch_many(["2330", "2317"], dates[0], dates[1])
+
+        mock_yf_download.assert_called_once_with(
+            ["2330.TW", "2317.TW"], start=dates[0], end=dates[1] + timedelta(days=1),
+            progress=False, auto_adjust=False, group_by='ticker'
+        )
+        self.assertEqual([d.close_price for d in results["2330"]], [900.0, 905.0])
+        self.assertEqual(results["2330"][0].stock_name, "TSMC")
+        # The day 2317 did not trade is dropped, and it falls back to its code as the name
+        self.assertEqual([d.date for d in results["2317"]], [dates[1]])
+        self.assertEqual(results["2317"][0].stock_name, "2317")
+        mock_db_service.save_transaction_data.assert_called_once()
+        self.assertEqual(len(mock_db_service.save_transaction_data.call_args[0][0]), 3)
+
+    @patch('src.services.data_fetcher.prefetch_stock_names', return_value={})
+    @patch('yfinance.download')
+    @patch('src.services.data_fetcher.db_service')
+    def test_18_fetch_many_probes_unknown_codes_in_batches(self, mock_db_service, mock_yf_download, mock_names):
+        """Test that unknown codes are probed with one batch per suffix and their suffix is saved."""
+        mock_db_service.get_stock.return_value = None
+        mock_db_service.get_ticker_misses.return_value = set()
+        day = date(2025, 9, 1)
+        mock_yf_download.side_effect = [
+            self._wide_frame({"2330.TW": [900.0], "6488.TW": [None], "0000.TW": [None]}, [day]),
+            self._wide_frame({"6488.TWO": [505.0], "0000.TWO": [None]}, [day]),
+        ]
+
+        results = data_fetcher.fetch_many(["2330", "6488", "0000"], day, day)
+
+        self.assertEqual(mock_yf_download.call_count, 2)
+        self.assertEqual(mock_yf_download.call_args_list[1][0][0], ["6488.TWO", "0000.TWO"])
+        self.assertEqual(results["6488"][0].close_price, 505.0)
+        self.assertEqual(results["0000"], [])
+        mock_db_service.save_stock.assert_has_calls([
+            call(Stock(stock_code="2330", stock_name=None, market="TWSE", suffix=".TW")),
+            call(Stock(stock_code="6488", stock_name=None, market="TPEx", suffix=".TWO")),
+        ])
+        mock_db_service.save_ticker_miss.assert_called_once_with("6488", ".TW", ANY)
+
+    def test_19_convert_multiindex_frame(self):
+        """Test that single-ticker frames with a (Price, Ticker) MultiIndex are converted column-wise."""
+        dates = [date(2025, 9, 1), date(2025, 9, 2)]
+        df = pd.DataFrame(
+            [[905.0, 910.0, 899.0, 900.0, 10000], [910.0, 915.0, 905.0, 906.0, 12000]],
+            index=pd.to_datetime(dates),
+            columns=pd.MultiIndex.from_product([['Close', 'High', 'Low', 'Open', 'Volume'], ['2330.TW']],
+                                               names=['Price', 'Ticker'])
+        )
+
+        records = data_fetcher._convert_df_to_transaction_data(df, "2330", "TSMC")
+        rows = data_fetcher._convert_df_to_rows(df, "2330")
+
+        self.assertEqual(records[1], TransactionData("2330", "TSMC", dates[1], 906.0, 910.0, 915.0, 905.0, 12000))
+        self.assertIsInstance(records[1].volume, int)
+        self.assertEqual(rows[0], ("2330", 20332, 900.0, 905.0, 910.0, 899.0, 10000)) # days since 1970-01-01
+
+    @patch('src.services.data_fetcher.prefetch_stock_names', return_value={})
+    @patch('yfinance.download')
+    @patch('src.services.data_fetcher.db_service')
+    def test_21_backfill_streams_rows_to_writer(self, mock_db_service, mock_yf_download, mock_names):
+        """Test that a backfill downloads per batch and hands row tuples to the bulk writer."""
+        mock_db_service.get_stock.side_effect = lambda code: Stock(code, None, "TWSE", ".TW")
+        dates = [date(2025, 9, 1), date(2025, 9, 2)]
+        mock_yf_download.return_value = self._wide_frame(
+            {"2330.TW": [900.0, 905.0], "2317.TW": [None, 102.0]}, dates
+        )
+        writer = MagicMock()
+
+        total = data_fetcher.backfill(["2330", "2317"], dates[0], dates[1], writer, silent=True)
+
+        self.assertEqual(total, 3)
+        mock_yf_download.assert_called_once()
+        rows = [row for c in writer.add_rows.call_args_list for row in c[0][0]]
+        self.assertEqual(sorted(row[0] for row in rows), ["2317", "2330", "2330"])
+        mock_db_service.save_transaction_data.assert_not_called()
+
+    @patch('src.services.data_fetcher.prefetch_stock_names', return_value={})
+    @patch('yfinance.download')
+    @patch('src.services.data_fetcher.db_service')
+    def test_22_sync_downloads_only_the_tail(self, mock_db_service, mock_yf_download, mock_names):
+        """Test that a sync starts each code at its latest cached date minus the overlap."""
+        mock_db_service.get_stock.side_effect = lambda code: Stock(code, None, "TWSE", ".TW")
+        mock_db_service.get_latest_dates.return_value = {"2330": date(2025, 9, 8), "2317": date(2025, 9, 8)}
+        dates = [date(2025, 9, 8), date(2025, 9, 9)]
+        mock_yf_download.return_value = self._wide_frame({"2330.TW": [900.0, 905.0], "2317.TW": [100.0, 102.0]}, dates)
+
+        synced = data_fetcher.sync(["2330", "2317", "6488"], end_date=dates[1], silent=True)
+
+        # Both codes share a start date, so they are downloaded together; 6488 has no history
+        mock_yf_download.assert_called_once_with(
+            ["2330.TW", "2317.TW"], start=date(2025, 9, 1), end=date(2025, 9, 10),
+            progress=False, auto_adjust=False, group_by='ticker'
+        )
+        self.assertEqual(synced, {"2330": 2, "2317": 2, "6488": 0})
+        self.assertEqual(len(mock_db_service.save_transaction_rows.call_args[0][0]), 4)
+
+    @patch('yfinance.download')
+    @patch('src.services.data_fetcher.db_service')
+    def test_23_cache_statistics(self, mock_db_service, mock_yf_download):
+        """Test that cache hits and misses are counted."""
+        stats.reset()
+        mock_db_service.get_transaction_data_by_date.return_value = TransactionData("2330", "TSMC", date(2025, 9, 1), 900, 905, 910, 899, 10000)
+        data_fetcher.fetch_stock_data("2330", date(2025, 9, 1))
+
+        mock_db_service.get_cached_dates.return_value = {date(2025, 9, d) for d in [1, 2, 3, 4, 5]}
+        mock_db_service.get_no_data_days.return_value = set()
+        data_fetcher.fetch_stock_data_in_range("2330", date(2025, 9, 1), date(2025, 9, 5))
+
+        counters = stats.snapshot()["counters"]
+        self.assertEqual(counters["cache.day.hit"], 1)
+        self.assertEqual(counters["cache.range.hit"], 1)
+        mock_yf_download.assert_not_called()
+
+    @patch('src.services.data_fetcher.prefetch_stock_names', return_value={"2317": "Hon Hai"})
+    @patch('yfinance.download')
+    @patch('src.services.data_fetcher.db_service')
+    def test_24_snapshot_downloads_missing_codes_together(self, mock_db_service, mock_yf_download, mock_names):
+        """Test that a snapshot reads cached codes at once and downloads the rest in one batch."""
+        day = date(2025, 9, 1)
+        cached = TransactionData("2330", "TSMC", day, 900, 905, 910, 899, 10000)
+        mock_db_service.get_snapshot.return_value = [cached]
+        mock_db_service.get_no_data_stocks.return_value = {"1101"}
+        mock_db_service.get_stock.side_effect = lambda code: Stock(code, None, "TWSE", ".TW")
+        mock_yf_download.return_value = self._wide_frame({"2317.TW": [100.0], "2454.TW": [None]}, [day])
+
+        records = data_fetcher.snapshot(day, ["2317", "2330", "1101", "2454"], silent=True)
+
+        self.assertEqual([r.stock_code for r in records], ["2317", "2330"])
+        mock_db_service.get_snapshot.assert_called_once_with(day, ["2317", "2330", "1101", "2454"])
+        # 2330 is cached and 1101 is known to have no data on the day
+        self.assertEqual(mock_yf_download.call_args[0][0], ["2317.TW", "2454.TW"])
+        mock_db_service.save_no_data_days.assert_called_once_with("2454", [day])
+
+    @patch('yfinance.download')
+    @patch('src.services.data_fetcher.db_service')
+    def test_25_snapshot_of_weekend_skips_network(self, mock_db_service, mock_yf_download):
+        """Test that a snapshot of a non-trading day only reads the database."""
+        mock_db_service.get_snapshot.return_value = []
+
+        self.assertEqual(data_fetcher.snapshot(date(2025, 9, 6), ["2330"], silent=True), [])
+        self.assertEqual(data_fetcher.snapshot(date(2025, 9, 6)), [])
+        mock_db_service.get_snapshot.assert_called_with(date(2025, 9, 6))
+        mock_yf_download.assert_not_called()
+
+    @patch('yfinance.download')
+    @patch('src.services.data_fetcher.db_service')
+    def test_26_failed_download_is_not_recorded(self, mock_db_service, mock_yf_download):
+        """Test that a download that fails in yfinance raises and leaves no no-data day or ticker miss."""
+        def failed(*args, **kwargs):
+            logging.getLogger("yfinance").error("['0000.TW']: DNSError('Failed to perform, curl: (6) Could not resolve host')")
+            return pd.DataFrame()
+        mock_yf_download.side_effect = failed
+        mock_db_service.get_stock.return_value = None
+        mock_db_service.get_transaction_data_by_date.return_value = None
+        mock_db_service.get_cached_dates.return_value = set()
+        mock_db_service.get_no_data_days.return_value = set()
+        mock_db_service.get_ticker_misses.return_value = set()
+
+        with self.assertLogs("yfinance", level="ERROR"):
+            with self.assertRaises(FetchError):
+                data_fetcher.fetch_stock_data("0000", date(2025, 9, 2), silent=True)
+            # Over a long range, the failure does not mark the code as unknown either
+            with self.assertRaises(FetchError):
+                data_fetcher.fetch_stock_data_in_range("0000", date(2025, 9, 1), date(2025, 9, 30), silent=True)
+
+        mock_db_service.save_no_data_days.assert_not_called()
+        mock_db_service.save_ticker_miss.assert_not_called()
+
+    @patch('src.services.data_fetcher._get_stock_name', return_value="TSMC")
+    @patch('yfinance.download')
+    @patch('src.services.data_fetcher.db_service')
+    def test_27_failed_gap_is_not_recorded(self, mock_db_service, mock_yf_download, mock_get_name):
+        """Test that only the gaps that downloaded are saved and recorded when another gap fails."""
+        # Cached: 09-01 and 09-04, so the gaps are 09-02 to 03 and 09-05
+        mock_db_service.get_stock.return_value = Stock("2330", "TSMC", "TWSE", ".TW")
+        mock_db_service.get_cached_dates.return_value = {date(2025, 9, 1), date(2025, 9, 4)}
+        mock_db_service.get_no_data_days.return_value = set()
+        mock_yf_download.side_effect = [
+            pd.DataFrame({'Open': [900], 'High': [910], 'Low': [899], 'Close': [905], 'Volume': [10000]},
+                         index=pd.to_datetime([date(2025, 9, 2)])),
+            ConnectionError("reset"),
+        ]
+
+        with self.assertRaises(FetchError):
+            data_fetcher.fetch_stock_data_in_range("2330", date(2025, 9, 1), date(2025, 9, 5), silent=True)
+
+        saved = mock_db_service.save_transaction_data.call_args[0][0]
+        self.assertEqual([d.date for d in saved], [date(2025, 9, 2)])
+        # 09-03 came back empty from a successful download; 09-05 failed and stays missing
+        mock_db_service.save_no_data_days.assert_called_once_with("2330", [date(2025, 9, 3)])
+
+    @patch('src.services.data_fetcher.prefetch_stock_names', return_value={})
+    @patch('yfinance.download', side_effect=ConnectionError("reset"))
+    @patch('src.services.data_fetcher.db_service')
+    def test_28_failed_batch_is_not_recorded(self, mock_db_service, mock_yf_download, mock_names):
+        """Test that codes of a failed batch are raised as FetchError and not recorded as no-data days."""
+        day = date(2025, 9, 3)
+        cached = TransactionData("2330", "TSMC", day, 900, 905, 910, 899, 10000)
+        mock_db_service.get_snapshot.return_value = [cached]
+        mock_db_service.get_no_data_stocks.return_value = set()
+        mock_db_service.get_stock.side_effect = lambda code: Stock(code, None, "TWSE", ".TW")
+
+        with self.assertRaisesRegex(FetchError, "2317"):
+            data_fetcher.snapshot(day, ["2330", "2317"], silent=True)
+        with self.assertRaisesRegex(FetchError, "2317"):
+            data_fetcher.fetch_many(["2317"], day, day)
+
+        mock_db_service.save_no_data_days.assert_not_called()
+        mock_db_service.save_ticker_miss.assert_not_called()
+
+    @patch('src.services.data_fetcher._get_stock_name', return_value="TSMC")
+    @patch('yfinance.download')
+    @patch('src.services.data_fetcher.db_service')
+    def test_29_network_counters(self, mock_db_service, mock_yf_download, mock_get_name):
+        """Test that a download counts its rows and the in-memory size of the frame, not network bytes."""
+        stats.reset()
+        mock_db_service.get_stock.return_value = Stock("2330", "TSMC", "TWSE", ".TW")
+        mock_db_service.get_transaction_data_by_date.return_value = None
+        mock_db_service.get_no_data_days.return_value = set()
+        mock_yf_download.return_value = pd.DataFrame({
+            'Open': [900.0], 'High': [910.0], 'Low': [899.0], 'Close': [905.0], 'Volume': [10000]
+        }, index=pd.to_datetime([date(2025, 9, 1)]))
+
+        data_fetcher.fetch_stock_data("2330", date(2025, 9, 1))
+
+        counters = stats.snapshot()["counters"]
+        self.assertEqual(counters["network.rows"], 1)
+        self.assertGreater(counters["network.frame_bytes"], 0)
+        self.assertNotIn("network.bytes", counters)
+
+    @patch('src.services.data_fetcher.prefetch_stock_names', return_value={"2330": "TSMC"})
+    @patch('yfinance.download')
+    @patch('src.services.data_fetcher.db_service')
+    def test_30_partial_batch_failure(self, mock_db_service, mock_yf_download, mock_names):
+        """Test that only the tickers that failed in a multi-ticker download are treated as failed."""
+        day = date(2025, 9, 3)
+        def partial(*args, **kwargs):
+            logging.getLogger("yfinance").error("Failed to get ticker '2317.TW' reason: Failed to perform, curl: (6)")
+            return self._wide_frame({"2330.TW": [905.0], "2317.TW": [None]}, [day])
+        mock_yf_download.side_effect = partial
+        mock_db_service.get_stock.side_effect = lambda code: Stock(code, None, "TWSE", ".TW")
+
+        with self.assertLogs("yfinance", level="ERROR"):
+            results, failed = data_fetcher._fetch_many(["2330", "2317"], day, day)
+
+        self.assertEqual([d.close_price for d in results["2330"]], [905.0])
+        self.assertEqual(list(failed), ["2317"])
+        saved = mock_db_service.save_transaction_data.call_args[0][0]
+        self.assertEqual([d.stock_code for d in saved], ["2330"])
+        mock_db_service.save_ticker_miss.assert_not_called()
+
+    @patch('src.services.data_fetcher.prefetch_stock_names', return_value={})
+    @patch('yfinance.download')
+    @patch('src.services.data_fetcher.db_service')
+    def test_31_sync_failure_is_raised(self, mock_db_service, mock_yf_download, mock_names):
+        """Test that a sync saves the tails that downloaded and then raises for the codes that failed."""
+        mock_db_service.get_stock.side_effect = lambda code: Stock(code, None, "TWSE", ".TW")
+        mock_db_service.get_latest_dates.return_value = {"2330": date(2025, 9, 8), "2317": date(2025, 9, 1)}
+        dates = [date(2025, 9, 8), date(2025, 9, 9)]
+        mock_yf_download.side_effect = [self._wide_frame({"2330.TW": [900.0, 905.0]}, dates), ConnectionError("reset")]
+
+        with self.assertRaisesRegex(FetchError, "2317"):
+            data_fetcher.sync(["2330", "2317"], end_date=dates[1], silent=True)
+
+        saved = mock_db_service.save_transaction_rows.call_args[0][0]
+        self.assertEqual([row[0] for row in saved], ["2330", "2330"])
+
+    @patch('src.services.data_fetcher.BATCH_SIZE', 1)
+    @patch('src.services.data_fetcher.prefetch_stock_names', return_value={})
+    @patch('yfinance.download')
+    @patch('src.services.data_fetcher.db_service')
+    def test_32_backfill_failure_is_raised(self, mock_db_service, mock_yf_download, mock_names):
+        """Test that a backfill flushes the batches that downloaded and then raises for the codes that failed."""
+        mock_db_service.get_stock.side_effect = lambda code: Stock(code, None, "TWSE", ".TW")
+        dates = [date(2025, 9, 1), date(2025, 9, 2)]
+        mock_yf_download.side_effect = [ConnectionError("reset"), self._wide_frame({"2330.TW": [900.0, 905.0]}, dates)]
+        writer = MagicMock()
+
+        with self.assertRaisesRegex(FetchError, "2317"):
+            data_fetcher.backfill(["2317", "2330"], dates[0], dates[1], writer, silent=True)
+
+        rows = [row for c in writer.add_rows.call_args_list for row in c[0][0]]
+        self.assertEqual([row[0] for row in rows], ["2330", "2330"])
+        writer.flush.assert_called_once()
+
+    @patch('yfinance.download', return_value=pd.DataFrame())
+    @patch('src.services.data_fetcher.db_service')
+    def test_33_empty_range_of_known_stock_is_recorded(self, mock_db_service, mock_yf_download):
+        """Test that a range without any rows is recorded as no-data days once the stock's suffix is known."""
+        # Lunar New Year: the exchange was closed from 2025-01-27 to 01-31
+        mock_db_service.get_stock.return_value = Stock("2330", "TSMC", "TWSE", ".TW")
+        mock_db_service.get_cached_dates.return_value = set()
+        mock_db_service.get_no_data_days.return_value = set()
+
+        data_fetcher.fetch_stock_data_in_range("2330", date(2025, 1, 27), date(2025, 1, 31), silent=True)
+
+        mock_yf_download.assert_called_once()
+        mock_db_service.save_no_data_days.assert_called_once_with(
+            "2330", [date(2025, 1, 27), date(2025, 1, 28), date(2025, 1, 29), date(2025, 1, 30), date(2025, 1, 31)]
+        )
+        mock_db_service.save_ticker_miss.assert_not_called()
+
+    @patch('yfinance.download', return_value=pd.DataFrame())
+    @patch('src.services.data_fetcher.db_service')
+    def test_34_fixed_holiday_is_asked_once(self, mock_db_service, mock_yf_download):
+        """Test that a single day on a fixed holiday is asked of the data source and then remembered."""
+        holiday = date(2025, 4, 4) # Children's Day (Friday)
+        mock_db_service.get_transaction_data_by_date.return_value = None
+        mock_db_service.get_no_data_days.return_value = set()
+        mock_db_service.get_stock.return_value = Stock("2330", "TSMC", "TWSE", ".TW")
+
+        self.assertEqual(data_fetcher.fetch_stock_data("2330", holiday, silent=True), [])
+
+        mock_yf_download.assert_called_once()
+        mock_db_service.save_no_data_days.assert_called_once_with("2330", [holiday])
+
 if __name__ == '__main__':
     unittest.main()
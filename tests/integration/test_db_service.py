@@ -1,9 +1,9 @@
 import os
 import sqlite3
 import unittest
-from datetime import date
+from datetime import date, datetime, timedelta
 
-from src.models.stock_data import TransactionData
+from src.models.stock_data import Stock, TransactionData
 from src.services import db_service
 
 class TestDbService(unittest.TestCase):
@@ -20,8 +20,15 @@ class TestDbService(unittest.TestCase):
     @classmethod
     def tearDownClass(cls):
         """Remove the test database after all tests are done."""
-        if os.path.exists(cls.test_db_path):
-            os.remove(cls.test_db_path)
+        cls._remove_db_files()
+
+    @classmethod
+    def _remove_db_files(cls):
+        """Close the pooled connection and delete the database together with its WAL files."""
+        db_service.close_connection()
+        for path in (cls.test_db_path, cls.test_db_path + "-wal", cls.test_db_path + "-shm"):
+            if os.path.exists(path):
+                os.remove(path)
 
     def setUp(self):
         """Initialize the database before each test."""
@@ -29,8 +36,7 @@ class TestDbService(unittest.TestCase):
 
     def tearDown(self):
         """Clean up the database by deleting the file after each test."""
-        if os.path.exists(self.test_db_path):
-            os.remove(self.test_db_path)
+        self._remove_db_files()
 
     def test_01_initialize_db(self):
         """Test if the database and table are created successfully."""
@@ -94,5 +100,256 @@ class TestDbService(unittest.TestCase):
         self.assertEqual(retrieved_data[2].date, end_date)
         self.assertEqual(retrieved_data[1].close_price, 910)
 
+    def test_save_and_get_no_data_days(self):
+        """Test recording no-data days and retrieving them by range."""
+        db_service.save_no_data_days("2330", [date(2025, 9, 3), date(2025, 10, 6)])
+        # Recording the same day twice is harmless
+        db_service.save_no_data_days("2330", [date(2025, 9, 3)])
+
+        self.assertEqual(
+            db_service.get_no_data_days("2330", date(2025, 9, 1), date(2025, 9, 30)),
+            {date(2025, 9, 3)}
+        )
+        self.assertEqual(db_service.get_no_data_days("2317", date(2025, 9, 1), date(2025, 9, 30)), set())
+
+    def test_expired_no_data_days_are_ignored(self):
+        """Test that a no-data day with a passed expiry is no longer returned."""
+        db_service.save_no_data_days("2330", [date(2025, 9, 3)], expires_at=datetime.now() - timedelta(minutes=1))
+        db_service.save_no_data_days("2330", [date(2025, 9, 4)], expires_at=datetime.now() + timedelta(minutes=30))
+
+        self.assertEqual(
+            db_service.get_no_data_days("2330", date(2025, 9, 1), date(2025, 9, 30)),
+            {date(2025, 9, 4)}
+        )
+
+    def test_save_and_get_ticker_misses(self):
+        """Test recording ticker suffix misses with an expiry."""
+        db_service.save_ticker_miss("6488", ".TW", datetime.now() + timedelta(days=30))
+        db_service.save_ticker_miss("0000", ".TWO", datetime.now() - timedelta(days=1))
+
+        self.assertEqual(db_service.get_ticker_misses("6488"), {".TW"})
+        self.assertEqual(db_service.get_ticker_misses("0000"), set())
+
+    def test_save_and_get_stock(self):
+        """Test that stock metadata is stored and partial updates keep existing fields."""
+        self.assertIsNone(db_service.get_stock("6488"))
+
+        db_service.save_stock(Stock(stock_code="6488", stock_name=None, market="TPEx", suffix=".TWO"))
+        db_service.save_stock(Stock(stock_code="6488", stock_name="GlobalWafers"))
+
+        self.assertEqual(db_service.get_stock("6488"), Stock("6488", "GlobalWafers", "TPEx", ".TWO"))
+
+    def test_save_and_get_stock_names(self):
+        """Test bulk saving of stock names and filtering out stale names."""
+        db_service.save_stock(Stock(stock_code="6488", stock_name=None, market="TPEx", suffix=".TWO"))
+        db_service.save_stock_names({"2330": "TSMC", "6488": "GlobalWafers"})
+
+        self.assertEqual(
+            db_service.get_stock_names(["2330", "6488", "9999"]),
+            {"2330": "TSMC", "6488": "GlobalWafers"}
+        )
+        self.assertEqual(db_service.get_stock("6488").suffix, ".TWO")
+        self.assertEqual(db_service.get_stock_names(["2330"], updated_after=datetime.now() + timedelta(days=1)), {})
+
+    def test_connection_is_reused_with_wal(self):
+        """Test that each thread reuses one connection configured for WAL mode."""
+        conn = db_service.get_db_connection()
+        self.assertIs(db_service.get_db_connection(), conn)
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+        # Lookups must not close the shared connection
+        db_service.get_transaction_data_by_date("2330", date(2025, 9, 1))
+        self.assertEqual(conn.execute("SELECT 1").fetchone()[0], 1)
+
+    def test_transaction_rolls_back_on_error(self):
+        """Test that a failed transaction block leaves no partial writes behind."""
+        data = TransactionData("2330", "TSMC", date(2025, 9, 1), 900, 905, 910, 899, 10000)
+
+        with self.assertRaises(RuntimeError):
+            with db_service.transaction():
+                db_service.save_transaction_data([data])
+                db_service.save_no_data_days("2330", [date(2025, 9, 2)])
+                raise RuntimeError("abort")
+
+        self.assertIsNone(db_service.get_transaction_data_by_date("2330", date(2025, 9, 1)))
+        self.assertEqual(db_service.get_no_data_days("2330", date(2025, 9, 1), date(2025, 9, 30)), set())
+
+        # Nested helpers commit together with the outer block
+        with db_service.transaction():
+            db_service.save_transaction_data([data])
+            db_service.save_no_data_days("2330", [date(2025, 9, 2)])
+        self.assertIsNotNone(db_service.get_transaction_data_by_date("2330", date(2025, 9, 1)))
+
+    def test_get_transaction_arrays_and_frame(self):
+        """Test the columnar read API for one and many stock codes."""
+        db_service.save_transaction_data([
+            TransactionData("2330", "TSMC", date(2025, 9, 1), 900, 905, 910, 899, 10000),
+            TransactionData("2330", "TSMC", date(2025, 9, 2), 906, 910, 915, 905, 12000),
+            TransactionData("2317", "Hon Hai", date(2025, 9, 1), 100, 102, 103, 99, 200),
+            TransactionData("2330", "TSMC", date(2025, 9, 4), 909, 912, 914, 908, 13000), # Out of range
+        ])
+
+        arrays = db_service.get_transaction_arrays("2330", date(2025, 9, 1), date(2025, 9, 3))
+        self.assertEqual(arrays['close_price'].tolist(), [905.0, 910.0])
+        self.assertEqual(arrays['date'].dtype.str, '<M8[D]')
+        self.assertEqual(arrays['date'][1].item(), date(2025, 9, 2))
+
+        frame = db_service.get_transaction_frame(["2330", "2317"], date(2025, 9, 1), date(2025, 9, 3))
+        self.assertEqual(list(frame.columns), db_service.TRANSACTION_COLUMNS)
+        self.assertEqual(frame['stock_code'].tolist(), ["2317", "2330", "2330"])
+        self.assertEqual(frame['volume'].tolist(), [200, 10000, 12000])
+
+        self.assertTrue(db_service.get_transaction_frame("9999", date(2025, 9, 1), date(2025, 9, 3)).empty)
+        self.assertEqual(db_service.get_cached_dates("2330", date(2025, 9, 1), date(2025, 9, 30)),
+                         {date(2025, 9, 1), date(2025, 9, 2), date(2025, 9, 4)})
+
+    def test_get_price_series(self):
+        """Test reading one columnar series per stock code."""
+        db_service.save_transaction_data([
+            TransactionData("2330", "TSMC", date(2025, 9, 1), 900, 905, 910, 899, 10000),
+            TransactionData("2330", "TSMC", date(2025, 9, 2), 906, 910, 915, 905, 12000),
+            TransactionData("2317", "Hon Hai", date(2025, 9, 1), 100, 102, 103, 99, 200),
+        ])
+
+        series = db_service.get_price_series(["2330", "2317", "9999"], date(2025, 9, 1), date(2025, 9, 30))
+
+        self.assertEqual(sorted(series), ["2317", "2330"])
+        self.assertEqual(series["2330"].stock_name, "TSMC")
+        self.assertEqual(series["2330"].close_prices.tolist(), [905.0, 910.0])
+        self.assertEqual(series["2317"][0].date, date(2025, 9, 1))
+
+    def test_migrates_version_1_database(self):
+        """Test that a database with the old schema is upgraded and keeps its data."""
+        self._remove_db_files()
+        conn = sqlite3.connect(self.test_db_path)
+        conn.executescript("""
+            CREATE TABLE transaction_data (
+                stock_code TEXT NOT NULL, stock_name TEXT NOT NULL, date TEXT NOT NULL,
+                open_price REAL NOT NULL, close_price REAL NOT NULL, high_price REAL NOT NULL,
+                low_price REAL NOT NULL, volume INTEGER NOT NULL, PRIMARY KEY (stock_code, date)
+            );
+            INSERT INTO transaction_data VALUES ('2330', 'TSMC', '2025-09-01', 900, 905, 910, 899, 10000);
+            INSERT INTO transaction_data VALUES ('2330', 'TSMC', '2025-09-02', 906, 910, 915, 905, 12000);
+        """)
+        conn.close()
+
+        db_service.initialize_db()
+
+        conn = db_service.get_db_connection()
+        self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], db_service.SCHEMA_VERSION)
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(transaction_data)")]
+        self.assertNotIn("stock_name", columns)
+        self.assertEqual(db_service.get_stock("2330").stock_name, "TSMC")
+        records = db_service.get_transaction_data_by_range("2330", date(2025, 9, 1), date(2025, 9, 30))
+        self.assertEqual(records[1], TransactionData("2330", "TSMC", date(2025, 9, 2), 906, 910, 915, 905, 12000))
+
+        # The rollups are built from the migrated rows
+        month = db_service.get_rollups(["2330"], "month", date(2025, 9, 1), date(2025, 9, 1))["2330"][0]
+        self.assertEqual((month.open_price, month.close_price, month.volume), (900, 910, 22000))
+
+        # Running it again on an up-to-date database changes nothing
+        db_service.initialize_db()
+        self.assertEqual(len(db_service.get_cached_dates("2330", date(2025, 9, 1), date(2025, 9, 30))), 2)
+
+    def test_bulk_writer_commits_in_batches(self):
+        """Test that the bulk writer commits full batches and the rest on exit."""
+        rows = [("2330", db_service.to_day_number(date(2025, 9, d)), 900, 905, 910, 899, 10000) for d in (1, 2, 3)]
+
+        with db_service.BulkWriter(batch_size=2, relax_durability=True) as writer:
+            self.assertEqual(db_service.get_db_connection().execute("PRAGMA synchronous").fetchone()[0], 0)
+            writer.add_rows(rows)
+            self.assertEqual(writer.rows_written, 3) # One batch holds every row added at once
+            writer.add_rows([("2317", db_service.to_day_number(date(2025, 9, 1)), 100, 102, 103, 99, 200)])
+            self.assertEqual(writer.rows_written, 3)
+
+        self.assertEqual(writer.rows_written, 4)
+        self.assertGreater(writer.rows_per_second, 0)
+        # synchronous is back to NORMAL (1)
+        self.assertEqual(db_service.get_db_connection().execute("PRAGMA synchronous").fetchone()[0], 1)
+        self.assertEqual(db_service.get_transaction_data_by_date("2317", date(2025, 9, 1)).stock_name, "2317")
+        self.assertEqual(len(db_service.get_cached_dates("2330", date(2025, 9, 1), date(2025, 9, 30))), 3)
+
+    def test_get_latest_dates(self):
+        """Test that the latest cached date is returned per stock code."""
+        db_service.save_transaction_data([
+            TransactionData("2330", "TSMC", date(2025, 9, 1), 900, 905, 910, 899, 10000),
+            TransactionData("2330", "TSMC", date(2025, 9, 3), 906, 910, 915, 905, 12000),
+            TransactionData("2317", "Hon Hai", date(2025, 9, 2), 100, 102, 103, 99, 200),
+        ])
+
+        self.assertEqual(
+            db_service.get_latest_dates(["2330", "2317", "9999"]),
+            {"2330": date(2025, 9, 3), "2317": date(2025, 9, 2)}
+        )
+
+    def test_get_snapshot(self):
+        """Test that a snapshot returns one date across stocks, ordered by code, using the date index."""
+        db_service.save_transaction_data([
+            TransactionData("2330", "TSMC", date(2025, 9, 1), 900, 905, 910, 899, 10000),
+            TransactionData("2330", "TSMC", date(2025, 9, 2), 906, 910, 915, 905, 12000),
+            TransactionData("2317", "Hon Hai", date(2025, 9, 2), 100, 102, 103, 99, 200),
+        ])
+
+        records = db_service.get_snapshot(date(2025, 9, 2))
+        self.assertEqual([(r.stock_code, r.stock_name) for r in records], [("2317", "Hon Hai"), ("2330", "TSMC")])
+        self.assertEqual(db_service.get_snapshot(date(2025, 9, 2), ["2330", "9999"]), [records[1]])
+        self.assertEqual(db_service.get_snapshot(date(2025, 9, 3)), [])
+
+        plan = db_service.get_db_connection().execute(
+            "EXPLAIN QUERY PLAN SELECT stock_code FROM transaction_data WHERE date = ?", (0,)
+        ).fetchall()
+        self.assertIn("transaction_data_by_date", str([tuple(row) for row in plan]))
+
+    def test_iter_transaction_data(self):
+        """Test that rows are yielded stock by stock in the given order, across cursor batches."""
+        db_service.save_transaction_data([
+            TransactionData("2330", "TSMC", date(2025, 9, d), 900, 905, 910, 899, 10000) for d in (1, 2, 3)
+        ] + [TransactionData("2317", "Hon Hai", date(2025, 9, 2), 100, 102, 103, 99, 200)])
+
+        records = db_service.iter_transaction_data(["2317", "2330", "9999"], date(2025, 9, 2), date(2025, 9, 30), batch_size=1)
+
+        self.assertNotIsInstance(records, list)
+        self.assertEqual(
+            [(r.stock_code, r.date) for r in records],
+            [("2317", date(2025, 9, 2)), ("2330", date(2025, 9, 2)), ("2330", date(2025, 9, 3))]
+        )
+
+    def test_get_no_data_stocks(self):
+        """Test that the codes with an unexpired no-data entry on a date are returned."""
+        db_service.save_no_data_days("2330", [date(2025, 9, 3)])
+        db_service.save_no_data_days("2317", [date(2025, 9, 3)], expires_at=datetime.now() - timedelta(minutes=1))
+
+        self.assertEqual(db_service.get_no_data_stocks(date(2025, 9, 3), ["2330", "2317", "2454"]), {"2330"})
+
+    def test_rollups_are_maintained_on_save(self):
+        """Test that weekly and monthly rollups follow every write, also across month boundaries."""
+        # 2025-09-29 to 10-03 is one week in two months
+        db_service.save_transaction_data([
+            TransactionData("2330", "TSMC", date(2025, 9, 29), 900, 905, 910, 899, 1000),
+            TransactionData("2330", "TSMC", date(2025, 9, 30), 906, 910, 915, 905, 2000),
+            TransactionData("2330", "TSMC", date(2025, 10, 1), 911, 912, 918, 908, 3000),
+        ])
+        # A later save of one more day only extends the periods it falls in
+        db_service.save_transaction_data([
+            TransactionData("2330", "TSMC", date(2025, 10, 2), 912, 920, 921, 911, 4000),
+        ])
+
+        weeks = db_service.get_rollups(["2330", "2317"], "week", date(2025, 9, 1), date(2025, 10, 31))
+        months = db_service.get_rollups(["2330"], "month", date(2025, 9, 1), date(2025, 10, 31))
+
+        self.assertEqual(list(weeks), ["2330"])
+        week = weeks["2330"][0]
+        self.assertEqual((week.start_date, week.end_date, week.trading_days), (date(2025, 9, 29), date(2025, 10, 2), 4))
+        self.assertEqual((week.open_price, week.high_price, week.low_price, week.close_price), (900, 921, 899, 920))
+        self.assertEqual(week.volume, 10000)
+        self.assertAlmostEqual(week.period_return, 920 / 900 - 1)
+        self.assertEqual([(m.start_date, m.close_price, m.volume) for m in months["2330"]], [
+            (date(2025, 9, 29), 910, 3000),
+            (date(2025, 10, 1), 920, 7000),
+        ])
+        self.assertIsNone(months["2330"][0].volatility) # A single daily return
+        with self.assertRaises(ValueError):
+            db_service.get_rollups(["2330"], "year", date(2025, 1, 1), date(2025, 12, 31))
+
 if __name__ == '__main__':
     unittest.main()
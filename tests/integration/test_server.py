@@ -0,0 +1,106 @@
+import os
+import threading
+import unittest
+from datetime import date, timedelta
+from urllib.request import urlopen
+
+from src.lib import stats
+from src.models.stock_data import TransactionData
+from src.services import db_service, server
+
+class TestServer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Fill a test database with one week of data and start a server on a free port."""
+        cls.test_db_path = "test_stock_data.db"
+        db_service.DB_PATH = cls.test_db_path
+        db_service.initialize_db()
+        # 2025-09-01 to 05 is Monday to Friday
+        cls.records = [
+            TransactionData("2330", "TSMC", date(2025, 9, 1) + timedelta(days=i), 900.0 + i, 905.0 + i, 910.0 + i, 899.0 + i, 10000 + i)
+            for i in range(5)
+        ]
+        db_service.save_transaction_data(cls.records)
+        # The week before is known to have no data, so no test downloads anything
+        db_service.save_no_data_days("2330", [date(2025, 8, 25) + timedelta(days=i) for i in range(5)])
+
+        cls.server = server.QueryServer(("127.0.0.1", 0), workers=2)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.client = server.QueryClient(f"http://127.0.0.1:{cls.server.server_port}")
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the server and remove the test database."""
+        cls.server.shutdown()
+        cls.server.server_close()
+        db_service.close_connection()
+        for path in (cls.test_db_path, cls.test_db_path + "-wal", cls.test_db_path + "-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_daily_and_range(self):
+        """Test that daily and range queries return the cached records."""
+        daily = self.client.daily(["2330"], date(2025, 9, 3))
+        self.assertEqual(daily, [[self.records[2]]])
+
+        ranges = self.client.ranges(["2330"], date(2025, 9, 1), date(2025, 9, 5))
+        self.assertEqual(ranges["2330"], self.records)
+
+    def test_snapshot(self):
+        """Test that a snapshot returns every cached stock on the date, or only the given ones."""
+        self.assertEqual(self.client.snapshot(date(2025, 9, 3)), [self.records[2]])
+        self.assertEqual(self.client.snapshot(date(2025, 9, 3), ["2330"]), [self.records[2]])
+
+    def test_weekly_summary(self):
+        """Test that a weekly summary arrives with its dates and data."""
+        summaries = self.client.weekly(["2330"], date(2025, 9, 3))
+
+        self.assertEqual(len(summaries), 1)
+        self.assertEqual(summaries[0].start_date, date(2025, 9, 1))
+        self.assertEqual(summaries[0].end_date, date(2025, 9, 5))
+        self.assertEqual(list(summaries[0].data), self.records)
+        self.assertEqual(summaries[0].aggregate.high_price, 914.0)
+        self.assertEqual(summaries[0].aggregate.volume, 50010)
+
+    def test_periods(self):
+        """Test that period summaries arrive split per period with their aggregates."""
+        summaries = self.client.periods(["2330"], date(2025, 8, 25), date(2025, 9, 5), "week")
+
+        self.assertEqual(len(summaries[0]), 2)
+        self.assertEqual(summaries[0][0].label, "2025-08-25")
+        self.assertIsNone(summaries[0][0].aggregate) # No data in August
+        self.assertEqual(list(summaries[0][1].data), self.records)
+        self.assertEqual(summaries[0][1].aggregate.close_price, 909.0)
+        with self.assertRaisesRegex(ValueError, "Unknown period"):
+            self.client.periods(["2330"], date(2025, 9, 1), date(2025, 9, 5), "decade")
+
+    def test_errors(self):
+        """Test that bad parameters become ValueError and unknown endpoints answer 404."""
+        with self.assertRaisesRegex(ValueError, "Invalid start"):
+            self.client._get("range", stocks="2330", start="2025-9-1")
+        with self.assertRaisesRegex(ValueError, "stocks parameter is required"):
+            self.client._get("daily")
+        with self.assertRaisesRegex(ValueError, "Unknown endpoint"):
+            self.client._get("nothing")
+
+    def test_metrics(self):
+        """Test that /metrics serves the statistics in the Prometheus text format."""
+        stats.reset()
+        self.client.daily(["2330"], date(2025, 9, 3))
+
+        with urlopen(f"{self.client.url}/metrics") as response:
+            text = response.read().decode("utf-8")
+
+        self.assertIn("twstockfetcher_server_requests_total", text)
+        self.assertIn("twstockfetcher_server_daily_seconds_count 1", text)
+
+    def test_unreachable_server(self):
+        """Test that a server that is not running raises ConnectionError."""
+        client = server.QueryClient("http://127.0.0.1:1")
+        with self.assertRaises(ConnectionError):
+            client.daily(["2330"], date(2025, 9, 3))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import threading
+import time
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+import pandas as pd
+
+from src.models.stock_data import Stock, TransactionData
+from src.services import data_source
+from src.services.async_fetcher import AsyncFetcher
+
+class FlakySource(data_source.DataSource):
+    """Data source whose first download fails like a dropped connection."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def download(self, tickers, start_date, end_date):
+        self.calls += 1
+        if self.calls == 1:
+            raise ConnectionError("reset")
+        index = pd.DatetimeIndex(["2025-09-01"])
+        return pd.DataFrame({"Open": [900.0], "High": [910.0], "Low": [899.0], "Close": [905.0], "Volume": [10000]}, index=index)
+
+    def history(self, ticker, period="1d"):
+        return pd.DataFrame()
+
+    def info(self, ticker):
+        return {}
+
+class TestAsyncFetcher(unittest.IsolatedAsyncioTestCase):
+
+    @patch('src.services.async_fetcher.data_fetcher.fetch_stock_data')
+    async def test_fetch_stock_data_runs_blocking_call(self, mock_fetch):
+        """Test that the blocking fetch runs in a worker thread and its result is returned."""
+        data = TransactionData("2330", "TSMC", date(2025, 9, 1), 900, 905, 910, 899, 10000)
+        mock_fetch.side_effect = lambda code, day, silent: [data] if threading.current_thread() is not threading.main_thread() else []
+
+        result = await AsyncFetcher().fetch_stock_data("2330", date(2025, 9, 1))
+
+        self.assertEqual(result, [data])
+
+    @patch('src.services.async_fetcher.data_fetcher.fetch_stock_data_in_range')
+    async def test_retries_with_backoff(self, mock_fetch):
+        """Test that a failed download is retried with a logged warning and that the last error is raised."""
+        mock_fetch.side_effect = [data_source.FetchError("reset"), ["row"]]
+        fetcher = AsyncFetcher(retries=2, backoff=0)
+
+        with self.assertLogs("src.services.async_fetcher", level="WARNING") as logs:
+            self.assertEqual(await fetcher.fetch_stock_data_in_range("2330", date(2025, 9, 1), date(2025, 9, 5)), ["row"])
+        self.assertIn("retrying", logs.output[0])
+
+        mock_fetch.side_effect = data_source.FetchError("reset")
+        with self.assertLogs("src.services.async_fetcher", level="WARNING"), self.assertRaises(data_source.FetchError):
+            await fetcher.fetch_stock_data_in_range("2330", date(2025, 9, 1), date(2025, 9, 5))
+        self.assertEqual(mock_fetch.call_count, 4)
+
+    @patch('src.services.async_fetcher.data_fetcher.fetch_stock_data_in_range')
+    async def test_other_errors_are_not_retried(self, mock_fetch):
+        """Test that an error that would fail again, such as a bad argument, is raised at once."""
+        mock_fetch.side_effect = ValueError("Start date cannot be after end date.")
+
+        with self.assertRaises(ValueError):
+            await AsyncFetcher(retries=3, backoff=0).fetch_stock_data_in_range("2330", date(2025, 9, 5), date(2025, 9, 1))
+        self.assertEqual(mock_fetch.call_count, 1)
+
+    @patch('src.services.data_fetcher.db_service')
+    async def test_failed_download_is_retried(self, mock_db_service):
+        """Test that a download failing in the data source reaches the retry instead of becoming a no-data day."""
+        mock_db_service.get_transaction_data_by_date.return_value = None
+        mock_db_service.get_no_data_days.return_value = set()
+        mock_db_service.get_stock.return_value = Stock("2330", "TSMC", "TWSE", ".TW")
+        mock_db_service.get_stock_names.return_value = {"2330": "TSMC"}
+        source = FlakySource()
+        data_source.set_data_source(source)
+        self.addCleanup(data_source.set_data_source, None)
+
+        with self.assertLogs("src.services.async_fetcher", level="WARNING"):
+            await AsyncFetcher(retries=2, backoff=0).fetch_stock_data("2330", date(2025, 9, 1))
+
+        self.assertEqual(source.calls, 2)
+        mock_db_service.save_no_data_days.assert_not_called()
+        saved = mock_db_service.save_transaction_data.call_args[0][0]
+        self.assertEqual([(r.stock_code, r.date, r.close_price) for r in saved], [("2330", date(2025, 9, 1), 905.0)])
+
+    @patch('src.services.async_fetcher.data_fetcher.fetch_stock_data_in_range')
+    async def test_fetch_ranges_bounds_concurrency(self, mock_fetch):
+        """Test that no more than max_concurrency fetches run at once and the order is kept."""
+        lock = threading.Lock()
+        running = [0]
+        peak = [0]
+
+        def fetch(code, start_date, end_date, silent):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+            return [code]
+
+        mock_fetch.side_effect = fetch
+        codes = [str(code) for code in range(2300, 2310)]
+
+        results = await AsyncFetcher(max_concurrency=3).fetch_ranges(codes, date(2025, 9, 1), date(2025, 9, 5))
+
+        self.assertEqual(list(results), codes)
+        self.assertEqual(results["2305"], ["2305"])
+        self.assertLessEqual(peak[0], 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import sys
+import threading
+import time
+import unittest
+
+from src.lib import concurrency
+
+class TestConcurrency(unittest.TestCase):
+
+    def test_map_ordered_keeps_input_order(self):
+        """Test that results come back in input order even when later items finish first."""
+        def slow_for_small(n):
+            time.sleep(0.01 * (5 - n))
+            return n * 10
+
+        self.assertEqual(concurrency.map_ordered(slow_for_small, [1, 2, 3, 4], workers=4), [10, 20, 30, 40])
+        self.assertEqual(concurrency.map_ordered(slow_for_small, [1, 2], workers=1), [10, 20])
+
+    def test_map_ordered_bounds_workers(self):
+        """Test that no more than the requested number of workers run at once."""
+        lock = threading.Lock()
+        running = [0]
+        peak = [0]
+
+        def work(_):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+
+        concurrency.map_ordered(work, range(12), workers=3)
+        self.assertLessEqual(peak[0], 3)
+
+    def test_rate_limiter_spaces_calls(self):
+        """Test that the rate limiter spaces calls out across threads."""
+        limiter = concurrency.RateLimiter(rate=100)  # 10 ms apart
+        start = time.monotonic()
+        concurrency.map_ordered(lambda _: limiter.wait(), range(6), workers=3)
+        self.assertGreaterEqual(time.monotonic() - start, 0.045)
+
+    def test_suppress_stderr_restores_stream_across_threads(self):
+        """Test that overlapping suppressions from several threads restore the original stream."""
+        original = sys.stderr
+
+        def quiet(_):
+            with concurrency.suppress_stderr():
+                time.sleep(0.01)
+
+        concurrency.map_ordered(quiet, range(8), workers=4)
+        self.assertIs(sys.stderr, original)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import logging
+import os
+import tempfile
+import time
+import unittest
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+
+from src.services import data_source
+
+def _frame(dates, closes):
+    """Builds a single-ticker frame shaped like yf.download."""
+    return pd.DataFrame(
+        {'Open': closes, 'High': closes, 'Low': closes, 'Close': closes, 'Volume': [1000] * len(closes)},
+        index=pd.to_datetime(dates)
+    )
+
+class TestDataSource(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        data_source.set_data_source(None)
+
+    def test_record_and_replay(self):
+        """Test that recorded downloads and info are replayed for the requested range."""
+        live = MagicMock()
+        live.download.return_value = _frame([date(2025, 9, 1), date(2025, 9, 2), date(2025, 9, 3)], [900.0, 905.0, 910.0])
+        live.info.return_value = {"longName": "TSMC"}
+        recorder = data_source.RecordingSource(live, self.directory)
+        recorder.download("2330.TW", date(2025, 9, 1), date(2025, 9, 4))
+        recorder.info("2330.TW")
+        self.assertTrue(os.path.exists(os.path.join(self.directory, "2330.TW.csv")))
+
+        replay = data_source.ReplaySource(self.directory)
+
+        single = replay.download("2330.TW", date(2025, 9, 2), date(2025, 9, 4))
+        self.assertEqual(single['Close'].tolist(), [905.0, 910.0])
+        self.assertTrue(replay.download("0000.TW", date(2025, 9, 1), date(2025, 9, 4)).empty)
+        self.assertEqual(replay.info("2330.TW"), {"longName": "TSMC"})
+        self.assertEqual(replay.info("0000.TW"), {})
+        self.assertEqual(replay.history("2330.TW", period="1d")['Close'].tolist(), [910.0])
+
+        # Several tickers come back grouped by ticker, without the unknown ones
+        wide = replay.download(["2330.TW", "0000.TW"], date(2025, 9, 1), date(2025, 9, 2))
+        self.assertEqual(wide['2330.TW']['Close'].tolist(), [900.0])
+        self.assertNotIn("0000.TW", wide.columns.get_level_values(0))
+
+    def test_replay_latency(self):
+        """Test that every replayed request waits for the configured latency."""
+        replay = data_source.ReplaySource(self.directory, latency=0.02)
+
+        start = time.monotonic()
+        replay.download("2330.TW", date(2025, 9, 1), date(2025, 9, 4))
+        replay.info("2330.TW")
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+
+    def test_set_data_source(self):
+        """Test that the data source can be replaced and restored to Yahoo Finance."""
+        replay = data_source.ReplaySource(self.directory)
+        data_source.set_data_source(replay)
+        self.assertIs(data_source.get_data_source(), replay)
+
+        data_source.set_data_source(None)
+        self.assertIsInstance(data_source.get_data_source(), data_source.YFinanceSource)
+
+    @patch('yfinance.download')
+    def test_yfinance_failure_raises_fetch_error(self, mock_download):
+        """Test that a request failure logged by yfinance is raised, while an empty answer is not."""
+        def failed(*args, **kwargs):
+            logging.getLogger("yfinance").error("['2330.TW']: DNSError('Failed to perform, curl: (6) Could not resolve host')")
+            return pd.DataFrame()
+        def empty(*args, **kwargs):
+            logging.getLogger("yfinance").error("['2330.TW']: possibly delisted; no price data found")
+            return pd.DataFrame()
+        source = data_source.YFinanceSource()
+
+        mock_download.side_effect = failed
+        with self.assertLogs("yfinance", level="ERROR"), self.assertRaisesRegex(data_source.FetchError, "DNSError"):
+            source.download("2330.TW", date(2025, 9, 1), date(2025, 9, 2))
+
+        mock_download.side_effect = empty
+        with self.assertLogs("yfinance", level="ERROR"):
+            self.assertTrue(source.download(["2330.TW"], date(2025, 9, 1), date(2025, 9, 2)).empty)
+
+    @patch('yfinance.download')
+    def test_yfinance_partial_failure_keeps_frame(self, mock_download):
+        """Test that a multi-ticker failure names the failed tickers and keeps the data of the others."""
+        frame = pd.DataFrame({('2330.TWO', 'Close'): [905.0]}, index=pd.to_datetime([date(2025, 9, 1)]))
+        def partial(*args, **kwargs):
+            logging.getLogger("yfinance").error("Failed to get ticker '2330.TW' reason: Failed to perform, curl: (6)")
+            return frame
+        mock_download.side_effect = partial
+
+        with self.assertLogs("yfinance", level="ERROR"), self.assertRaises(data_source.FetchError) as raised:
+            data_source.YFinanceSource().download(["2330.TW", "2330.TWO"], date(2025, 9, 1), date(2025, 9, 2))
+        self.assertEqual(raised.exception.tickers, ["2330.TW"])
+        self.assertIs(raised.exception.frame, frame)
+
+    def test_incomplete_source_cannot_be_created(self):
+        """Test that a data source must implement download, history and info."""
+        class DownloadOnly(data_source.DataSource):
+            def download(self, tickers, start_date, end_date):
+                return pd.DataFrame()
+
+        with self.assertRaisesRegex(TypeError, "history"):
+            DownloadOnly()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import io
+import json
+import unittest
+from datetime import date
+
+from src.lib import formatting
+from src.models.stock_data import TransactionData
+
+class TestFormatting(unittest.TestCase):
+
+    def test_format_table_aligns_columns(self):
+        """Test that columns are right-aligned and floats share their number of decimals."""
+        table = formatting.format_table([["2330", 905.0, 10000], ["2317", 102.25, 200]], ["code", "close", "volume"])
+
+        self.assertEqual(table.splitlines(), [
+            "code  close volume",
+            "2330 905.00  10000",
+            "2317 102.25    200",
+        ])
+
+    def test_format_transactions(self):
+        """Test that records are printed in display order with ISO dates."""
+        table = formatting.format_transactions([TransactionData("2330", "TSMC", date(2025, 9, 1), 900, 905.0, 910, 899, 10000)])
+
+        header, row = table.splitlines()
+        self.assertEqual(header.split(), formatting.TRANSACTION_COLUMNS)
+        self.assertEqual(row.split(), ["2330", "TSMC", "2025-09-01", "900", "910", "899", "905.0", "10000"])
+
+    def test_write_transactions_formats(self):
+        """Test that records are written row by row as a table, CSV or JSON lines."""
+        records = [
+            TransactionData("2330", "TSMC", date(2025, 9, 1), 900.5, 905.0, 910.0, 899.0, 10000),
+            TransactionData("2317", "Hon Hai", date(2025, 9, 1), 100.0, 102.0, 103.0, 99.0, 200),
+        ]
+
+        out = io.StringIO()
+        self.assertEqual(formatting.write_transactions(iter(records), out, "csv"), 2)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], ",".join(formatting.TRANSACTION_COLUMNS))
+        self.assertEqual(lines[1], "2330,TSMC,2025-09-01,900.5,910.0,899.0,905.0,10000")
+
+        out = io.StringIO()
+        formatting.write_transactions(iter(records), out, "jsonl")
+        row = json.loads(out.getvalue().splitlines()[1])
+        self.assertEqual((row["stock_name"], row["date"], row["volume"]), ("Hon Hai", "2025-09-01", 200))
+
+        out = io.StringIO()
+        formatting.write_transactions(iter(records), out)
+        header, first, second = out.getvalue().splitlines()
+        self.assertEqual(header.split(), formatting.TRANSACTION_COLUMNS)
+        self.assertEqual(first.split(), ["2330", "TSMC", "2025-09-01", "900.50", "910.00", "899.00", "905.00", "10000"])
+        self.assertEqual(len(first), len(header)) # Fixed widths keep the rows aligned
+
+        with self.assertRaisesRegex(ValueError, "Unknown format"):
+            formatting.write_transactions(records, out, "xml")
+
+if __name__ == '__main__':
+    unittest.main()
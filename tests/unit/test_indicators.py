@@ -0,0 +1,98 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.lib import indicators
+
+class TestIndicators(unittest.TestCase):
+
+    def setUp(self):
+        self.closes = 100 + np.cumsum(np.random.default_rng(0).normal(size=60))
+        self.highs = self.closes + 1.5
+        self.lows = self.closes - 1.0
+
+    def test_period_keys(self):
+        """Test that weeks start on Monday and months on the first day."""
+        dates = np.array(['2025-09-05', '2025-09-07', '2025-09-08', '2025-09-30', '2025-10-01'], dtype='datetime64[D]')
+
+        weeks = indicators.period_keys(dates, "week")
+        months = indicators.period_keys(dates, "month")
+
+        self.assertEqual(weeks[0], weeks[1]) # Friday and Sunday
+        self.assertNotEqual(weeks[1], weeks[2]) # Sunday and Monday
+        self.assertEqual(months[2], months[3])
+        self.assertNotEqual(months[3], months[4])
+        quarters = indicators.period_keys(dates, "quarter")
+        self.assertEqual(quarters[0], quarters[3]) # July to September
+        self.assertNotEqual(quarters[3], quarters[4])
+        with self.assertRaises(ValueError):
+            indicators.period_keys(dates, "decade")
+
+    def test_aggregate(self):
+        """Test period OHLCV, VWAP, return and volatility against a plain computation."""
+        opens = np.array([10.0, 11.0, 12.0, 20.0, 21.0])
+        highs = np.array([11.0, 12.5, 13.0, 22.0, 22.0])
+        lows = np.array([9.5, 10.5, 11.0, 19.0, 20.0])
+        closes = np.array([11.0, 12.0, 12.5, 21.0, 21.5])
+        volumes = np.array([100, 200, 300, 0, 0])
+        starts = indicators.group_starts(np.array([1, 1, 1, 2, 2]))
+
+        result = indicators.aggregate(starts, opens, highs, lows, closes, volumes)
+
+        np.testing.assert_array_equal(starts, [0, 3])
+        np.testing.assert_array_equal(result["open"], [10.0, 20.0])
+        np.testing.assert_array_equal(result["high"], [13.0, 22.0])
+        np.testing.assert_array_equal(result["low"], [9.5, 19.0])
+        np.testing.assert_array_equal(result["close"], [12.5, 21.5])
+        np.testing.assert_array_equal(result["volume"], [600, 0])
+        np.testing.assert_array_equal(result["trading_days"], [3, 2])
+        typical = (highs[:3] + lows[:3] + closes[:3]) / 3
+        self.assertAlmostEqual(result["vwap"][0], (typical * volumes[:3]).sum() / 600)
+        self.assertTrue(np.isnan(result["vwap"][1])) # No volume
+        self.assertAlmostEqual(result["return"][0], 12.5 / 10.0 - 1)
+        self.assertAlmostEqual(result["volatility"][0], np.std([12 / 11 - 1, 12.5 / 12 - 1], ddof=1))
+        self.assertTrue(np.isnan(result["volatility"][1])) # A single daily return
+
+    def test_aggregate_empty(self):
+        """Test that no rows give no periods."""
+        empty = np.empty(0)
+        result = indicators.aggregate(indicators.group_starts(empty), empty, empty, empty, empty, empty.astype('int64'))
+
+        self.assertEqual(len(result["close"]), 0)
+
+    def test_moving_averages_match_pandas(self):
+        """Test SMA and EMA against pandas' rolling and ewm."""
+        closes = pd.Series(self.closes)
+
+        np.testing.assert_allclose(indicators.sma(self.closes, 20), closes.rolling(20).mean().to_numpy())
+        np.testing.assert_allclose(
+            indicators.ema(self.closes, 20), closes.ewm(span=20, adjust=False, min_periods=20).mean().to_numpy()
+        )
+        self.assertTrue(np.isnan(indicators.sma(self.closes[:5], 20)).all())
+
+    def test_rsi(self):
+        """Test that the RSI stays within 0 to 100, is 100 for a series that only rises and 50 for a flat one."""
+        values = indicators.rsi(self.closes, 14)
+
+        self.assertTrue(np.isnan(values[:14]).all())
+        self.assertTrue(((values[14:] >= 0) & (values[14:] <= 100)).all())
+        self.assertTrue((indicators.rsi(np.arange(30, dtype='float64'), 14)[14:] == 100).all())
+        flat = indicators.rsi(np.full(30, 905.0), 14)
+        self.assertTrue(np.isnan(flat[:14]).all())
+        self.assertTrue((flat[14:] == 50).all())
+
+    def test_atr(self):
+        """Test the ATR against a loop over the true ranges with Wilder's smoothing."""
+        values = indicators.atr(self.highs, self.lows, self.closes, 14)
+
+        expected = self.highs[0] - self.lows[0]
+        for i in range(1, len(self.closes)):
+            true_range = max(self.highs[i] - self.lows[i], abs(self.highs[i] - self.closes[i - 1]),
+                             abs(self.lows[i] - self.closes[i - 1]))
+            expected += (true_range - expected) / 14
+        self.assertTrue(np.isnan(values[:13]).all())
+        self.assertAlmostEqual(values[-1], expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import sys
+import unittest
+from datetime import date
+
+import numpy as np
+
+from src.models.price_series import PriceSeries, series_from_arrays
+from src.models.stock_data import TransactionData, WeeklySummary
+
+class TestPriceSeries(unittest.TestCase):
+
+    def setUp(self):
+        self.records = [
+            TransactionData('2330', 'TSMC', date(2025, 9, 2), 906, 910, 915, 905, 12000),
+            TransactionData('2330', 'TSMC', date(2025, 9, 1), 900, 905, 910, 899, 10000),
+            TransactionData('2330', 'TSMC', date(2025, 9, 3), 911, 908, 916, 907, 11000),
+        ]
+
+    def test_transaction_data_is_slotted(self):
+        """Test that TransactionData records carry no per-instance __dict__."""
+        self.assertFalse(hasattr(self.records[0], '__dict__'))
+
+    def test_from_records_round_trip(self):
+        """Test that records are sorted by date, stored in typed arrays and converted back unchanged."""
+        series = PriceSeries.from_records(self.records)
+
+        self.assertEqual(series.stock_code, '2330')
+        self.assertEqual(series.stock_name, 'TSMC')
+        self.assertEqual(series.dates.dtype, np.dtype('datetime64[D]'))
+        self.assertEqual(series.volumes.dtype, np.dtype('int64'))
+        self.assertEqual(series.to_records(), sorted(self.records, key=lambda d: d.date))
+        self.assertEqual(series[0].close_price, 905)
+
+    def test_slicing_shares_memory(self):
+        """Test that slices and date ranges are views on the original arrays."""
+        series = PriceSeries.from_records(self.records)
+
+        window = series.between(date(2025, 9, 2), date(2025, 9, 30))
+        self.assertEqual(len(window), 2)
+        self.assertEqual(window[0].date, date(2025, 9, 2))
+        self.assertTrue(np.shares_memory(window.close_prices, series.close_prices))
+        self.assertEqual(len(series[1:2]), 1)
+
+    def test_equality(self):
+        """Test that series, and the summaries holding them, compare by their rows."""
+        series = PriceSeries.from_records(self.records)
+        same = PriceSeries.from_records(list(reversed(self.records)))
+        other = PriceSeries.from_records(self.records[:2])
+
+        self.assertEqual(series, same)
+        self.assertNotEqual(series, other)
+        self.assertNotEqual(series, self.records)
+        week = WeeklySummary('2330', date(2025, 9, 1), date(2025, 9, 5), series)
+        self.assertEqual(week, WeeklySummary('2330', date(2025, 9, 1), date(2025, 9, 5), same))
+        self.assertNotEqual(week, WeeklySummary('2330', date(2025, 9, 1), date(2025, 9, 5), other))
+
+    def test_frame_round_trip(self):
+        """Test conversion to and from a pandas DataFrame in display column order."""
+        series = PriceSeries.from_records(self.records)
+        frame = series.to_frame()
+
+        self.assertEqual(list(frame.columns), ['stock_code', 'stock_name', 'date', 'open_price',
+                                               'high_price', 'low_price', 'close_price', 'volume'])
+        self.assertEqual(PriceSeries.from_frame(frame).to_records(), series.to_records())
+        self.assertEqual(len(PriceSeries.empty('9999').to_frame()), 0)
+
+    def test_series_from_arrays(self):
+        """Test splitting column arrays ordered by stock code into one series per code."""
+        arrays = {
+            'stock_code': np.array(['2317', '2330', '2330'], dtype=object),
+            'stock_name': np.array(['Hon Hai', 'TSMC', 'TSMC'], dtype=object),
+            'date': np.array(['2025-09-01', '2025-09-01', '2025-09-02'], dtype='datetime64[D]'),
+            'open_price': np.array([100.0, 900.0, 906.0]),
+            'high_price': np.array([103.0, 910.0, 915.0]),
+            'low_price': np.array([99.0, 899.0, 905.0]),
+            'close_price': np.array([102.0, 905.0, 910.0]),
+            'volume': np.array([200, 10000, 12000]),
+        }
+
+        series = series_from_arrays(arrays)
+
+        self.assertEqual(list(series), ['2317', '2330'])
+        self.assertEqual(series['2330'].close_prices.tolist(), [905.0, 910.0])
+        self.assertEqual(series['2317'].stock_name, 'Hon Hai')
+        self.assertEqual(series_from_arrays({k: v[:0] for k, v in arrays.items()}), {})
+
+    def test_memory_is_smaller_than_records(self):
+        """Test that a series holds far less memory than the equivalent list of records."""
+        records = [
+            TransactionData('2330', 'TSMC', date.fromordinal(730000 + i), 900.0 + i, 905.0, 910.0, 899.0, 10000 + i)
+            for i in range(1000)
+        ]
+        series = PriceSeries.from_records(records)
+        record_bytes = sum(
+            sys.getsizeof(r) + sys.getsizeof(r.date) + sys.getsizeof(r.open_price) + sys.getsizeof(r.volume)
+            for r in records
+        )
+        self.assertLess(series.nbytes * 3, record_bytes)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import json
+import time
+import unittest
+
+from src.lib import stats
+
+class TestStats(unittest.TestCase):
+
+    def setUp(self):
+        stats.reset()
+
+    def tearDown(self):
+        stats.reset()
+
+    def test_counters_and_timers(self):
+        """Test that counters add up and timers record calls, also for failing blocks."""
+        stats.increment("cache.day.hit")
+        stats.increment("cache.day.hit", 2)
+
+        @stats.timed("work")
+        def work():
+            time.sleep(0.01)
+
+        work()
+        with self.assertRaises(ValueError):
+            with stats.timer("work"):
+                raise ValueError()
+
+        data = stats.snapshot()
+        self.assertEqual(data["counters"], {"cache.day.hit": 3})
+        self.assertEqual(data["timers"]["work"]["count"], 2)
+        self.assertGreaterEqual(data["timers"]["work"]["total"], 0.01)
+
+    def test_format_summary_includes_hit_rate(self):
+        """Test that the summary shows a hit rate per cache."""
+        stats.increment("cache.day.hit", 3)
+        stats.increment("cache.day.miss")
+        stats.record_time("network.download", 0.5)
+
+        summary = stats.format_summary()
+
+        self.assertIn("cache.day hit rate", summary)
+        self.assertIn("75.0%", summary)
+        self.assertIn("network.download", summary)
+
+    def test_dumps(self):
+        """Test the JSON and Prometheus text dumps."""
+        stats.increment("network.rows", 250)
+        stats.record_time("db.write", 0.25)
+
+        self.assertEqual(json.loads(stats.to_json())["counters"]["network.rows"], 250)
+        text = stats.to_prometheus()
+        self.assertIn("# TYPE twstockfetcher_network_rows_total counter\ntwstockfetcher_network_rows_total 250", text)
+        self.assertIn("twstockfetcher_db_write_seconds_count 1", text)
+        self.assertIn("twstockfetcher_db_write_seconds_sum 0.250000", text)
+
+if __name__ == '__main__':
+    unittest.main()
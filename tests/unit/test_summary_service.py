@@ -3,8 +3,11 @@ from unittest.mock import patch
 from datetime import date, timedelta
 from io import StringIO
 
-from src.services import summary_service
-from src.models.stock_data import TransactionData, WeeklySummary, MonthlySummary
+import numpy as np
+
+from src.services import db_service, summary_service
+from src.models.price_series import PriceSeries
+from src.models.stock_data import PeriodStats, TransactionData, WeeklySummary, MonthlySummary
 
 class TestSummaryService(unittest.TestCase):
 
@@ -28,14 +31,7 @@ class TestSummaryService(unittest.TestCase):
             ),  # Friday
         ]
 
-        # This mock will return data for the days we have it, and None otherwise
-        def side_effect(code, dt, silent=False):
-            for d in mock_data:
-                if d.date == dt and d.stock_code == code:
-                    return [d]
-            return []
-
-        mock_data_fetcher.fetch_stock_data.side_effect = side_effect
+        mock_data_fetcher.fetch_price_series_in_range.return_value = PriceSeries.from_records(mock_data)
 
         # Act
         summary = summary_service.generate_weekly_summary(stock_code, today)
@@ -47,7 +43,16 @@ class TestSummaryService(unittest.TestCase):
         self.assertEqual(summary.end_date, end_of_week)
         self.assertEqual(len(summary.data), 2)
         self.assertEqual(summary.data[0].close_price, 905)
-        self.assertEqual(mock_data_fetcher.fetch_stock_data.call_count, 5)
+        # The week is aggregated from Thursday's open to Friday's close
+        self.assertEqual(summary.aggregate.open_price, 900)
+        self.assertEqual(summary.aggregate.high_price, 915)
+        self.assertEqual(summary.aggregate.close_price, 910)
+        self.assertEqual(summary.aggregate.volume, 220)
+        self.assertAlmostEqual(summary.aggregate.period_return, 910 / 900 - 1)
+        # The whole week is fetched with a single ranged call
+        mock_data_fetcher.fetch_price_series_in_range.assert_called_once_with(
+            stock_code, start_of_week, end_of_week, silent=True
+        )
 
     @patch('src.services.summary_service.data_fetcher')
     def test_generate_monthly_summary(self, mock_data_fetcher):
@@ -62,13 +67,7 @@ class TestSummaryService(unittest.TestCase):
             TransactionData('2317', 'Hon Hai', date(2025, 9, 30), 105, 108, 110, 104, 250),
         ]
 
-        def side_effect(code, dt, silent=False):
-            for d in mock_data:
-                if d.date == dt and d.stock_code == code:
-                    return [d]
-            return []
-
-        mock_data_fetcher.fetch_stock_data.side_effect = side_effect
+        mock_data_fetcher.fetch_price_series_in_range.return_value = PriceSeries.from_records(mock_data)
 
         # Act
         summary = summary_service.generate_monthly_summary(stock_code, today)
@@ -79,8 +78,10 @@ class TestSummaryService(unittest.TestCase):
         self.assertEqual(summary.month, "2025-09")
         self.assertEqual(len(summary.data), 2)
         self.assertEqual(summary.data[1].close_price, 108)
-        # calendar.monthrange(2025, 9) is (1, 30), so it should be called 30 times
-        self.assertEqual(mock_data_fetcher.fetch_stock_data.call_count, 30)
+        # The whole month is fetched with a single ranged call
+        mock_data_fetcher.fetch_price_series_in_range.assert_called_once_with(
+            stock_code, date(2025, 9, 1), date(2025, 9, 30), silent=True
+        )
 
     @patch('src.services.summary_service.data_fetcher')
     @patch('sys.stdout', new_callable=StringIO)
@@ -122,5 +123,105 @@ class TestSummaryService(unittest.TestCase):
         output = mock_stdout.getvalue()
         self.assertIn("No data found for the specified date range.", output)
 
+    @patch('src.services.summary_service.db_service')
+    @patch('src.services.summary_service.data_fetcher')
+    def test_summarize_many(self, mock_data_fetcher, mock_db_service):
+        """Test that closed weeks come from the rollups and partial weeks from one columnar read."""
+        closed_week = PeriodStats('2317', date(2025, 9, 4), date(2025, 9, 5), 100, 103, 99, 102, 200, 101.3, 0.02, None, 2)
+        mock_db_service.ROLLUP_TABLES = db_service.ROLLUP_TABLES
+        mock_db_service.get_rollups.return_value = {'2317': [closed_week]}
+        # The week of 2025-09-08 ends after 2025-09-12, so it is aggregated from daily rows
+        records = [
+            TransactionData('2317', 'Hon Hai', date(2025, 9, 8), 102, 104, 105, 101, 300),
+            TransactionData('2330', 'TSMC', date(2025, 9, 9), 900, 905, 910, 899, 100),
+        ]
+        series = [PriceSeries.from_records(records[:1]), PriceSeries.from_records(records[1:])]
+        mock_db_service.get_transaction_arrays.return_value = {
+            'stock_code': np.array(['2317', '2330'], dtype=object),
+            'date': np.concatenate([s.dates for s in series]),
+            'open_price': np.concatenate([s.open_prices for s in series]),
+            'high_price': np.concatenate([s.high_prices for s in series]),
+            'low_price': np.concatenate([s.low_prices for s in series]),
+            'close_price': np.concatenate([s.close_prices for s in series]),
+            'volume': np.concatenate([s.volumes for s in series]),
+        }
+        codes = ['2330', '2317', '0000']
+
+        summaries = summary_service.summarize_many(codes, date(2025, 9, 1), date(2025, 9, 12), "week")
+
+        mock_data_fetcher.cache_range.assert_called_once_with(codes, date(2025, 9, 1), date(2025, 9, 12), silent=True)
+        mock_db_service.get_rollups.assert_called_once_with(codes, "week", date(2025, 9, 1), date(2025, 9, 7))
+        mock_db_service.get_transaction_arrays.assert_called_once_with(codes, date(2025, 9, 8), date(2025, 9, 12))
+        self.assertEqual(summaries['2317'][0], closed_week)
+        self.assertEqual(summaries['2317'][1].close_price, 104)
+        self.assertEqual(summaries['2330'][0].volume, 100)
+        self.assertIsNone(summaries['2330'][0].volatility)
+        self.assertEqual(summaries['0000'], [])
+
+    @patch('src.services.summary_service.db_service')
+    @patch('src.services.summary_service.data_fetcher')
+    def test_summarize_many_partial_period(self, mock_data_fetcher, mock_db_service):
+        """Test that a range without a whole closed period reads no rollups."""
+        mock_db_service.get_transaction_arrays.return_value = {
+            name: np.empty(0, dtype=object if name == 'stock_code' else 'float64')
+            for name in ('stock_code', 'open_price', 'high_price', 'low_price', 'close_price', 'volume')
+        } | {'date': np.empty(0, dtype='datetime64[D]')}
+
+        summaries = summary_service.summarize_many(['2330'], date(2025, 9, 3), date(2025, 9, 20), "month", fetch_missing=False)
+
+        mock_data_fetcher.cache_range.assert_not_called()
+        mock_db_service.get_rollups.assert_not_called()
+        self.assertEqual(summaries, {'2330': []})
+
+    @patch('src.services.summary_service.db_service')
+    @patch('src.services.summary_service.data_fetcher')
+    def test_generate_period_summaries(self, mock_data_fetcher, mock_db_service):
+        """Test that a range is fetched once and split into periods, cut to the range, with closed months from the rollups."""
+        records = [
+            TransactionData('2330', 'TSMC', date(2025, 8, 29), 890, 895, 896, 889, 100),
+            TransactionData('2330', 'TSMC', date(2025, 9, 1), 900, 905, 910, 899, 200),
+            TransactionData('2330', 'TSMC', date(2025, 9, 30), 906, 910, 915, 905, 300),
+        ]
+        mock_data_fetcher.fetch_price_series_in_range.return_value = PriceSeries.from_records(records)
+        september = PeriodStats('2330', date(2025, 9, 1), date(2025, 9, 30), 900, 915, 899, 910, 500, 906.5, 0.0111, None, 2)
+        mock_db_service.ROLLUP_TABLES = db_service.ROLLUP_TABLES
+        mock_db_service.get_rollups.return_value = {'2330': [september]}
+
+        summaries = summary_service.generate_period_summaries('2330', date(2025, 8, 15), date(2025, 11, 10), "month")
+
+        mock_data_fetcher.fetch_price_series_in_range.assert_called_once_with(
+            '2330', date(2025, 8, 15), date(2025, 11, 10), silent=True
+        )
+        self.assertEqual([s.label for s in summaries], ["2025-08", "2025-09", "2025-10", "2025-11"])
+        self.assertEqual((summaries[0].start_date, summaries[0].end_date), (date(2025, 8, 15), date(2025, 8, 31)))
+        self.assertEqual((summaries[3].start_date, summaries[3].end_date), (date(2025, 11, 1), date(2025, 11, 10)))
+        self.assertEqual(len(summaries[1].data), 2)
+        mock_db_service.get_rollups.assert_called_once_with(['2330'], "month", date(2025, 8, 15), date(2025, 11, 10))
+        self.assertIs(summaries[1].aggregate, september)
+        # August is cut to the range, so it is aggregated from its daily rows
+        self.assertEqual(summaries[0].aggregate.volume, 100)
+        self.assertIsNone(summaries[2].aggregate)
+
+    def test_periods_back(self):
+        """Test the ranges of the last N weeks, months and quarters."""
+        # Weeks end with the current week's Friday, months and quarters with the last completed one
+        self.assertEqual(summary_service.periods_back(date(2025, 9, 20), "week", 3), (date(2025, 9, 1), date(2025, 9, 19)))
+        self.assertEqual(summary_service.periods_back(date(2025, 10, 1), "month", 60), (date(2020, 10, 1), date(2025, 9, 30)))
+        self.assertEqual(summary_service.periods_back(date(2025, 11, 5), "quarter", 2), (date(2025, 4, 1), date(2025, 9, 30)))
+
+    def test_compute_indicators(self):
+        """Test that indicators are aligned with the dates of the series."""
+        records = [
+            TransactionData('2330', 'TSMC', date(2025, 9, 1) + timedelta(days=i), 900 + i, 901 + i, 905 + i, 899 + i, 100)
+            for i in range(30)
+        ]
+
+        result = summary_service.compute_indicators(PriceSeries.from_records(records), sma_window=5)
+
+        self.assertEqual(len(result["sma"]), 30)
+        self.assertAlmostEqual(result["sma"][4], 903)
+        self.assertEqual(result["rsi"][-1], 100)
+        self.assertAlmostEqual(result["atr"][-1], 6, places=2)
+
 if __name__ == '__main__':
     unittest.main()
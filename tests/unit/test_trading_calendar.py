@@ -0,0 +1,43 @@
+import unittest
+from datetime import date
+
+from src.lib import trading_calendar
+
+class TestTradingCalendar(unittest.TestCase):
+
+    def test_is_trading_day(self):
+        """Test that weekends and fixed national holidays are not trading days."""
+        self.assertTrue(trading_calendar.is_trading_day(date(2025, 9, 1)))    # Monday
+        self.assertFalse(trading_calendar.is_trading_day(date(2025, 9, 6)))   # Saturday
+        self.assertFalse(trading_calendar.is_trading_day(date(2025, 10, 10))) # National Day (Friday)
+
+    def test_is_weekday(self):
+        """Test that fixed national holidays are weekdays, unlike weekends."""
+        self.assertTrue(trading_calendar.is_weekday(date(2025, 10, 10)))  # National Day (Friday)
+        self.assertFalse(trading_calendar.is_weekday(date(2025, 9, 6)))   # Saturday
+
+    def test_missing_ranges(self):
+        """Test that missing trading days are grouped into contiguous ranges across weekends."""
+        known = [date(2025, 9, 1), date(2025, 9, 2), date(2025, 9, 10)]
+        ranges = trading_calendar.missing_ranges(date(2025, 9, 1), date(2025, 9, 12), known)
+        self.assertEqual(ranges, [
+            (date(2025, 9, 3), date(2025, 9, 9)),
+            (date(2025, 9, 11), date(2025, 9, 12)),
+        ])
+
+    def test_missing_ranges_complete(self):
+        """Test that no ranges are returned when every trading day is known."""
+        known = trading_calendar.trading_days(date(2025, 10, 6), date(2025, 10, 12))
+        self.assertEqual(len(known), 4) # Monday to Thursday; Friday is National Day
+        self.assertEqual(trading_calendar.missing_ranges(date(2025, 10, 6), date(2025, 10, 12), known), [])
+
+    def test_period_bounds(self):
+        """Test that weeks run from Monday to Sunday and months from the first to the last day."""
+        self.assertEqual(trading_calendar.period_bounds(date(2025, 10, 1), "week"), (date(2025, 9, 29), date(2025, 10, 5)))
+        self.assertEqual(trading_calendar.period_bounds(date(2024, 2, 10), "month"), (date(2024, 2, 1), date(2024, 2, 29)))
+        self.assertEqual(trading_calendar.period_bounds(date(2025, 12, 31), "month"), (date(2025, 12, 1), date(2025, 12, 31)))
+        self.assertEqual(trading_calendar.period_bounds(date(2025, 11, 5), "quarter"), (date(2025, 10, 1), date(2025, 12, 31)))
+        self.assertEqual(trading_calendar.period_bounds(date(2025, 3, 31), "quarter"), (date(2025, 1, 1), date(2025, 3, 31)))
+
+if __name__ == '__main__':
+    unittest.main()